@@ -1,15 +1,134 @@
 """Wrapper to make ADK API work with our frontend endpoints"""
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+import asyncio
+import hashlib
+import hmac
 import httpx
 import json
-import base64
+import logging
 import os
+import secrets
+import time
+import uuid
 from typing import Optional
+from obelisk_recontext_agent.profiles import PROFILE_STATE_KEY, PROFILES
+from obelisk_recontext_agent.tools import UPLOAD_PREFIX, stage_uploaded_image
 
-app = FastAPI(title="ADK Wrapper API")
+# ADK API base URL
+ADK_API_URL = os.environ.get("ADK_API_URL", "http://localhost:8001")  # ADK runs on 8001 by default
+APP_NAME = "app"
+# Longest silence allowed between two streamed events; a whole turn may take
+# much longer (e.g. video generation) as long as events keep arriving.
+EVENT_IDLE_TIMEOUT = float(os.environ.get("ADK_EVENT_IDLE_TIMEOUT", "120"))
+# Connection pool shared by every request to the ADK server
+MAX_CONNECTIONS = int(os.environ.get("ADK_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("ADK_MAX_KEEPALIVE_CONNECTIONS", "20"))
+# Seconds without a turn after which a client's ADK session is deleted
+SESSION_IDLE_TTL = float(os.environ.get("ADK_SESSION_IDLE_TTL", "1800"))
+# Browsers are told apart by a server-issued, signed cookie
+CLIENT_ID_COOKIE = "obelisk_client_id"
+# Key signing the client id cookies; set it to share sessions' cookies across
+# workers and restarts, otherwise each process signs with its own random key
+CLIENT_ID_SECRET = os.environ.get("ADK_CLIENT_ID_SECRET") or secrets.token_hex(32)
+# Optional latency profile for the client's session, e.g. "interactive-fast"
+LATENCY_PROFILE_HEADER = "X-Latency-Profile"
+
+@dataclass
+class ADKSession:
+    """One client's ADK user and session"""
+    user_id: str
+    session_id: Optional[str] = None
+    last_used: float = field(default_factory=time.monotonic)
+    # Latency profile last requested by the client, sent with every turn
+    profile: Optional[str] = None
+    # ADK runs one turn per session at a time
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+class SessionManager:
+    """Creates, caches and expires one ADK session per client"""
+
+    def __init__(self, client: httpx.AsyncClient, idle_ttl: float = SESSION_IDLE_TTL):
+        self.client = client
+        self.idle_ttl = idle_ttl
+        self.sessions: dict[str, ADKSession] = {}
+        self._evictor: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def session(self, client_id: str, profile: Optional[str] = None):
+        """Hold the client's session for one turn, creating it on first use"""
+        entry = self.sessions.get(client_id)
+        if entry is None:
+            entry = self.sessions[client_id] = ADKSession(user_id=client_id)
+        async with entry.lock:
+            if profile:
+                entry.profile = profile
+            if entry.session_id is None:
+                response = await self.client.post(
+                    f"/apps/{APP_NAME}/users/{entry.user_id}/sessions", json={}
+                )
+                if response.status_code != 200:
+                    raise HTTPException(status_code=response.status_code, detail="ADK session error")
+                entry.session_id = response.json()["id"]
+            try:
+                yield entry
+            finally:
+                entry.last_used = time.monotonic()
+
+    async def evict_idle(self):
+        """Delete the sessions of clients idle for longer than idle_ttl"""
+        cutoff = time.monotonic() - self.idle_ttl
+        idle = [
+            (client_id, entry)
+            for client_id, entry in self.sessions.items()
+            if entry.last_used < cutoff and not entry.lock.locked()
+        ]
+        for client_id, entry in idle:
+            del self.sessions[client_id]
+            if entry.session_id is None:
+                continue
+            try:
+                await self.client.delete(
+                    f"/apps/{APP_NAME}/users/{entry.user_id}/sessions/{entry.session_id}"
+                )
+            except httpx.HTTPError as e:
+                logging.warning(f"Failed to delete ADK session {entry.session_id}: {e}")
+
+    def start(self):
+        self._evictor = asyncio.create_task(self._evict_forever())
+
+    async def stop(self):
+        if self._evictor:
+            self._evictor.cancel()
+            await asyncio.gather(self._evictor, return_exceptions=True)
+
+    async def _evict_forever(self):
+        while True:
+            await asyncio.sleep(max(self.idle_ttl / 4, 1))
+            await self.evict_idle()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One keep-alive pool for every request instead of a client per call
+    app.state.adk_client = httpx.AsyncClient(
+        base_url=ADK_API_URL,
+        timeout=httpx.Timeout(10.0, read=EVENT_IDLE_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        ),
+    )
+    app.state.sessions = SessionManager(app.state.adk_client)
+    app.state.sessions.start()
+    yield
+    await app.state.sessions.stop()
+    await app.state.adk_client.aclose()
+
+app = FastAPI(title="ADK Wrapper API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -20,62 +139,153 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ADK API base URL
-ADK_API_URL = "http://localhost:8001"  # ADK runs on 8001 by default
-SESSION_ID = "test-session"
-USER_ID = "u_999"
-APP_NAME = "app"
-
 class RecontextualizeRequest(BaseModel):
     image_url: str
     prompt: str
 
-async def call_adk_agent(message: str, images: Optional[dict] = None):
-    """Call the ADK agent with a message and optional images"""
+def sign_client_id(client_id: str) -> str:
+    """Return the cookie value for a client id: the id and its HMAC"""
+    signature = hmac.new(
+        CLIENT_ID_SECRET.encode(), client_id.encode(), hashlib.sha256
+    ).hexdigest()
+    return f"{client_id}.{signature}"
+
+def verify_client_id(cookie: Optional[str]) -> Optional[str]:
+    """Return the client id of a cookie value if its signature is valid"""
+    client_id = (cookie or "").partition(".")[0]
+    if client_id and hmac.compare_digest(sign_client_id(client_id), cookie):
+        return client_id
+    return None
+
+def get_client_id(request: Request) -> str:
+    """Identify the calling client by its signed cookie, or assign a new id
+
+    Ids are only issued by the server, so a client cannot pick another
+    client's id and with it their session, history and artifacts.
+    """
+    return verify_client_id(request.cookies.get(CLIENT_ID_COOKIE)) or uuid.uuid4().hex
+
+def get_latency_profile(request: Request) -> Optional[str]:
+    """Return the latency profile the client asked for, if any"""
+    profile = request.headers.get(LATENCY_PROFILE_HEADER)
+    if profile and profile not in PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown latency profile '{profile}', expected one of {', '.join(PROFILES)}",
+        )
+    return profile
+
+def remember_client(response, client_id: str):
+    """Set the client id cookie so the next request reuses the same session"""
+    response.set_cookie(
+        CLIENT_ID_COOKIE, sign_client_id(client_id), httponly=True, samesite="lax"
+    )
+    return response
+
+def client_upload_prefix(client_id: str) -> str:
+    """Return the object prefix of a client's uploads
+
+    The prefix is a hash of the id, so no id can name objects outside it.
+    """
+    return f"{UPLOAD_PREFIX}/{hashlib.sha256(client_id.encode()).hexdigest()[:32]}"
+
+async def stage_upload(upload: UploadFile, client_id: str) -> str:
+    """Normalize an uploaded image, stream it to the bucket and return its gs:// URI"""
+    mime_type = upload.content_type or "image/png"
+    # The upload is already spooled by the multipart parser; it is downsized
+    # and sent on in chunks rather than base64-encoded into the run payload.
+    result = await stage_uploaded_image(upload.file, client_upload_prefix(client_id), mime_type)
+    if result["status"] != "ok":
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result["gcs_uri"]
+
+def try_on_message(person_uri: str, product_uri: str) -> str:
+    """Ask for a try-on of images the agent can read by reference"""
+    return (
+        "Generate a virtual try-on image using the person image at "
+        f"{person_uri} and the product image at {product_uri}"
+    )
+
+def build_run_payload(session: ADKSession, message: str) -> dict:
+    """Build the ADK run request for a message"""
     parts = [{"text": message}]
-    
-    if images:
-        for name, data in images.items():
-            parts.append({
-                "inline_data": {
-                    "mime_type": "image/png",
-                    "data": data
-                }
-            })
-    
+
     payload = {
         "appName": APP_NAME,
-        "userId": USER_ID,
-        "sessionId": SESSION_ID,
+        "userId": session.user_id,
+        "sessionId": session.session_id,
         "newMessage": {
             "parts": parts,
             "role": "user"
         },
-        "streaming": False
+        "streaming": True
     }
-    
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        response = await client.post(
-            f"{ADK_API_URL}/api/run",
-            json=payload,
-            headers={"Content-Type": "application/json"}
-        )
-        
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail="ADK API error")
-        
-        # Parse response and extract image URLs
-        events = response.json()
-        for event in events:
-            if event.get("tool_calls"):
-                for tool_call in event["tool_calls"]:
-                    if tool_call.get("function_response") and tool_call["function_response"].get("response"):
-                        # Look for image URLs in the response
-                        response_data = tool_call["function_response"]["response"]
-                        if isinstance(response_data, list) and len(response_data) > 0:
-                            return response_data[0]  # Return first image URL
-        
-        return None
+    if session.profile:
+        # The agents read the profile from session state before each model call
+        payload["stateDelta"] = {PROFILE_STATE_KEY: session.profile}
+    return payload
+
+async def stream_adk_events(client_id: str, message: str, profile: Optional[str] = None):
+    """Yield each ADK event as soon as the agent emits it"""
+    async with app.state.sessions.session(client_id, profile) as session:
+        async with app.state.adk_client.stream(
+            "POST",
+            "/run_sse",
+            json=build_run_payload(session, message),
+            headers={"Accept": "text/event-stream"},
+        ) as response:
+            if response.status_code != 200:
+                raise HTTPException(status_code=response.status_code, detail="ADK API error")
+
+            data_lines = []
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    data_lines.append(line[len("data:"):].strip())
+                elif not line and data_lines:
+                    # A blank line ends one server-sent event
+                    yield json.loads("\n".join(data_lines))
+                    data_lines = []
+            if data_lines:
+                yield json.loads("\n".join(data_lines))
+
+def extract_image_uris(event: dict) -> list:
+    """Return the generated image URIs carried by a tool response in an ADK event"""
+    uris = []
+    parts = (event.get("content") or {}).get("parts") or []
+    for part in parts:
+        function_response = part.get("functionResponse") or part.get("function_response")
+        if not function_response:
+            continue
+        response_data = function_response.get("response") or {}
+        if isinstance(response_data, list):
+            candidates = response_data
+        else:
+            candidates = response_data.get("image_uris") or response_data.get("image_filenames") or []
+        uris.extend(c for c in candidates if isinstance(c, str) and c.startswith("gs://"))
+    return uris
+
+async def call_adk_agent(client_id: str, message: str, profile: Optional[str] = None):
+    """Call the ADK agent with a message"""
+    # Keep consuming the turn so the agent finishes, but remember the first image
+    first_image = None
+    async for event in stream_adk_events(client_id, message, profile):
+        uris = extract_image_uris(event)
+        if uris and first_image is None:
+            first_image = uris[0]  # Return first image URL
+    return first_image
+
+async def relay_adk_events(client_id: str, message: str, profile: Optional[str] = None):
+    """Forward ADK events as server-sent events, announcing each image as it is generated"""
+    try:
+        async for event in stream_adk_events(client_id, message, profile):
+            yield f"event: adk\ndata: {json.dumps(event)}\n\n"
+            for uri in extract_image_uris(event):
+                yield f"event: image\ndata: {json.dumps({'image_url': uri})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    except httpx.ReadTimeout:
+        yield f"event: error\ndata: {json.dumps({'detail': 'ADK agent stopped sending events'})}\n\n"
+    except HTTPException as e:
+        yield f"event: error\ndata: {json.dumps({'detail': e.detail})}\n\n"
 
 @app.get("/")
 async def root():
@@ -83,54 +293,90 @@ async def root():
 
 @app.post("/virtual-try-on")
 async def virtual_try_on(
+    request: Request,
     person_image: UploadFile = File(...),
     product_image: UploadFile = File(...)
 ):
     """Virtual try-on using ADK agent"""
+    client_id = get_client_id(request)
+    profile = get_latency_profile(request)
     try:
-        # Read and encode images
-        person_data = base64.b64encode(await person_image.read()).decode()
-        product_data = base64.b64encode(await product_image.read()).decode()
-        
+        # Stream images to the bucket; the agent only gets their URIs
+        person_uri, product_uri = await asyncio.gather(
+            stage_upload(person_image, client_id),
+            stage_upload(product_image, client_id),
+        )
+
         # Call ADK agent
-        message = "Generate a virtual try-on image using the provided person and product images"
-        result = await call_adk_agent(message, {
-            "person": person_data,
-            "product": product_data
-        })
-        
+        result = await call_adk_agent(
+            client_id, try_on_message(person_uri, product_uri), profile
+        )
+
         if result:
-            return JSONResponse(content={"image_url": result})
+            return remember_client(JSONResponse(content={"image_url": result}), client_id)
         else:
             # Fallback for testing
-            return JSONResponse(content={
-                "image_url": f"data:image/png;base64,{product_data[:100]}...",
+            return remember_client(JSONResponse(content={
+                "image_url": product_uri,
                 "message": "ADK agent called successfully"
-            })
-            
+            }), client_id)
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/recontextualize")
-async def recontextualize(request: RecontextualizeRequest):
+async def recontextualize(request: RecontextualizeRequest, http_request: Request):
     """Recontextualize image using ADK agent"""
+    client_id = get_client_id(http_request)
+    profile = get_latency_profile(http_request)
     try:
         # Call ADK agent
         message = f"Change the background of this image: {request.image_url}. New background: {request.prompt}"
-        result = await call_adk_agent(message)
-        
+        result = await call_adk_agent(client_id, message, profile)
+
         if result:
-            return JSONResponse(content={"image_url": result})
+            return remember_client(JSONResponse(content={"image_url": result}), client_id)
         else:
             # Fallback for testing
-            return JSONResponse(content={
+            return remember_client(JSONResponse(content={
                 "image_url": request.image_url,
                 "message": f"ADK agent called with prompt: {request.prompt}"
-            })
-            
+            }), client_id)
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/virtual-try-on/stream")
+async def virtual_try_on_stream(
+    request: Request,
+    person_image: UploadFile = File(...),
+    product_image: UploadFile = File(...)
+):
+    """Virtual try-on using ADK agent, streamed as server-sent events"""
+    client_id = get_client_id(request)
+    profile = get_latency_profile(request)
+    person_uri, product_uri = await asyncio.gather(
+        stage_upload(person_image, client_id),
+        stage_upload(product_image, client_id),
+    )
+    return remember_client(StreamingResponse(
+        relay_adk_events(client_id, try_on_message(person_uri, product_uri), profile),
+        media_type="text/event-stream",
+    ), client_id)
+
+@app.post("/recontextualize/stream")
+async def recontextualize_stream(request: RecontextualizeRequest, http_request: Request):
+    """Recontextualize image using ADK agent, streamed as server-sent events"""
+    client_id = get_client_id(http_request)
+    profile = get_latency_profile(http_request)
+    message = f"Change the background of this image: {request.image_url}. New background: {request.prompt}"
+    return remember_client(
+        StreamingResponse(
+            relay_adk_events(client_id, message, profile), media_type="text/event-stream"
+        ),
+        client_id,
+    )
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
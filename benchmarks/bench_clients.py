@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: per-call client setup cost, fresh clients vs the shared registry.
+
+Usage:
+    GOOGLE_CLOUD_PROJECT=my-project python -m benchmarks.bench_clients [iterations]
+
+The storage half needs Application Default Credentials and is skipped without them.
+"""
+import os
+import statistics
+import sys
+import time
+
+from google import genai
+from google.auth.exceptions import DefaultCredentialsError
+from google.cloud import storage
+
+from obelisk_recontext_agent import clients
+
+
+def _time_calls(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(label, samples):
+    print(
+        f"{label:<28} mean {statistics.mean(samples):9.3f} ms   "
+        f"p50 {statistics.median(samples):9.3f} ms   max {max(samples):9.3f} ms"
+    )
+
+
+def main(iterations: int = 50):
+    project = os.environ.get("GOOGLE_CLOUD_PROJECT", clients.DEFAULT_PROJECT)
+    location = os.environ.get("GOOGLE_CLOUD_LOCATION", clients.DEFAULT_LOCATION)
+    print(f"Client setup cost over {iterations} calls ({project}/{location})\n")
+
+    _report(
+        "genai.Client() per call",
+        _time_calls(
+            lambda: genai.Client(vertexai=True, project=project, location=location),
+            iterations,
+        ),
+    )
+    clients.reset_clients()
+    _report(
+        "get_genai_client()",
+        _time_calls(lambda: clients.get_genai_client(project, location), iterations),
+    )
+
+    try:
+        _report("storage.Client() per call", _time_calls(storage.Client, iterations))
+        clients.reset_clients()
+        _report(
+            "get_storage_client()",
+            _time_calls(lambda: clients.get_storage_client(project), iterations),
+        )
+    except DefaultCredentialsError:
+        print("\nSkipping storage clients: no Application Default Credentials found.")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
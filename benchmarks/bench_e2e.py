@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Offline end-to-end benchmark of the tools at several concurrency levels.
+
+Runs `generate_virtual_try_on_images`, `edit_image` and `generate_video`
+against the in-process fakes of the GenAI client, Cloud Storage and the ADK
+ToolContext, and reports throughput, p50/p95/p99 latency and peak RSS growth
+for each workload and concurrency level. No network or credentials needed.
+
+Latencies and sizes take a number or a distribution, see `fakes.Distribution`:
+
+    python -m benchmarks.bench_e2e --concurrency 1,8,32 --requests 64 \\
+        --model-latency lognormal:0.5,0.4 --storage-latency 0.02 \\
+        --bandwidth-mbps 400 --image-bytes uniform:1e6,3e6
+
+Each workload and concurrency level runs in its own interpreter so the peak
+RSS figures are independent.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+WORKLOADS = ("try_on", "edit", "video")
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_level(args: argparse.Namespace, workload: str, concurrency: int) -> dict:
+    from google.adk.artifacts import InMemoryArtifactService
+
+    from benchmarks import fakes
+    from benchmarks.fakes import Distribution
+    from obelisk_recontext_agent import tools
+
+    storage = fakes.FakeStorageClient(
+        latency=Distribution.parse(args.storage_latency),
+        bandwidth_mbps=args.bandwidth_mbps,
+        seed=args.seed,
+    )
+    genai_client = fakes.FakeGenAIClient(
+        storage,
+        latency=Distribution.parse(args.model_latency),
+        video_duration=Distribution.parse(args.video_duration),
+        video_bytes=Distribution.parse(args.video_bytes),
+        image_size=Distribution.parse(args.image_bytes) if args.image_bytes else None,
+        seed=args.seed,
+    )
+    fakes.install(genai_client, storage)
+    for name in ("person.png", "product.png", "source.png"):
+        storage.objects[f"inputs/{name}"] = (genai_client.models.image(), "image/png")
+    artifact_service = InMemoryArtifactService() if args.adk_artifacts else None
+    bucket = os.environ["BUCKET"]
+
+    def request(ctx):
+        if workload == "try_on":
+            return tools.generate_virtual_try_on_images(
+                person_uri=f"{bucket}/inputs/person.png",
+                product_uri=f"{bucket}/inputs/product.png",
+                number_of_images=args.number_of_images,
+                tool_context=ctx,
+            )
+        if workload == "edit":
+            return tools.edit_image(
+                prompt="on a beach at sunset",
+                tool_context=ctx,
+                image_uri=f"{bucket}/inputs/source.png",
+            )
+        return tools.generate_video(
+            prompt="slow orbit",
+            tool_context=ctx,
+            number_of_videos=1,
+            negative_prompt="",
+            image_uri=f"{bucket}/inputs/source.png",
+        )
+
+    async def run() -> tuple[list[float], int, float]:
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies: list[float] = []
+        errors = 0
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                ctx = fakes.FakeToolContext(
+                    latency=Distribution.parse(args.artifact_latency),
+                    artifact_service=artifact_service,
+                )
+                start = time.perf_counter()
+                result = await request(ctx)
+                latencies.append(time.perf_counter() - start)
+                if (result or {}).get("status") not in ("complete", "ok"):
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        return latencies, errors, time.perf_counter() - start
+
+    baseline = _peak_rss_mb()
+    latencies, errors, elapsed = asyncio.run(run())
+    return {
+        "workload": workload,
+        "concurrency": concurrency,
+        "requests": args.requests,
+        "errors": errors,
+        "throughput_rps": args.requests / elapsed,
+        "p50_s": percentile(latencies, 0.50),
+        "p95_s": percentile(latencies, 0.95),
+        "p99_s": percentile(latencies, 0.99),
+        "peak_rss_mb": _peak_rss_mb() - baseline,
+    }
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated levels")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per level")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS))
+    parser.add_argument(
+        "--model-latency", default="lognormal:0.2,0.3", help="Seconds per model call"
+    )
+    parser.add_argument("--storage-latency", default="0.01", help="Seconds per GCS request")
+    parser.add_argument("--bandwidth-mbps", type=float, default=None, help="GCS transfer rate")
+    parser.add_argument("--artifact-latency", default="0", help="Seconds per save_artifact")
+    parser.add_argument("--image-bytes", default=None, help="Generated image size")
+    parser.add_argument("--video-duration", default="0.5", help="Seconds per VEO operation")
+    parser.add_argument("--video-bytes", default=str(8 << 20), help="Generated video size")
+    parser.add_argument("--number-of-images", type=int, default=1)
+    parser.add_argument(
+        "--adk-artifacts",
+        action="store_true",
+        help="Keep artifacts in one ADK InMemoryArtifactService, as `adk api_server` does",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--child", nargs=2, metavar=("WORKLOAD", "CONCURRENCY"), help=argparse.SUPPRESS
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str]):
+    args = parse_args(argv)
+    if args.child:
+        workload, concurrency = args.child
+        print(json.dumps(run_level(args, workload, int(concurrency))))
+        return
+
+    from benchmarks.fakes import Distribution
+    from obelisk_recontext_agent import tools
+
+    env = dict(
+        os.environ,
+        BUCKET="gs://bench-bucket",
+        # Every request would otherwise be a cache hit after the first.
+        OBELISK_VTO_CACHE="0",
+        OBELISK_EDIT_CACHE="0",
+        # Measure the tools, not the production model quotas.
+        OBELISK_MODEL_QPM=json.dumps(
+            {model: 1_000_000 for model in (tools.VTO_MODEL, tools.EDIT_MODEL, tools.VEO_MODEL)}
+        ),
+        OBELISK_POLL_MIN_INTERVAL="0.05",
+        OBELISK_POLL_EXPECTED_DURATION=str(Distribution.parse(args.video_duration).a),
+    )
+    print(
+        f"{args.requests} requests per level; model {args.model_latency}s, "
+        f"storage {args.storage_latency}s, VEO {args.video_duration}s\n"
+    )
+    print(
+        f"{'workload':<8} {'conc':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+        f" {'peak RSS':>10} {'errors':>7}"
+    )
+    for workload in args.workloads.split(","):
+        for concurrency in args.concurrency.split(","):
+            output = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.bench_e2e",
+                    *argv, "--child", workload, concurrency,
+                ],
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+            if output.returncode:
+                print(f"{workload:<8} {concurrency:>5} failed:\n{output.stderr[-2000:]}")
+                continue
+            row = json.loads(output.stdout.strip().splitlines()[-1])
+            print(
+                f"{workload:<8} {row['concurrency']:>5} {row['throughput_rps']:8.2f}"
+                f" {row['p50_s']:7.3f}s {row['p95_s']:7.3f}s {row['p99_s']:7.3f}s"
+                f" {row['peak_rss_mb']:7.1f} MB {row['errors']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
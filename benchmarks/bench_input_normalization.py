@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Benchmark: input normalization of a 12 MP phone photo.
+
+Reports the normalization CPU time, the bytes saved and the resulting upload
+time saved at a given uplink bandwidth.
+
+Usage:
+    python -m benchmarks.bench_input_normalization [uplink_mbps]
+"""
+import io
+import statistics
+import sys
+import time
+
+from PIL import Image, ImageFilter
+
+from obelisk_recontext_agent.images import MAX_INPUT_DIMENSION, normalize_image
+
+RUNS = 5
+
+
+def phone_photo() -> bytes:
+    """A 4032x3024 JPEG with photo-like detail and an EXIF block."""
+    noise = Image.effect_noise((4032, 3024), 60).filter(ImageFilter.GaussianBlur(1.5))
+    gradient = Image.linear_gradient("L").resize((4032, 3024))
+    photo = Image.merge("RGB", (noise, gradient, Image.blend(noise, gradient, 0.5)))
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"
+    exif[0x0112] = 1
+    output = io.BytesIO()
+    photo.save(output, "JPEG", quality=95, exif=exif)
+    return output.getvalue()
+
+
+def main(uplink_mbps: float = 50.0):
+    data = phone_photo()
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = normalize_image(data)
+        timings.append(time.perf_counter() - start)
+
+    def upload_s(num_bytes: int) -> float:
+        return num_bytes * 8 / (uplink_mbps * 1e6)
+
+    print(f"12 MP JPEG, max dimension {MAX_INPUT_DIMENSION}px, {uplink_mbps:g} Mbps uplink\n")
+    print(f"original    {len(data) / 1e6:8.2f} MB  {result.original_size}  upload {upload_s(len(data)):6.2f} s")
+    print(f"normalized  {len(result.data) / 1e6:8.2f} MB  {result.size}  upload {upload_s(len(result.data)):6.2f} s")
+    print(f"normalize   {statistics.median(timings) * 1000:8.1f} ms (median of {RUNS})")
+    saved_s = upload_s(result.bytes_saved) - statistics.median(timings)
+    print(f"net saved   {result.bytes_saved / 1e6:8.2f} MB, {saved_s:6.2f} s per image")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 50.0)
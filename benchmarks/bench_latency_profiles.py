@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Live benchmark: time-to-first-token and turn latency of each latency profile.
+
+Replays the recorded sessions in benchmarks/data/recorded_sessions.jsonl
+against the real agent models once per profile, selecting the profile through
+session state as the ADK wrapper does. The image and video backends are the
+in-process fakes, so the numbers are the agents' own model turns. Needs Vertex
+AI credentials (GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_LOCATION,
+GOOGLE_GENAI_USE_VERTEXAI=1).
+
+Usage:
+    python -m benchmarks.bench_latency_profiles [profile ...]
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+SESSIONS = Path(__file__).parent / "data" / "recorded_sessions.jsonl"
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[int(fraction * (len(values) - 1))]
+
+
+async def replay(runner, session: dict, profile: str) -> list[tuple[float, float]]:
+    """Runs every turn of a recorded session; returns (ttft_s, turn_s) per turn."""
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.genai import types
+
+    from obelisk_recontext_agent.profiles import PROFILE_STATE_KEY
+
+    adk_session = await runner.session_service.create_session(
+        app_name=runner.app_name,
+        user_id=f"{session['id']}-{profile}",
+        state={PROFILE_STATE_KEY: profile},
+    )
+    timings = []
+    for message in session["turns"]:
+        start = time.perf_counter()
+        first_token = None
+        async for event in runner.run_async(
+            user_id=adk_session.user_id,
+            session_id=adk_session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text=message)]),
+            run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+        ):
+            if first_token is None and event.author != "user" and event.content and event.content.parts:
+                first_token = time.perf_counter() - start
+        turn = time.perf_counter() - start
+        timings.append((first_token if first_token is not None else turn, turn))
+    return timings
+
+
+def main(profile_names: list[str]):
+    # Measure the profiles alone, not the prompt cache warming up between them.
+    os.environ["OBELISK_PROMPT_CACHE"] = "0"
+    os.environ.setdefault("BUCKET", "gs://bench-bucket")
+    os.environ["OBELISK_VTO_CACHE"] = os.environ["OBELISK_EDIT_CACHE"] = "0"
+
+    from google.adk.runners import InMemoryRunner
+
+    from benchmarks import fakes
+    from obelisk_recontext_agent.agent import root_agent
+    from obelisk_recontext_agent.profiles import PROFILES
+
+    storage = fakes.FakeStorageClient()
+    genai_client = fakes.FakeGenAIClient(storage)
+    fakes.install(genai_client, storage)
+    for name in ("person.png", "jacket.png", "sneakers.png"):
+        storage.objects[f"inputs/{name}"] = (genai_client.models.image_bytes, "image/png")
+
+    sessions = [json.loads(line) for line in SESSIONS.read_text().splitlines() if line.strip()]
+    runner = InMemoryRunner(agent=root_agent, app_name="bench")
+
+    async def run_profile(profile: str) -> list[tuple[float, float]]:
+        timings = []
+        for session in sessions:
+            timings += await replay(runner, session, profile)
+        return timings
+
+    async def run_all() -> dict[str, list[tuple[float, float]]]:
+        return {profile: await run_profile(profile) for profile in profile_names or list(PROFILES)}
+
+    turns = sum(len(session["turns"]) for session in sessions)
+    print(f"{len(sessions)} recorded sessions, {turns} turns per profile\n")
+    print(f"{'profile':<18} {'ttft p50':>9} {'ttft p95':>9} {'turn p50':>9} {'turn p95':>9} {'mean':>8}")
+    for profile, timings in asyncio.run(run_all()).items():
+        ttft = [first for first, _ in timings]
+        turn = [total for _, total in timings]
+        print(
+            f"{profile:<18} {statistics.median(ttft):8.2f}s {percentile(ttft, 0.95):8.2f}s"
+            f" {statistics.median(turn):8.2f}s {percentile(turn, 0.95):8.2f}s"
+            f" {statistics.mean(turn):7.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
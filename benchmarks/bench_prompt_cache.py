@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Live benchmark: prompt tokens and latency of agent turns with and without context caching.
+
+Runs the same conversation in several fresh sessions against the real models,
+once with OBELISK_PROMPT_CACHE=0 and once with it enabled, and prints the mean
+prompt tokens, cached tokens and latency of the model responses per agent and
+turn. ADK only starts caching on a session's second request, so each session
+sends TURNS messages. Needs Vertex AI credentials (GOOGLE_CLOUD_PROJECT,
+GOOGLE_CLOUD_LOCATION, GOOGLE_GENAI_USE_VERTEXAI=1).
+
+Usage:
+    python -m benchmarks.bench_prompt_cache [sessions]
+
+Each mode runs in its own interpreter so neither sees the other's caches.
+"""
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+MESSAGES = [
+    "What can you help me with? Answer in one sentence.",
+    "Which inputs do you need for a virtual try-on? Answer in one sentence.",
+    "And for a product video? Answer in one sentence.",
+]
+
+
+def run_sessions(sessions: int) -> dict:
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+
+    from obelisk_recontext_agent.agent import app
+
+    async def run():
+        runner = InMemoryRunner(app=app)
+        # (agent, turn) -> per-response samples
+        samples = defaultdict(lambda: {"prompt": [], "cached": [], "latency": []})
+        for i in range(sessions):
+            session = await runner.session_service.create_session(app_name=app.name, user_id=f"user-{i}")
+            for turn, message in enumerate(MESSAGES, start=1):
+                started = time.monotonic()
+                async for event in runner.run_async(
+                    user_id=session.user_id,
+                    session_id=session.id,
+                    new_message=types.Content(role="user", parts=[types.Part(text=message)]),
+                ):
+                    usage = event.usage_metadata
+                    if event.partial or not usage:
+                        continue
+                    stats = samples[f"{event.author} turn {turn}"]
+                    stats["prompt"].append(usage.prompt_token_count or 0)
+                    stats["cached"].append(usage.cached_content_token_count or 0)
+                    stats["latency"].append(time.monotonic() - started)
+                    started = time.monotonic()
+        await runner.close()
+        return {
+            key: {
+                "responses": len(stats["prompt"]),
+                "mean_prompt_tokens": statistics.mean(stats["prompt"]),
+                "mean_cached_tokens": statistics.mean(stats["cached"]),
+                "latency_p50_s": statistics.median(stats["latency"]),
+            }
+            for key, stats in samples.items()
+        }
+
+    return asyncio.run(run())
+
+
+def main(sessions: int = 5):
+    print(f"{sessions} sessions of {len(MESSAGES)} turns each\n")
+    for mode in ("0", "1"):
+        env = dict(os.environ, OBELISK_PROMPT_CACHE=mode)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_prompt_cache", "--child", str(sessions)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        report = json.loads(output.stdout.strip().splitlines()[-1])
+        print(f"OBELISK_PROMPT_CACHE={mode}")
+        for key, stats in sorted(report.items()):
+            print(
+                f"  {key:<44} responses {stats['responses']:3d}"
+                f"  prompt {stats['mean_prompt_tokens']:8.0f} tok"
+                f"  cached {stats['mean_cached_tokens']:8.0f} tok"
+                f"  p50 {stats['latency_p50_s']:6.2f} s"
+            )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        print(json.dumps(run_sessions(int(sys.argv[2]))))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
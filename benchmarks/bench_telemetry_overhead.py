@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Benchmark: cost of the stage spans and histograms per tool call.
+
+Times `stage()` on its own and a whole fake try-on (about ten stages) with
+telemetry disabled, enabled without an SDK (the API's no-op providers, as in
+local development), and enabled with the in-memory SDK exporter.
+
+Usage:
+    python -m benchmarks.bench_telemetry_overhead [try_ons]
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from contextlib import nullcontext
+
+from obelisk_recontext_agent import telemetry, tools
+
+STAGES = 20_000
+
+
+def stage_cost_us() -> float:
+    start = time.perf_counter()
+    for _ in range(STAGES):
+        with telemetry.stage("model.call", model="m", bytes=1):
+            pass
+    return (time.perf_counter() - start) / STAGES * 1e6
+
+
+def try_on_ms(try_ons: int) -> float:
+    from benchmarks import fakes
+
+    async def run():
+        timings = []
+        for _ in range(try_ons):
+            start = time.perf_counter()
+            result = await tools.generate_virtual_try_on_images(
+                person_uri="gs://bench-bucket/inputs/person.png",
+                product_uri="gs://bench-bucket/inputs/product.png",
+                number_of_images=1,
+                tool_context=fakes.FakeToolContext(),
+            )
+            timings.append(time.perf_counter() - start)
+            assert result["status"] == "complete", result
+        return statistics.median(timings) * 1000
+
+    return asyncio.run(run())
+
+
+def main(try_ons: int = 200):
+    from benchmarks import fakes
+
+    os.environ.setdefault("BUCKET", "gs://bench-bucket")
+    os.environ["OBELISK_VTO_CACHE"] = "0"
+    # Time the tool itself, not the model quota.
+    os.environ["OBELISK_MODEL_QPM"] = json.dumps({tools.VTO_MODEL: 1_000_000})
+    storage = fakes.FakeStorageClient()
+    genai_client = fakes.FakeGenAIClient(storage)
+    fakes.install(genai_client, storage)
+    for name in ("person.png", "product.png"):
+        storage.objects[f"inputs/{name}"] = (genai_client.models.image_bytes, "image/png")
+
+    print(f"{'mode':<10} {'per stage':>10} {'try-on p50':>11}")
+    for mode in ("disabled", "no-op", "local"):
+        telemetry.TELEMETRY_ENABLED = mode != "disabled"
+        with telemetry.LocalTelemetry() if mode == "local" else nullcontext():
+            per_stage = stage_cost_us()
+            per_try_on = try_on_ms(try_ons)
+        print(f"{mode:<10} {per_stage:8.2f}us {per_try_on:9.2f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Memory benchmark: peak RSS of a 4-shot generate_video session per artifact mode.
+
+Usage:
+    python -m benchmarks.bench_video_memory [video_mb]
+
+Each mode runs in its own interpreter so the peak RSS figures are independent.
+"""
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+
+SHOTS = 4
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_session(video_mb: int) -> float:
+    from benchmarks import fakes
+    from obelisk_recontext_agent import tools
+
+    storage = fakes.FakeStorageClient()
+    fakes.install(fakes.FakeGenAIClient(storage, video_bytes=video_mb << 20), storage)
+    ctx = fakes.FakeToolContext()
+    ctx.state["selected_file"] = "gs://bench-bucket/inputs/frame.png"
+
+    async def session():
+        for shot in range(SHOTS):
+            result = await tools.generate_video(
+                prompt=f"shot {shot}",
+                tool_context=ctx,
+                number_of_videos=1,
+                negative_prompt="",
+            )
+            assert result["status"] == "ok", result
+
+    baseline = _peak_rss_mb()
+    asyncio.run(session())
+    return _peak_rss_mb() - baseline
+
+
+def main(video_mb: int = 20):
+    print(f"{SHOTS}-shot session, {video_mb} MB per clip\n")
+    for mode in ("inline", "reference"):
+        env = dict(
+            os.environ,
+            BUCKET="gs://bench-bucket",
+            OBELISK_VIDEO_ARTIFACT_MODE=mode,
+            OBELISK_POLL_MIN_INTERVAL="0.05",
+            OBELISK_POLL_EXPECTED_DURATION="0.1",
+        )
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_video_memory", "--child", str(video_mb)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip().splitlines()[-1]
+        print(f"{mode:<10} peak RSS growth {float(output):8.1f} MB")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        print(run_session(int(sys.argv[2])))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
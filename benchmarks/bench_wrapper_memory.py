@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Memory benchmark: peak allocation per /virtual-try-on request in the ADK wrapper.
+
+Compares the old hand-off, which read both uploads, base64-encoded them and
+embedded them in the JSON run payload, with streaming them to the bucket and
+sending only their gs:// URIs.
+
+Usage:
+    python -m benchmarks.bench_wrapper_memory [image_mb]
+"""
+import asyncio
+import base64
+import json
+import os
+import sys
+import tracemalloc
+from tempfile import SpooledTemporaryFile
+
+from starlette.datastructures import Headers, UploadFile
+
+import adk_wrapper
+
+# Starlette spools multipart fields larger than this to disk.
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def make_upload(name: str, size: int) -> UploadFile:
+    spooled = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    spooled.write(os.urandom(size))
+    spooled.seek(0)
+    return UploadFile(spooled, filename=name, headers=Headers({"content-type": "image/png"}))
+
+
+async def inline_request(person: UploadFile, product: UploadFile) -> int:
+    person_data = base64.b64encode(await person.read()).decode()
+    product_data = base64.b64encode(await product.read()).decode()
+    payload = {
+        "newMessage": {
+            "parts": [
+                {"text": "Generate a virtual try-on image using the provided person and product images"},
+                {"inline_data": {"mime_type": "image/png", "data": person_data}},
+                {"inline_data": {"mime_type": "image/png", "data": product_data}},
+            ],
+            "role": "user",
+        },
+        "streaming": True,
+    }
+    # httpx serializes the JSON body before sending it.
+    return len(json.dumps(payload).encode())
+
+
+async def reference_request(person: UploadFile, product: UploadFile) -> int:
+    person_uri, product_uri = await asyncio.gather(
+        adk_wrapper.stage_upload(person, "bench"),
+        adk_wrapper.stage_upload(product, "bench"),
+    )
+    session = adk_wrapper.ADKSession(user_id="bench", session_id="bench")
+    payload = adk_wrapper.build_run_payload(
+        session, adk_wrapper.try_on_message(person_uri, product_uri)
+    )
+    return len(json.dumps(payload).encode())
+
+
+def measure(request, image_mb: int) -> tuple[float, int]:
+    size = image_mb << 20
+    person, product = make_upload("person.png", size), make_upload("product.png", size)
+    tracemalloc.start()
+    payload_bytes = asyncio.run(request(person, product))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1 << 20), payload_bytes
+
+
+def main(image_mb: int = 8):
+    from benchmarks import fakes
+
+    os.environ.setdefault("BUCKET", "gs://bench-bucket")
+    # Keep only the sizes of uploads, so the peak is the wrapper's own memory.
+    storage = fakes.FakeStorageClient(keep_streamed_bytes=False)
+    fakes.install(fakes.FakeGenAIClient(storage), storage)
+
+    print(f"Two {image_mb} MB uploads per request\n")
+    for mode, request in (("inline", inline_request), ("reference", reference_request)):
+        peak_mb, payload_bytes = measure(request, image_mb)
+        print(f"{mode:<10} peak {peak_mb:8.1f} MB   run payload {payload_bytes / 1024:10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
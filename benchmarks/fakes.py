@@ -0,0 +1,377 @@
+"""In-process stand-ins for the GenAI client, Cloud Storage and the ADK ToolContext.
+
+They are synchronous and block for a configurable time, like the real SDKs, so
+benchmarks exercise the tools' concurrency exactly as production does. The
+unit tests use the same fakes through the `fake_backends` fixture in
+`tests/conftest.py`, with no latency and tiny payloads.
+
+Latencies and payload sizes are numbers or `Distribution`s, sampled per call,
+e.g. `Distribution.parse("lognormal:8,0.3")` for model calls with an 8 s
+median and a long tail.
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Optional, Union
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+from google.genai import types
+from PIL import Image
+
+from obelisk_recontext_agent import tools
+from obelisk_recontext_agent.storage_backends import GCSStorageBackend
+
+
+@dataclass(frozen=True)
+class Distribution:
+    """A sampled quantity: constant(value), uniform(low, high) or lognormal(median, sigma)."""
+
+    kind: str = "constant"
+    a: float = 0.0
+    b: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "constant":
+            return self.a
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(self.a), self.b)
+        raise ValueError(f"Unknown distribution '{self.kind}'")
+
+    @classmethod
+    def parse(cls, spec: str) -> "Distribution":
+        """Parses "0.5", "uniform:0.2,1.0" or "lognormal:8,0.3"."""
+        kind, _, params = spec.rpartition(":")
+        values = [float(value) for value in params.split(",")]
+        return cls(kind or "constant", *values)
+
+    def __str__(self) -> str:
+        if self.kind == "constant":
+            return f"{self.a:g}"
+        return f"{self.kind}({self.a:g}, {self.b:g})"
+
+
+Sampled = Union[float, int, Distribution]
+
+
+def _distribution(value: Sampled) -> Distribution:
+    return value if isinstance(value, Distribution) else Distribution("constant", value)
+
+
+class _Sampler:
+    """Seeded source of a fake's latencies and sizes."""
+
+    def __init__(self, seed: Optional[int]):
+        self.rng = random.Random(seed)
+
+    def sleep(self, latency: Distribution):
+        seconds = latency.sample(self.rng)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def size(self, size: Distribution) -> int:
+        return max(0, int(size.sample(self.rng)))
+
+
+class FakeToolContext:
+    """Plain dict state and an artifact store.
+
+    Args:
+        latency: Time each save_artifact takes.
+        artifact_service: An ADK artifact service, e.g. InMemoryArtifactService,
+            to store artifacts in; a plain dict is used without one.
+    """
+
+    def __init__(self, latency: Sampled = 0.0, artifact_service=None, seed: Optional[int] = None):
+        self.state = {}
+        self.artifacts = {}
+        self.latency = _distribution(latency)
+        self.artifact_service = artifact_service
+        self.session_id = uuid.uuid4().hex
+        self._sampler = _Sampler(seed)
+
+    async def save_artifact(self, filename, artifact):
+        seconds = self.latency.sample(self._sampler.rng)
+        if seconds > 0:
+            # Artifact services are async; the delay must not block the loop.
+            await asyncio.sleep(seconds)
+        if self.artifact_service:
+            return await self.artifact_service.save_artifact(
+                app_name="bench",
+                user_id="bench",
+                session_id=self.session_id,
+                filename=filename,
+                artifact=artifact,
+            )
+        self.artifacts[filename] = artifact
+        return len(self.artifacts)
+
+    async def load_artifact(self, filename, version=None):
+        if self.artifact_service:
+            return await self.artifact_service.load_artifact(
+                app_name="bench",
+                user_id="bench",
+                session_id=self.session_id,
+                filename=filename,
+                version=version,
+            )
+        return self.artifacts.get(filename)
+
+
+class FakeStorageClient:
+    """Bucket-less object store; objects written by a fake model are generated on read.
+
+    Args:
+        latency: Time per request, e.g. per upload or download.
+        bandwidth_mbps: Transfer rate added on top of the latency; unlimited if None.
+        keep_streamed_bytes (bool): Whether streamed uploads keep their content,
+            or only their size so that measuring memory does not count them.
+    """
+
+    def __init__(
+        self,
+        latency: Sampled = 0.0,
+        bandwidth_mbps: Optional[float] = None,
+        keep_streamed_bytes: bool = True,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.bandwidth_mbps = bandwidth_mbps
+        self.keep_streamed_bytes = keep_streamed_bytes
+        self.objects = {}
+        # Sizes of objects that "exist" remotely but whose bytes are produced lazily.
+        self.remote_sizes = {}
+        self.uploads = 0
+        self._sampler = _Sampler(seed)
+
+    def bucket(self, name):
+        return SimpleNamespace(
+            name=name,
+            blob=lambda blob_name: _FakeBlob(self, blob_name),
+            get_blob=lambda blob_name: _FakeBlob(self, blob_name).metadata(),
+        )
+
+    def transfer(self, num_bytes: int):
+        """Blocks for one request moving `num_bytes`."""
+        self._sampler.sleep(_distribution(self.latency))
+        if self.bandwidth_mbps:
+            time.sleep(num_bytes * 8 / (self.bandwidth_mbps * 1e6))
+
+
+class _FakeBlob:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def exists(self):
+        self.client.transfer(0)
+        return self.name in self.client.objects or self.name in self.client.remote_sizes
+
+    def metadata(self):
+        """Like `Bucket.get_blob`: the object's hash and size, or None if missing."""
+        if self.name in self.client.objects:
+            data = self.client.objects[self.name][0]
+            md5_hash = base64.b64encode(hashlib.md5(data).digest()).decode()
+            return SimpleNamespace(name=self.name, md5_hash=md5_hash, crc32c=None, size=len(data))
+        if self.name in self.client.remote_sizes:
+            size = self.client.remote_sizes[self.name]
+            return SimpleNamespace(name=self.name, md5_hash=self.name, crc32c=None, size=size)
+        return None
+
+    def upload_from_string(self, data, content_type=None, if_generation_match=None):
+        self.client.transfer(len(data))
+        if if_generation_match == 0 and self.metadata() is not None:
+            raise PreconditionFailed(self.name)
+        self.client.uploads += 1
+        self.client.objects[self.name] = (bytes(data), content_type)
+
+    def upload_from_file(self, file_obj, content_type=None, rewind=False):
+        # Like a resumable upload: read and send one chunk at a time.
+        if rewind:
+            file_obj.seek(0)
+        chunks = []
+        size = 0
+        while chunk := file_obj.read(getattr(self, "chunk_size", None) or (1 << 20)):
+            self.client.transfer(len(chunk))
+            size += len(chunk)
+            if self.client.keep_streamed_bytes:
+                chunks.append(chunk)
+        self.client.uploads += 1
+        if self.client.keep_streamed_bytes:
+            self.client.objects[self.name] = (b"".join(chunks), content_type)
+        else:
+            self.client.remote_sizes[self.name] = size
+
+    def download_as_bytes(self):
+        if self.name in self.client.remote_sizes:
+            self.client.transfer(self.client.remote_sizes[self.name])
+            # Touch every page so the payload really counts towards RSS.
+            return b"\x01" * self.client.remote_sizes[self.name]
+        if self.name not in self.client.objects:
+            raise NotFound(self.name)
+        data = self.client.objects[self.name][0]
+        self.client.transfer(len(data))
+        return data
+
+
+class _FakeOperations:
+    """Operations finish `video_duration` after submission.
+
+    A prompt containing "filtered" ends with no videos and an RAI reason;
+    one containing "empty" ends with entries that hold no clip.
+    """
+
+    def __init__(self, models):
+        self.models = models
+
+    def get(self, operation):
+        if time.monotonic() < operation.ready_at:
+            return operation
+        filtered = "filtered" in operation.prompt
+        if filtered:
+            videos = []
+        elif "empty" in operation.prompt:
+            videos = [SimpleNamespace(video=None), SimpleNamespace(video=types.Video())]
+        elif operation.video_uri:
+            videos = [SimpleNamespace(video=types.Video(uri=operation.video_uri, mime_type="video/mp4"))]
+        else:
+            # Without an output location VEO returns the clip inline.
+            video = types.Video(video_bytes=self.models.video(), mime_type="video/mp4")
+            videos = [SimpleNamespace(video=video)]
+        return SimpleNamespace(
+            name=operation.name,
+            done=True,
+            error=None,
+            response=True,
+            result=SimpleNamespace(
+                generated_videos=videos,
+                rai_media_filtered_count=int(filtered),
+                rai_media_filtered_reasons=["unsafe"] if filtered else None,
+            ),
+        )
+
+
+def _png(size: int = 1024) -> bytes:
+    output = io.BytesIO()
+    Image.linear_gradient("L").resize((size, size)).convert("RGB").save(output, "PNG")
+    return output.getvalue()
+
+
+class _FakeModels:
+    def __init__(
+        self, storage, latency, video_duration, video_bytes, image_size, image_bytes, sampler
+    ):
+        self.storage = storage
+        # Latency and video duration may be replaced by plain numbers, e.g. by a test.
+        self.latency = latency
+        self.video_duration = video_duration
+        self.video_bytes = video_bytes
+        self.image_size = image_size
+        self.sampler = sampler
+        # A real PNG by default, so previews and normalization do their real work.
+        self.image_bytes = image_bytes if image_bytes is not None else _png()
+        self.calls = 0
+
+    def image(self) -> bytes:
+        """Returns a decodable PNG of the sampled size; decoders ignore the padding."""
+        if self.image_size is None:
+            return self.image_bytes
+        padding = self.sampler.size(self.image_size) - len(self.image_bytes)
+        return self.image_bytes + b"\0" * max(0, padding)
+
+    def video(self) -> bytes:
+        """Returns a clip of the sampled size, or a short placeholder without one."""
+        if self.video_bytes is None:
+            return b"fake mp4"
+        return b"\x01" * self.sampler.size(self.video_bytes)
+
+    def _call(self):
+        self.calls += 1
+        self.sampler.sleep(_distribution(self.latency))
+
+    def recontext_image(self, model, source, config):
+        self._call()
+        images = [
+            SimpleNamespace(image=SimpleNamespace(image_bytes=self.image()))
+            for _ in range(config.number_of_images or 1)
+        ]
+        return SimpleNamespace(generated_images=images)
+
+    def generate_content(self, model, contents, config):
+        self._call()
+        part = types.Part.from_bytes(data=self.image(), mime_type="image/png")
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+    def generate_videos(self, model, prompt, image, config):
+        self._call()
+        if "boom" in prompt:
+            raise RuntimeError("VEO unavailable")
+        video_uri = None
+        if config.output_gcs_uri:
+            blob_name = f"videos/{uuid.uuid4()}.mp4"
+            video_uri = f"{config.output_gcs_uri}/{blob_name}"
+            if self.video_bytes is None:
+                self.storage.objects[blob_name] = (self.video(), "video/mp4")
+            else:
+                self.storage.remote_sizes[blob_name] = self.sampler.size(self.video_bytes)
+        duration = _distribution(self.video_duration).sample(self.sampler.rng)
+        return SimpleNamespace(
+            name=f"operations/{uuid.uuid4()}",
+            done=False,
+            prompt=prompt,
+            ready_at=time.monotonic() + duration,
+            video_uri=video_uri,
+        )
+
+
+class FakeGenAIClient:
+    """Fake of `genai.Client` for try-on, image edits and VEO.
+
+    A VEO prompt containing "boom" fails on submission; see `_FakeOperations`
+    for the prompts that end without a usable clip.
+
+    Args:
+        storage (FakeStorageClient): Where generated videos are "written".
+        latency: Time of each model call.
+        video_duration: Time a VEO operation takes to finish.
+        video_bytes: Size of each generated video; a short placeholder if None.
+        image_size: Size of each generated image; `image_bytes` as is if None.
+        image_bytes (bytes, optional): The generated image; a 1024px PNG if None.
+        seed (int, optional): Seed of the sampled latencies and sizes.
+    """
+
+    def __init__(
+        self,
+        storage,
+        latency: Sampled = 0.0,
+        video_duration: Sampled = 0.1,
+        video_bytes: Optional[Sampled] = 8 << 20,
+        image_size: Optional[Sampled] = None,
+        image_bytes: Optional[bytes] = None,
+        seed: Optional[int] = None,
+    ):
+        self.models = _FakeModels(
+            storage,
+            latency,
+            video_duration,
+            _distribution(video_bytes) if video_bytes is not None else None,
+            _distribution(image_size) if image_size is not None else None,
+            image_bytes,
+            _Sampler(seed),
+        )
+        self.operations = _FakeOperations(self.models)
+
+
+def install(genai_client, storage_client):
+    """Points the tools module at the given fake clients."""
+    backend = GCSStorageBackend(storage_client)
+    tools.get_genai_client = lambda *args, **kwargs: genai_client
+    tools.get_storage_backend = lambda: backend
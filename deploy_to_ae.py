@@ -28,7 +28,7 @@ print(env_vars)
 # create the app
 
 my_agent = agent_engines.AdkApp(
-    agent=agent.root_agent,
+    app=agent.app,
     enable_tracing=True,
     # env_vars=env_vars,
 )
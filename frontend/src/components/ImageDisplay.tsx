@@ -2,15 +2,23 @@ import { useEffect, useState } from 'react'
 
 interface ImageDisplayProps {
   src: string
+  // Shown instead if src fails to load, e.g. a preview in a private bucket
+  fallbackSrc?: string
   alt?: string
   className?: string
 }
 
-export function ImageDisplay({ src, alt, className }: ImageDisplayProps) {
+export function ImageDisplay({ src, fallbackSrc, alt, className }: ImageDisplayProps) {
+  const [currentSrc, setCurrentSrc] = useState<string>(src)
   const [imageSrc, setImageSrc] = useState<string>('')
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
+    setCurrentSrc(src)
+  }, [src])
+
+  useEffect(() => {
+    const src = currentSrc
     const loadImage = async () => {
       setLoading(true)
       
@@ -54,7 +62,14 @@ export function ImageDisplay({ src, alt, className }: ImageDisplayProps) {
     }
 
     loadImage()
-  }, [src])
+  }, [currentSrc])
+
+  const handleError = () => {
+    if (fallbackSrc && currentSrc !== fallbackSrc) {
+      console.warn('Image failed to load, falling back to:', fallbackSrc)
+      setCurrentSrc(fallbackSrc)
+    }
+  }
 
   if (loading) {
     return (
@@ -64,5 +79,5 @@ export function ImageDisplay({ src, alt, className }: ImageDisplayProps) {
     )
   }
 
-  return <img src={imageSrc} alt={alt} className={className} />
+  return <img src={imageSrc} alt={alt} className={className} onError={handleError} />
 }
\ No newline at end of file
@@ -15,6 +15,7 @@ interface ImageEditorProps {
 export function ImageEditor({ initialImage, sessionId }: ImageEditorProps) {
   const [prompt, setPrompt] = useState('')
   const [result, setResult] = useState<string | null>(null)
+  const [fullResult, setFullResult] = useState<string | null>(null)
   const { sendToAgent, loading, error } = useADKAPI(sessionId || undefined)
 
   const handleRecontextualize = async () => {
@@ -25,6 +26,7 @@ export function ImageEditor({ initialImage, sessionId }: ImageEditorProps) {
       const data = await sendToAgent(message)
       
       setResult(data.image_url)
+      setFullResult(data.full_image_url ?? data.image_url)
     } catch (err) {
       // Error is already set by the hook
       console.error('Recontextualization failed:', err)
@@ -32,9 +34,9 @@ export function ImageEditor({ initialImage, sessionId }: ImageEditorProps) {
   }
 
   const handleDownload = () => {
-    if (result) {
+    if (fullResult) {
       const link = document.createElement('a')
-      link.href = result
+      link.href = fullResult
       link.download = 'edited-image.png'
       link.click()
     }
@@ -119,6 +121,7 @@ export function ImageEditor({ initialImage, sessionId }: ImageEditorProps) {
               <div className="space-y-4">
                 <ImageDisplay
                   src={result}
+                  fallbackSrc={fullResult ?? undefined}
                   alt="Edited result"
                   className="w-full rounded-lg"
                 />
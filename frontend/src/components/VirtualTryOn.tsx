@@ -15,6 +15,7 @@ export function VirtualTryOn({ onComplete, sessionId }: VirtualTryOnProps) {
   const [personImage, setPersonImage] = useState<File | null>(null)
   const [productImage, setProductImage] = useState<File | null>(null)
   const [result, setResult] = useState<string | null>(null)
+  const [fullResult, setFullResult] = useState<string | null>(null)
   const { sendToAgent, loading, error, sessionId: currentSessionId } = useADKAPI(sessionId || undefined)
 
   const handleGenerate = async () => {
@@ -31,9 +32,12 @@ export function VirtualTryOn({ onComplete, sessionId }: VirtualTryOnProps) {
       console.log('VirtualTryOn - sessionId from response:', data.sessionId)
       
       setResult(data.image_url)
+      setFullResult(data.full_image_url ?? data.image_url)
       if (data.image_url && data.sessionId) {
-        console.log('VirtualTryOn - calling onComplete with:', data.image_url, data.sessionId)
-        onComplete(data.image_url, data.sessionId)
+        // The editor shows the full image, which needs no bucket access
+        const imageUrl = data.full_image_url ?? data.image_url
+        console.log('VirtualTryOn - calling onComplete with:', imageUrl, data.sessionId)
+        onComplete(imageUrl, data.sessionId)
       } else if (data.image_url) {
         console.error('VirtualTryOn - No session ID in response')
       }
@@ -100,6 +104,7 @@ export function VirtualTryOn({ onComplete, sessionId }: VirtualTryOnProps) {
             {result ? (
               <ImageDisplay
                 src={result}
+                fallbackSrc={fullResult ?? undefined}
                 alt="Virtual try-on result"
                 className="w-full rounded-lg"
               />
@@ -3,6 +3,14 @@ import { useState, useRef, useEffect } from 'react'
 const USER_ID = 'u_999'
 const APP_NAME = 'obelisk_recontext_agent'
 
+// Generated images come with small WebP previews; show one instead of the full PNG.
+// The direct URL only loads from buckets the browser can read, so ImageDisplay
+// falls back to full_image_url, the artifact served by the backend.
+const previewUrl = (response: any): string | undefined => {
+  const uri: string | undefined = response?.previews?.[0]?.preview
+  return uri?.replace('gs://', 'https://storage.googleapis.com/')
+}
+
 export function useADKAPI(sharedSessionId?: string) {
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
@@ -133,7 +141,7 @@ export function useADKAPI(sharedSessionId?: string) {
                 const filename = toolResponse.response.image_filenames[0]
                 console.log('Found edited image filename:', filename)
                 const artifactUrl = `/api/apps/${APP_NAME}/users/${USER_ID}/sessions/${sessionIdRef.current}/artifacts/${filename}`
-                return { image_url: artifactUrl, sessionId: sessionIdRef.current }
+                return { image_url: previewUrl(toolResponse.response) ?? artifactUrl, full_image_url: artifactUrl, sessionId: sessionIdRef.current }
               }
             }
           }
@@ -234,7 +242,7 @@ export function useADKAPI(sharedSessionId?: string) {
                 const filename = response.image_filenames[0]
                 console.log('Found edited image in tool_calls:', filename)
                 const artifactUrl = `/api/apps/${APP_NAME}/users/${USER_ID}/sessions/${sessionIdRef.current}/artifacts/${filename}`
-                return { image_url: artifactUrl, sessionId: sessionIdRef.current }
+                return { image_url: previewUrl(response) ?? artifactUrl, full_image_url: artifactUrl, sessionId: sessionIdRef.current }
               }
               // Check for array of URLs
               if (Array.isArray(response) && response.length > 0) {
@@ -255,7 +263,7 @@ export function useADKAPI(sharedSessionId?: string) {
                 const filename = response.image_filenames[0]
                 console.log('Found edited image in toolCalls:', filename)
                 const artifactUrl = `/api/apps/${APP_NAME}/users/${USER_ID}/sessions/${sessionIdRef.current}/artifacts/${filename}`
-                return { image_url: artifactUrl, sessionId: sessionIdRef.current }
+                return { image_url: previewUrl(response) ?? artifactUrl, full_image_url: artifactUrl, sessionId: sessionIdRef.current }
               }
               // Check for array of URLs
               if (Array.isArray(response) && response.length > 0) {
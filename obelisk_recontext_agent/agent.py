@@ -1,4 +1,8 @@
+import os
+
 from google.adk.agents import Agent
+from google.adk.agents.context_cache_config import ContextCacheConfig
+from google.adk.apps import App
 from .prompts import (
     ROOT_INSTRUCTION,
     VEO3_INSTR,
@@ -9,29 +13,58 @@ from .tools import (
     edit_image,
     before_agent_get_user_file,
     generate_video,
+    generate_video_shots,
     generate_virtual_try_on_images,
 )
+from .profiles import get_profile, latency_profile_callback
 from google.genai import types
 from google.adk.tools import load_artifacts
 from google.adk.planners import BuiltInPlanner
 from google.genai import types  # For types.Content
 
+# Gemini context caching of the agents' instructions and tool declarations.
+# ADK caches them in the model's own client once a session has made a request
+# of at least PROMPT_CACHE_MIN_TOKENS, and recreates the cache every
+# PROMPT_CACHE_INTERVALS invocations or when the prompt changes.
+PROMPT_CACHE_ENABLED = os.getenv("OBELISK_PROMPT_CACHE", "1") == "1"
+PROMPT_CACHE_TTL = int(os.getenv("OBELISK_PROMPT_CACHE_TTL", "3600"))
+PROMPT_CACHE_INTERVALS = int(os.getenv("OBELISK_PROMPT_CACHE_INTERVALS", "10"))
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("OBELISK_PROMPT_CACHE_MIN_TOKENS", "0"))
+
+
+def prompt_cache_config(enabled: bool = PROMPT_CACHE_ENABLED):
+    """Returns the app's context cache config, or None to leave caching off."""
+    if not enabled:
+        return None
+    return ContextCacheConfig(
+        ttl_seconds=PROMPT_CACHE_TTL,
+        cache_intervals=PROMPT_CACHE_INTERVALS,
+        min_tokens=PROMPT_CACHE_MIN_TOKENS,
+    )
+
+
+# Deployment default; sessions may override it, see profiles.py
+profile = get_profile()
+
 visual_generator = Agent(
-    model="gemini-2.5-pro",
+    model=profile.visual_generator.model,
     name="visual_generator",
     description="Generate final visuals using image and video generation tools",
-    planner=BuiltInPlanner(thinking_config=types.ThinkingConfig(include_thoughts=True)),
+    planner=BuiltInPlanner(thinking_config=profile.visual_generator.thinking_config()),
     instruction=VISUAL_GENERATOR_INSTRUCTIONS + VEO3_INSTR,
-    tools=[generate_video],
-    generate_content_config=types.GenerateContentConfig(temperature=1.2),
+    tools=[generate_video_shots, generate_video],
+    generate_content_config=types.GenerateContentConfig(
+        temperature=profile.visual_generator.temperature
+    ),
+    before_model_callback=latency_profile_callback("visual_generator"),
 )
 
 
 root_agent = Agent(
-    model="gemini-2.5-flash",
+    model=profile.root.model,
     name="product_recontextualiztion_agent",
     description="An agent that recontextualizes product images into new scenes based on a prompt.",
-    planner=BuiltInPlanner(thinking_config=types.ThinkingConfig(include_thoughts=True)),
+    planner=BuiltInPlanner(thinking_config=profile.root.thinking_config()),
     global_instruction=GLOBAL_INSTRUCTIONS,
     instruction=ROOT_INSTRUCTION,
     tools=[
@@ -41,10 +74,16 @@ root_agent = Agent(
     ],
     sub_agents=[visual_generator],
     generate_content_config=types.GenerateContentConfig(
-        temperature=1.0,
+        temperature=profile.root.temperature,
     ),
     before_agent_callback=before_agent_get_user_file,
+    before_model_callback=latency_profile_callback("root"),
 )
 
-# Export the agent for ADK
+# Export the agent for ADK; `adk web` and `adk api_server` load `app` first
 agent = root_agent
+app = App(
+    name="obelisk_recontext_agent",
+    root_agent=root_agent,
+    context_cache_config=prompt_cache_config(),
+)
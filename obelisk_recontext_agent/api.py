@@ -1,13 +1,27 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-import os
-import tempfile
-from typing import Optional
-from .agent import ObeliskRecontextAgent
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+import json
+from . import tools
+from .batch import BatchItem, BatchReport, run_batch
+from .context import StandaloneToolContext
+from .jobs import Job, JobManager, QueueFullError
+from .pipeline import PipelineRequest, run_pipeline
+from .uploads import UploadError, stage_multipart_images
 
-app = FastAPI(title="Obelisk Virtual Try-On API")
+job_manager = JobManager()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await job_manager.start()
+    yield
+    await job_manager.stop()
+
+
+app = FastAPI(title="Obelisk Virtual Try-On API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -18,81 +32,188 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Agent will be initialized on first use
-agent = None
-
-def get_agent():
-    global agent
-    if agent is None:
-        agent = ObeliskRecontextAgent(
-            project_id=os.environ.get("GOOGLE_CLOUD_PROJECT"),
-            location=os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1"),
-            gcs_bucket=os.environ.get("BUCKET"),
-        )
-    return agent
-
 class RecontextualizeRequest(BaseModel):
     image_url: str
     prompt: str
 
+
+class PipelineBody(BaseModel):
+    person_uri: str
+    product_uri: str
+    edit_prompts: list[str] = []
+    video_prompts: list[str] = []
+    negative_prompt: str = ""
+    number_of_images: int = Field(default=1, ge=1, le=tools.MAX_TRY_ON_IMAGES)
+
+
+class BatchBody(BaseModel):
+    items: list[dict]
+    concurrency: int = Field(default=8, ge=1)
+
+
+def _job_context(job: Job) -> StandaloneToolContext:
+    """Tool context that reports every saved artifact as a job progress event."""
+    return StandaloneToolContext(
+        on_artifact=lambda filename, part: job.publish("artifact", filename=filename),
+    )
+
+
+def _accepted(job: Job) -> JSONResponse:
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/api/jobs/{job.id}",
+            "events_url": f"/api/jobs/{job.id}/events",
+        },
+    )
+
+
+def _submit(kind: str, run) -> JSONResponse:
+    try:
+        return _accepted(job_manager.submit(kind, run))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
 @app.get("/")
 async def root():
     return {"message": "Obelisk Virtual Try-On API"}
 
 @app.post("/api/virtual-try-on")
-async def virtual_try_on(
-    person_image: UploadFile = File(...),
-    product_image: UploadFile = File(...)
-):
-    """Generate a virtual try-on image"""
+async def virtual_try_on(request: Request):
+    """Queue a virtual try-on job and return its id
+
+    Takes multipart fields person_image, product_image and optionally
+    number_of_images. The images are streamed to the bucket as they arrive.
+    """
     try:
-        # Save uploaded files temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as person_tmp:
-            person_tmp.write(await person_image.read())
-            person_path = person_tmp.name
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as product_tmp:
-            product_tmp.write(await product_image.read())
-            product_path = product_tmp.name
-        
-        # Generate virtual try-on
-        result = get_agent().generate_virtual_try_on_images(
-            person_image_path=person_path,
-            product_image_path=product_path,
-            number_of_images=1
+        uris, fields = await stage_multipart_images(
+            request, {"person_image", "product_image"}
+        )
+        number_of_images = int(fields.get("number_of_images", 1))
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="number_of_images must be an integer")
+    if not 1 <= number_of_images <= tools.MAX_TRY_ON_IMAGES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"number_of_images must be between 1 and {tools.MAX_TRY_ON_IMAGES}",
         )
-        
-        # Clean up temp files
-        os.unlink(person_path)
-        os.unlink(product_path)
-        
-        if result and len(result) > 0:
-            return JSONResponse(content={"image_url": result[0]})
-        else:
-            raise HTTPException(status_code=500, detail="Failed to generate virtual try-on")
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+    async def run(job: Job) -> dict:
+        return await tools.generate_virtual_try_on_images(
+            person_uri=uris["person_image"],
+            product_uri=uris["product_image"],
+            number_of_images=number_of_images,
+            tool_context=_job_context(job),
+        )
+
+    return _submit("virtual_try_on", run)
 
 @app.post("/api/recontextualize")
 async def recontextualize(request: RecontextualizeRequest):
-    """Recontextualize image background"""
-    try:
-        # Download image from URL or use local path
-        result = get_agent().recontext_image_background(
-            image_path=request.image_url,
+    """Queue an image edit job and return its id"""
+
+    async def run(job: Job) -> dict:
+        return await tools.edit_image(
             prompt=request.prompt,
-            number_of_images=1
+            tool_context=_job_context(job),
+            image_uri=tools.normalize_uri(request.image_url),
         )
-        
-        if result and len(result) > 0:
-            return JSONResponse(content={"image_url": result[0]})
+
+    return _submit("recontextualize", run)
+
+@app.post("/api/pipeline")
+async def pipeline(request: PipelineBody):
+    """Queue a try-on -> edit -> video pipeline job that runs without the agent
+
+    Each finished stage is reported as a `stage` event with its duration.
+    """
+
+    async def run(job: Job) -> dict:
+        result = await run_pipeline(
+            PipelineRequest(
+                person_uri=tools.normalize_uri(request.person_uri),
+                product_uri=tools.normalize_uri(request.product_uri),
+                edit_prompts=request.edit_prompts,
+                video_prompts=request.video_prompts,
+                negative_prompt=request.negative_prompt,
+                number_of_images=request.number_of_images,
+            ),
+            tool_context=_job_context(job),
+            on_stage=lambda timing: job.publish(
+                "stage",
+                stage=timing.stage,
+                status=timing.status,
+                duration_s=round(timing.duration_s, 3),
+            ),
+        )
+        return result.to_dict()
+
+    return _submit("pipeline", run)
+
+@app.post("/api/batch")
+async def batch(request: BatchBody):
+    """Queue a virtual try-on job over a list of person/product pairs
+
+    Items have the fields of a batch manifest line. Each finished item is
+    reported as an `item` event with the progress and throughput so far.
+    """
+    try:
+        items = [BatchItem(**item) for item in request.items]
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid batch item: {e}")
+
+    async def run(job: Job) -> dict:
+        def on_item(record: dict, report: BatchReport) -> None:
+            summary = report.summary()
+            job.publish(
+                "item",
+                id=record["id"],
+                status=record["status"],
+                latency_s=record["latency_s"],
+                done=summary["completed"] + summary["failed"],
+                total=summary["total"] - summary["skipped"],
+                images_per_min=summary["images_per_min"],
+            )
+
+        report = await run_batch(items, concurrency=request.concurrency, on_item=on_item)
+        summary = report.summary()
+        if not summary["failed"]:
+            status = "complete"
+        elif summary["completed"]:
+            status = "partial"
         else:
-            raise HTTPException(status_code=500, detail="Failed to recontextualize image")
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+            status = "error"
+            summary["error"] = f"All {summary['failed']} items failed"
+        return {"status": status, **summary}
+
+    return _submit("batch", run)
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Return the status, progress events and result of a job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Stream the progress events of a job as server-sent events"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        async for event in job.stream():
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
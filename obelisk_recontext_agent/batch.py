@@ -0,0 +1,197 @@
+"""Catalog-scale batch runner for virtual try-on.
+
+Runs a manifest of person/product pairs through `generate_virtual_try_on_images`
+with bounded concurrency, outside of any agent conversation. Every finished item
+is appended to a JSONL checkpoint, so an interrupted run resumes where it
+stopped.
+
+Manifest lines are JSON objects (a `.csv` manifest with the same column names
+also works):
+
+    {"person_uri": "gs://bucket/models/a.png", "product_uri": "gs://bucket/products/1.png"}
+
+Optional fields are `id` (defaults to a hash of the pair) and `number_of_images`.
+
+Usage:
+    python -m obelisk_recontext_agent.batch manifest.jsonl --checkpoint progress.jsonl
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import os
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+from . import tools
+from .context import StandaloneToolContext
+from .scheduler import BATCH, request_priority
+
+
+@dataclass
+class BatchItem:
+    person_uri: str
+    product_uri: str
+    number_of_images: int = 1
+    id: str = ""
+
+    def __post_init__(self):
+        self.number_of_images = int(self.number_of_images)
+        if not self.id:
+            pair = f"{self.person_uri}|{self.product_uri}|{self.number_of_images}"
+            self.id = hashlib.sha256(pair.encode()).hexdigest()[:16]
+
+
+@dataclass
+class BatchReport:
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    images: int = 0
+    elapsed_s: float = 0.0
+    latencies_s: list[float] = field(default_factory=list)
+
+    def summary(self) -> dict[str, Any]:
+        latencies = sorted(self.latencies_s)
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "images": self.images,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "images_per_min": round(self.images / self.elapsed_s * 60, 2)
+            if self.elapsed_s
+            else 0.0,
+            "latency_p50_s": round(statistics.median(latencies), 3) if latencies else None,
+            "latency_p95_s": round(latencies[int(0.95 * (len(latencies) - 1))], 3)
+            if latencies
+            else None,
+        }
+
+
+def load_manifest(path: str) -> list[BatchItem]:
+    """Reads batch items from a JSONL or CSV manifest."""
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            rows: Iterable[dict] = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        return [BatchItem(**row) for row in rows]
+
+
+def load_checkpoint(path: Optional[str]) -> set[str]:
+    """Returns the ids of items that completed successfully in earlier runs."""
+    if not path or not os.path.exists(path):
+        return set()
+    done = set()
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if record.get("status") == "complete":
+                    done.add(record["id"])
+    return done
+
+
+async def run_batch(
+    items: list[BatchItem],
+    concurrency: int = 8,
+    checkpoint_path: Optional[str] = None,
+    on_item: Optional[Callable[[dict, BatchReport], None]] = None,
+) -> BatchReport:
+    """Runs virtual try-on for every item not already completed in the checkpoint.
+
+    Args:
+        items (list[BatchItem]): The person/product pairs to render.
+        concurrency (int): The maximum number of try-on calls in flight.
+        checkpoint_path (str, optional): JSONL file that records finished items.
+        on_item (Callable, optional): Called with the checkpoint record of each
+            finished item and the report so far, e.g. to publish progress.
+
+    Returns:
+        BatchReport: Counts, throughput and per-item latencies of this run.
+    """
+    done = load_checkpoint(checkpoint_path)
+    report = BatchReport(total=len(items))
+    pending = [item for item in items if item.id not in done]
+    report.skipped = len(items) - len(pending)
+    semaphore = asyncio.Semaphore(concurrency)
+    checkpoint = open(checkpoint_path, "a") if checkpoint_path else None
+    batch_start = time.perf_counter()
+
+    async def run_item(item: BatchItem):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await tools.generate_virtual_try_on_images(
+                    person_uri=item.person_uri,
+                    product_uri=item.product_uri,
+                    number_of_images=item.number_of_images,
+                    tool_context=StandaloneToolContext(),
+                ) or {"Error": "No images generated"}
+            except Exception as e:
+                result = {"Error": str(e)}
+            latency = time.perf_counter() - start
+        image_uris = result.get("image_uris", [])
+        status = "complete" if result.get("status") == "complete" and image_uris else "error"
+        record = {
+            "id": item.id,
+            "person_uri": item.person_uri,
+            "product_uri": item.product_uri,
+            "status": status,
+            "image_uris": image_uris,
+            "latency_s": round(latency, 3),
+        }
+        if status == "complete":
+            report.completed += 1
+            report.images += len(image_uris)
+            report.latencies_s.append(latency)
+        else:
+            report.failed += 1
+            record["error"] = result.get("Error") or result.get("failures")
+            logging.warning(f"Batch item {item.id} failed: {record['error']}")
+        if checkpoint:
+            checkpoint.write(json.dumps(record) + "\n")
+            checkpoint.flush()
+        if on_item:
+            report.elapsed_s = time.perf_counter() - batch_start
+            on_item(record, report)
+
+    # Interactive sessions sharing this process go ahead of catalog work.
+    token = request_priority.set(BATCH)
+    try:
+        await asyncio.gather(*(run_item(item) for item in pending))
+    finally:
+        request_priority.reset(token)
+        report.elapsed_s = time.perf_counter() - batch_start
+        if checkpoint:
+            checkpoint.close()
+    return report
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Run virtual try-on over a manifest.")
+    parser.add_argument("manifest", help="JSONL or CSV file of person/product pairs")
+    parser.add_argument(
+        "--checkpoint",
+        help="JSONL progress file; completed items in it are skipped",
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    items = load_manifest(args.manifest)
+    report = asyncio.run(
+        run_batch(items, concurrency=args.concurrency, checkpoint_path=args.checkpoint)
+    )
+    print(json.dumps(report.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Persistent caches of generated asset URIs.
+
+A `ResultCache` maps a key derived from the content of a tool's inputs (plus the
+model id and config) to the gs:// URIs the tool produced for it. Entries live in
+a local-disk tier with LRU eviction by total size and, optionally, in a shared
+tier in the storage backend (Cloud Storage by default, see `storage_backends`)
+so every worker and batch job sees the same results.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+from google.api_core.exceptions import NotFound
+
+from .storage_backends import get_storage_backend
+
+CACHE_ROOT = os.environ.get(
+    "OBELISK_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "obelisk")
+)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    shared_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+def cache_key(**parts: Any) -> str:
+    """Returns a stable hex digest for the given JSON-serializable key parts."""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache of JSON-serializable results.
+
+    Args:
+        name (str): The cache name, used for the local directory and the GCS prefix.
+        max_bytes (int): Size budget of the local tier; least recently used
+            entries are evicted beyond it.
+        ttl (float, optional): Seconds after which an entry is treated as missing.
+        shared_bucket (str, optional): Bucket of the shared tier. Entries are
+            written to `cache/<name>/<key>.json` in it.
+        directory (str, optional): Directory of the local tier. Defaults to
+            `<OBELISK_CACHE_DIR>/<name>`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_bytes: int,
+        ttl: Optional[float] = None,
+        shared_bucket: Optional[str] = None,
+        directory: Optional[str] = None,
+    ):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.shared_bucket = shared_bucket
+        self.directory = directory or os.path.join(CACHE_ROOT, name)
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        # key -> entry size in bytes, least recently used first.
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._size = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value for a key, or None on a miss. Blocking."""
+        value = self._get_local(key)
+        if value is not None:
+            with self._lock:
+                self.stats.hits += 1
+            return value
+        if self.shared_bucket:
+            value = self._get_shared(key)
+            if value is not None:
+                self._put_local(key, value)
+                with self._lock:
+                    self.stats.hits += 1
+                    self.stats.shared_hits += 1
+                return value
+        with self._lock:
+            self.stats.misses += 1
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        """Stores a value in the local tier and, if configured, the shared tier. Blocking."""
+        self._put_local(key, value)
+        if self.shared_bucket:
+            try:
+                get_storage_backend().write(
+                    self.shared_bucket,
+                    self._blob_name(key),
+                    self._encode(value),
+                    content_type="application/json",
+                )
+            except Exception as e:
+                logging.warning(f"Failed to write shared {self.name} cache entry: {e}")
+
+    def snapshot(self) -> dict[str, Any]:
+        """Returns the hit/miss counters and local tier usage as a plain dict."""
+        with self._lock:
+            return {
+                **asdict(self.stats),
+                "entries": len(self._index),
+                "bytes": self._size,
+            }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _blob_name(self, key: str) -> str:
+        return f"cache/{self.name}/{key}.json"
+
+    def _encode(self, value: Any) -> bytes:
+        return json.dumps({"created": time.time(), "value": value}).encode()
+
+    def _decode(self, data: bytes) -> Optional[Any]:
+        entry = json.loads(data)
+        if self.ttl is not None and time.time() - entry["created"] > self.ttl:
+            return None
+        return entry["value"]
+
+    def _load_index(self):
+        entries = []
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".json"):
+                stat = os.stat(os.path.join(self.directory, filename))
+                entries.append((stat.st_mtime, filename[: -len(".json")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._size += size
+
+    def _get_local(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                value = self._decode(f.read())
+            if value is None:
+                self._remove(key)
+                return None
+            # The file mtime carries the LRU order across restarts.
+            os.utime(self._path(key))
+            return value
+        except (OSError, ValueError, KeyError):
+            self._remove(key)
+            return None
+
+    def _get_shared(self, key: str) -> Optional[Any]:
+        try:
+            data = get_storage_backend().read(self.shared_bucket, self._blob_name(key))
+            return self._decode(bytes(data))
+        except NotFound:
+            return None
+        except Exception as e:
+            logging.warning(f"Failed to read shared {self.name} cache entry: {e}")
+            return None
+
+    def _put_local(self, key: str, value: Any):
+        data = self._encode(value)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._size += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            evicted = []
+            while self._size > self.max_bytes and len(self._index) > 1:
+                old_key, size = self._index.popitem(last=False)
+                self._size -= size
+                self.stats.evictions += 1
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except FileNotFoundError:
+                pass
+
+    def _remove(self, key: str):
+        with self._lock:
+            self._size -= self._index.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+_caches: dict[str, ResultCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _shared_bucket() -> Optional[str]:
+    bucket = os.environ.get("BUCKET", "")
+    return bucket.replace("gs://", "").strip("/") or None
+
+
+def _get_cache(
+    name: str, env_prefix: str, max_bytes: int, ttl: Optional[float] = None
+) -> Optional[ResultCache]:
+    """Returns the named process-wide cache, configured from `<env_prefix>_*` variables."""
+    if os.environ.get(env_prefix, "1") == "0":
+        return None
+    with _caches_lock:
+        if name not in _caches:
+            shared = os.environ.get(f"{env_prefix}_SHARED", "0") == "1"
+            ttl_override = os.environ.get(f"{env_prefix}_TTL")
+            _caches[name] = ResultCache(
+                name,
+                max_bytes=int(os.environ.get(f"{env_prefix}_MAX_BYTES", max_bytes)),
+                ttl=float(ttl_override) if ttl_override else ttl,
+                shared_bucket=_shared_bucket() if shared else None,
+            )
+        return _caches[name]
+
+
+def get_try_on_cache() -> Optional[ResultCache]:
+    """Returns the virtual try-on result cache, or None if OBELISK_VTO_CACHE=0."""
+    return _get_cache("virtual_try_on", "OBELISK_VTO_CACHE", max_bytes=16 << 20)
+
+
+def get_edit_cache() -> Optional[ResultCache]:
+    """Returns the image edit result cache, or None if OBELISK_EDIT_CACHE=0.
+
+    Entries expire after a day by default since edits are sampled at temperature 1;
+    a hit deliberately replays the earlier sample.
+    """
+    return _get_cache("edit_image", "OBELISK_EDIT_CACHE", max_bytes=16 << 20, ttl=86400)
@@ -0,0 +1,130 @@
+"""Process-wide registry of long-lived GenAI and Cloud Storage clients.
+
+Building a `genai.Client` or `storage.Client` redoes credential discovery and
+opens fresh TLS connections, so the tools share one client per
+(project, location) for the lifetime of the process instead. Both SDKs are
+synchronous, so calls into them go through `run_blocking`, which runs them on a
+bounded thread pool and keeps the ADK event loop free for other sessions.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import requests
+from google import genai
+from google.cloud import storage
+
+DEFAULT_PROJECT = os.environ.get("GOOGLE_CLOUD_PROJECT", "wortz-project-352116")
+DEFAULT_LOCATION = os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1")
+# Size of the urllib3 pool behind each storage client; the requests default of
+# 10 is smaller than the number of uploads a busy worker has in flight.
+STORAGE_POOL_SIZE = int(os.environ.get("OBELISK_STORAGE_POOL_SIZE", "32"))
+# Upper bound on blocking SDK calls (model calls, GCS transfers) in flight.
+IO_WORKERS = int(os.environ.get("OBELISK_IO_WORKERS", "32"))
+
+_lock = threading.Lock()
+_genai_clients: dict[tuple[str, str], genai.Client] = {}
+_storage_clients: dict[tuple[str, str], storage.Client] = {}
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_genai_client(
+    project: Optional[str] = None, location: Optional[str] = None
+) -> genai.Client:
+    """Returns the shared Vertex AI GenAI client for a project and location.
+
+    Args:
+        project (str, optional): The GCP project. Defaults to GOOGLE_CLOUD_PROJECT.
+        location (str, optional): The Vertex AI location. Defaults to GOOGLE_CLOUD_LOCATION.
+
+    Returns:
+        genai.Client: A client that is created once and reused by every caller.
+    """
+    key = (
+        project or os.environ.get("GOOGLE_CLOUD_PROJECT", DEFAULT_PROJECT),
+        location or os.environ.get("GOOGLE_CLOUD_LOCATION", DEFAULT_LOCATION),
+    )
+    client = _genai_clients.get(key)
+    if client is None:
+        with _lock:
+            client = _genai_clients.get(key)
+            if client is None:
+                logging.info(f"Creating GenAI client for {key}")
+                client = genai.Client(vertexai=True, project=key[0], location=key[1])
+                _genai_clients[key] = client
+    return client
+
+
+def get_storage_client(
+    project: Optional[str] = None, location: Optional[str] = None
+) -> storage.Client:
+    """Returns the shared Cloud Storage client for a project.
+
+    Args:
+        project (str, optional): The GCP project. Defaults to GOOGLE_CLOUD_PROJECT,
+            or to the project of the default credentials when that is unset.
+        location (str, optional): Only part of the registry key, storage clients
+            are not regional.
+
+    Returns:
+        storage.Client: A client with an enlarged connection pool that is created
+        once and reused by every caller.
+    """
+    key = (
+        project or os.environ.get("GOOGLE_CLOUD_PROJECT", ""),
+        location or os.environ.get("GOOGLE_CLOUD_LOCATION", DEFAULT_LOCATION),
+    )
+    client = _storage_clients.get(key)
+    if client is None:
+        with _lock:
+            client = _storage_clients.get(key)
+            if client is None:
+                logging.info(f"Creating storage client for {key}")
+                client = storage.Client(project=key[0] or None)
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=STORAGE_POOL_SIZE,
+                    pool_maxsize=STORAGE_POOL_SIZE,
+                )
+                client._http.mount("https://", adapter)
+                _storage_clients[key] = client
+    return client
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Returns the shared thread pool used for blocking SDK calls."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=IO_WORKERS, thread_name_prefix="obelisk-io"
+                )
+    return _executor
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Runs a blocking call on the shared executor without blocking the event loop.
+
+    Args:
+        func (Callable): The synchronous function to call.
+        *args: Positional arguments for `func`.
+        **kwargs: Keyword arguments for `func`.
+
+    Returns:
+        The return value of `func`.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(), call)
+
+
+def reset_clients() -> None:
+    """Drops every cached client, e.g. after a fork or when credentials change."""
+    with _lock:
+        _genai_clients.clear()
+        _storage_clients.clear()
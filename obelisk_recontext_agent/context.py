@@ -0,0 +1,43 @@
+"""Stand-in for the ADK ToolContext when tools run outside an agent session.
+
+The batch runner and the job API call the tool functions directly. They only
+need the parts of ToolContext the tools use: a mutable `state` dict and
+`save_artifact`/`load_artifact`.
+"""
+from typing import Any, Callable, Optional
+
+from google.genai import types
+
+
+class StandaloneToolContext:
+    """Minimal ToolContext with plain dict state.
+
+    Args:
+        artifacts (dict, optional): Input artifacts by filename, e.g. uploaded
+            images, returned by `load_artifact`.
+        keep_artifacts (bool): Whether saved artifacts are kept in memory. Tool
+            outputs already land in GCS, so long-running callers leave this off.
+        on_artifact (Callable, optional): Called with the filename and part of
+            every saved artifact, e.g. to report progress.
+    """
+
+    def __init__(
+        self,
+        artifacts: Optional[dict[str, types.Part]] = None,
+        keep_artifacts: bool = False,
+        on_artifact: Optional[Callable[[str, types.Part], None]] = None,
+    ):
+        self.state: dict[str, Any] = {}
+        self.artifacts = dict(artifacts or {})
+        self.keep_artifacts = keep_artifacts
+        self.on_artifact = on_artifact
+
+    async def save_artifact(self, filename: str, artifact: types.Part) -> int:
+        if self.keep_artifacts:
+            self.artifacts[filename] = artifact
+        if self.on_artifact:
+            self.on_artifact(filename, artifact)
+        return 0
+
+    async def load_artifact(self, filename: str, version: Optional[int] = None):
+        return self.artifacts.get(filename)
@@ -0,0 +1,212 @@
+"""Normalization of input images and preview renditions of generated ones.
+
+Phone photos are routinely 12 MP JPEGs with EXIF blocks, far above the
+resolution the try-on and edit models work at. `normalize_image` sniffs the
+real format from the bytes, downsizes to MAX_INPUT_DIMENSION, drops metadata
+and re-encodes. JPEGs are decoded at reduced scale in the DCT domain and
+resampled by Pillow's C kernels, so this is cheap, but it is still CPU-bound:
+call it through `run_blocking`, as with `render_previews`, which encodes the
+small WebP/JPEG renditions that clients display instead of full-size PNGs.
+"""
+import io
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+from PIL import Image, ImageOps
+
+# Longest edge, in pixels, of images sent to the models. Both models produce
+# outputs of about 1 MP, so larger inputs only cost upload time and tokens.
+MAX_INPUT_DIMENSION = int(os.getenv("OBELISK_MAX_INPUT_DIMENSION", "1536"))
+JPEG_QUALITY = int(os.getenv("OBELISK_INPUT_JPEG_QUALITY", "90"))
+
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"%PDF-", "application/pdf"),
+)
+# Metadata that is dropped on re-encode; the ICC profile is kept for color.
+_METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop")
+
+
+def sniff_mime_type(data: bytes) -> Optional[str]:
+    """Returns the MIME type indicated by the leading bytes of a file, if known."""
+    # Also accepts memoryviews, which have no startswith.
+    data = bytes(data[:16])
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:8] == b"ftyp" and data[8:12] in (b"heic", b"heix", b"mif1", b"avif"):
+        return "image/avif" if data[8:12] == b"avif" else "image/heic"
+    for signature, mime_type in _SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    return None
+
+
+@dataclass
+class NormalizedImage:
+    data: bytes
+    mime_type: str
+    original_bytes: int
+    original_size: tuple[int, int]
+    size: tuple[int, int]
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - len(self.data)
+
+
+@dataclass
+class NormalizationStats:
+    images: int = 0
+    resized: int = 0
+    original_bytes: int = 0
+    normalized_bytes: int = 0
+    cpu_s: float = 0.0
+    # Uploads of normalized images, to estimate the upload time saved.
+    uploaded_bytes: int = 0
+    upload_s: float = 0.0
+
+
+class _Stats:
+    def __init__(self):
+        self.stats = NormalizationStats()
+        self._lock = threading.Lock()
+
+    def record(self, image: NormalizedImage, cpu_s: float):
+        with self._lock:
+            self.stats.images += 1
+            self.stats.resized += image.size != image.original_size
+            self.stats.original_bytes += image.original_bytes
+            self.stats.normalized_bytes += len(image.data)
+            self.stats.cpu_s += cpu_s
+
+    def record_upload(self, num_bytes: int, seconds: float):
+        with self._lock:
+            self.stats.uploaded_bytes += num_bytes
+            self.stats.upload_s += seconds
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            stats = asdict(self.stats)
+        saved = stats["original_bytes"] - stats["normalized_bytes"]
+        throughput = (
+            stats["uploaded_bytes"] / stats["upload_s"] if stats["upload_s"] else None
+        )
+        return {
+            **stats,
+            "bytes_saved": saved,
+            # At the upload throughput observed for the normalized images.
+            "upload_time_saved_s": saved / throughput if throughput else None,
+        }
+
+
+normalization_stats = _Stats()
+
+
+def normalize_image(data: bytes, max_dimension: Optional[int] = None) -> NormalizedImage:
+    """Downsizes, strips metadata from and re-encodes an image. Blocking.
+
+    Images without transparency become JPEG, others PNG. An image that is
+    already a JPEG or PNG within `max_dimension` and without metadata is
+    returned unchanged, so normalizing twice never re-encodes twice.
+
+    Args:
+        data (bytes): The encoded input image, or a memoryview of it.
+        max_dimension (int, optional): Longest edge of the output. Defaults to
+            MAX_INPUT_DIMENSION.
+
+    Returns:
+        NormalizedImage: The encoded output with its sniffed MIME type and sizes.
+        Data Pillow cannot decode is returned unchanged.
+    """
+    max_dimension = max_dimension or MAX_INPUT_DIMENSION
+    start = time.process_time()
+    sniffed = sniff_mime_type(data) or "application/octet-stream"
+    try:
+        image = Image.open(io.BytesIO(data))
+        original_size = image.size
+    except Exception as e:
+        logging.warning(f"Not normalizing undecodable {sniffed} input: {e}")
+        return NormalizedImage(bytes(data), sniffed, len(data), (0, 0), (0, 0))
+
+    has_metadata = any(key in image.info for key in _METADATA_KEYS)
+    if (
+        max(original_size) <= max_dimension
+        and sniffed in ("image/jpeg", "image/png")
+        and not has_metadata
+    ):
+        normalized = NormalizedImage(
+            bytes(data), sniffed, len(data), original_size, original_size
+        )
+        normalization_stats.record(normalized, time.process_time() - start)
+        return normalized
+
+    icc_profile = image.info.get("icc_profile")
+    if image.format == "JPEG":
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when that is still large enough.
+        scale = min(1.0, max_dimension / max(original_size))
+        image.draft("RGB", (int(original_size[0] * scale), int(original_size[1] * scale)))
+    # Apply the EXIF orientation before the EXIF block is dropped.
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    output = io.BytesIO()
+    if has_alpha:
+        image.convert("RGBA").save(output, "PNG", optimize=True, icc_profile=icc_profile)
+        mime_type = "image/png"
+    else:
+        image.convert("RGB").save(
+            output, "JPEG", quality=JPEG_QUALITY, optimize=True, icc_profile=icc_profile
+        )
+        mime_type = "image/jpeg"
+    normalized = NormalizedImage(output.getvalue(), mime_type, len(data), original_size, image.size)
+    normalization_stats.record(normalized, time.process_time() - start)
+    return normalized
+
+
+# Preview renditions of generated images: name -> longest edge in pixels.
+PREVIEW_SIZES = json.loads(
+    os.getenv("OBELISK_PREVIEW_SIZES", '{"thumbnail": 256, "preview": 1024}')
+)
+# "webp" or "jpeg".
+PREVIEW_FORMAT = os.getenv("OBELISK_PREVIEW_FORMAT", "webp").lower()
+PREVIEW_QUALITY = int(os.getenv("OBELISK_PREVIEW_QUALITY", "80"))
+
+
+def preview_mime_type() -> str:
+    return f"image/{PREVIEW_FORMAT}"
+
+
+def render_previews(data: bytes) -> dict[str, bytes]:
+    """Encodes a downsized rendition of an image for every PREVIEW_SIZES entry. Blocking.
+
+    The image is decoded once and each smaller rendition is resampled from the
+    next larger one.
+
+    Args:
+        data (bytes): The encoded full-size image.
+
+    Returns:
+        dict: The encoded rendition for each preview name.
+    """
+    image = Image.open(io.BytesIO(data))
+    image = image.convert("RGBA" if PREVIEW_FORMAT == "webp" and "A" in image.getbands() else "RGB")
+    renditions = {}
+    for name, size in sorted(PREVIEW_SIZES.items(), key=lambda item: -item[1]):
+        image.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        output = io.BytesIO()
+        if PREVIEW_FORMAT == "webp":
+            image.save(output, "WEBP", quality=PREVIEW_QUALITY, method=4)
+        else:
+            image.convert("RGB").save(output, "JPEG", quality=PREVIEW_QUALITY, optimize=True)
+        renditions[name] = output.getvalue()
+    return renditions
@@ -0,0 +1,175 @@
+"""In-process job queue for long-running generation requests.
+
+HTTP handlers submit a job and return its id immediately. A fixed pool of
+worker tasks runs the jobs, so one server process bounds how many generations
+it has in flight instead of holding a connection and a worker per request.
+Progress is recorded as a list of events that clients can poll or stream. A
+job whose tool returned some but not all of its outputs ends as "partial".
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+# Number of jobs that run at the same time.
+JOB_WORKERS = int(os.environ.get("OBELISK_JOB_WORKERS", "16"))
+# Jobs accepted but not started yet before submissions are rejected.
+MAX_QUEUED_JOBS = int(os.environ.get("OBELISK_MAX_QUEUED_JOBS", "1000"))
+# Seconds a finished job stays available to clients.
+JOB_RETENTION = float(os.environ.get("OBELISK_JOB_RETENTION", "3600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+# Finished with some of its outputs, e.g. a video whose shots partly failed.
+PARTIAL = "partial"
+FAILED = "failed"
+
+# Tool response statuses of each finished job state.
+RESULT_STATUSES = {"complete": SUCCEEDED, "ok": SUCCEEDED, "partial": PARTIAL}
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while MAX_QUEUED_JOBS are already waiting."""
+
+
+@dataclass
+class Job:
+    kind: str
+    run: Callable[["Job"], Awaitable[dict]]
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    events: list[dict] = field(default_factory=list)
+    # Set and replaced on every event, waking everyone waiting for the next one.
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, PARTIAL, FAILED)
+
+    def publish(self, event_type: str, **data: Any):
+        """Appends a progress event and wakes any streaming clients."""
+        self.events.append({"type": event_type, "time": time.time(), **data})
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def stream(self):
+        """Yields every event of the job, old and new, until it finishes."""
+        index = 0
+        while True:
+            if index >= len(self.events):
+                await self._changed.wait()
+                continue
+            while index < len(self.events):
+                event = self.events[index]
+                index += 1
+                yield event
+            if self.done and index >= len(self.events):
+                return
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "events": self.events,
+        }
+
+
+class JobManager:
+    """Runs submitted jobs on a bounded pool of worker tasks."""
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        max_queued: int = MAX_QUEUED_JOBS,
+        retention: float = JOB_RETENTION,
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self.jobs: dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue[Job]] = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        """Starts the worker tasks on the running event loop."""
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, kind: str, run: Callable[[Job], Awaitable[dict]]) -> Job:
+        """Queues a job and returns it without waiting for it to start.
+
+        Args:
+            kind (str): A label for the job type, e.g. "virtual_try_on".
+            run (Callable): Coroutine function that takes the job, may publish
+                progress events on it, and returns the tool response.
+
+        Returns:
+            Job: The queued job.
+        """
+        if self._queue is None:
+            raise RuntimeError("JobManager.start() has not been called")
+        self._prune()
+        job = Job(kind=kind, run=run)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"{self._queue.qsize()} jobs are already queued")
+        self.jobs[job.id] = job
+        job.publish(QUEUED)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job.finished_at and job.finished_at < cutoff
+        ]:
+            del self.jobs[job_id]
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            job.status = RUNNING
+            job.publish(RUNNING)
+            try:
+                job.result = await job.run(job) or {
+                    "status": "error",
+                    "error": "The tool returned no result",
+                }
+                status = str(job.result.get("status", "")).lower()
+                job.status = RESULT_STATUSES.get(status, FAILED)
+                if job.status != SUCCEEDED:
+                    job.error = job.result.get("error") or job.result.get("Error")
+                if job.status == PARTIAL:
+                    logging.warning(f"Job {job.id} finished with partial results: {job.error}")
+            except Exception as e:
+                logging.error(f"Job {job.id} failed: {e}", exc_info=True)
+                job.status = FAILED
+                job.error = str(e)
+            job.finished_at = time.time()
+            job.publish(job.status, result=job.result, error=job.error)
+            self._queue.task_done()
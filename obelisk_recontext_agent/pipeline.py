@@ -0,0 +1,195 @@
+"""Fixed try-on -> edit -> video pipeline that runs the tools without the agents.
+
+Through the agent, every step of this sequence is preceded by planner turns of
+`root_agent` and `visual_generator`, each a thinking LLM call. Clients that
+already know every input can run the same tool logic directly:
+
+  1. `generate_virtual_try_on_images` on the person and product images,
+  2. `edit_image` once per edit prompt, each on the previous result,
+  3. `generate_video_shots` with every video prompt, on the final image.
+
+Each stage is timed, and the result reports any time spent outside the tools,
+which is the orchestration cost the agent path adds on top of them.
+
+Usage:
+    python -m obelisk_recontext_agent.pipeline gs://b/person.png gs://b/product.png \\
+        --edit "on a beach at sunset" --video "slow orbit around the model"
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Optional
+
+from . import tools
+from .context import StandaloneToolContext
+
+
+@dataclass
+class PipelineRequest:
+    person_uri: str
+    product_uri: str
+    edit_prompts: list[str] = field(default_factory=list)
+    video_prompts: list[str] = field(default_factory=list)
+    negative_prompt: str = ""
+    number_of_images: int = 1
+
+
+@dataclass
+class StageTiming:
+    stage: str
+    status: str
+    duration_s: float
+
+
+@dataclass
+class PipelineResult:
+    status: str = "complete"
+    image_uri: Optional[str] = None
+    video_uris: list[str] = field(default_factory=list)
+    stages: list[StageTiming] = field(default_factory=list)
+    outputs: dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    total_s: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        result = asdict(self)
+        tool_s = sum(stage.duration_s for stage in self.stages)
+        result["timings"] = {
+            "total_s": round(self.total_s, 3),
+            "tools_s": round(tool_s, 3),
+            # Everything between and around the tool calls.
+            "orchestration_s": round(self.total_s - tool_s, 3),
+        }
+        return result
+
+
+def _failed(stage: str, output: dict) -> Optional[str]:
+    """Returns the error of a failed stage output, or None if it succeeded."""
+    if stage == "video":
+        if output.get("status") == "ok":
+            return None
+        errors = [shot.get("error", shot["status"]) for shot in output.get("shots", [])]
+        return "; ".join(errors) or output.get("error", "Video generation failed")
+    if output.get("status") == "complete" and output.get("image_uris"):
+        return None
+    return str(
+        output.get("Error") or output.get("error") or output.get("failures") or "No images generated"
+    )
+
+
+async def run_pipeline(
+    request: PipelineRequest,
+    tool_context: Optional[StandaloneToolContext] = None,
+    on_stage: Optional[Callable[[StageTiming], None]] = None,
+) -> PipelineResult:
+    """Runs try-on, then each edit, then the video shots, stopping at the first failure.
+
+    Args:
+        request (PipelineRequest): The input images and the prompts of each stage.
+        tool_context (StandaloneToolContext, optional): Receives the artifacts of
+            every stage. Defaults to a fresh context.
+        on_stage (Callable, optional): Called with the timing of each finished stage,
+            e.g. to report progress.
+
+    Returns:
+        PipelineResult: The final image and video URIs, every stage's output and timing.
+    """
+    tool_context = tool_context or StandaloneToolContext()
+    result = PipelineResult()
+    start = time.perf_counter()
+
+    async def stage(name: str, call) -> bool:
+        stage_start = time.perf_counter()
+        try:
+            output = await call
+        except Exception as e:
+            logging.error(f"Pipeline stage {name} raised: {e}", exc_info=True)
+            output = {"status": "error", "error": str(e)}
+        error = _failed(name.split(":")[0], output or {})
+        timing = StageTiming(
+            stage=name,
+            status="error" if error else "ok",
+            duration_s=time.perf_counter() - stage_start,
+        )
+        result.stages.append(timing)
+        result.outputs[name] = output
+        if on_stage:
+            on_stage(timing)
+        if error:
+            result.status, result.error = "error", f"{name}: {error}"
+        return not error
+
+    try:
+        if not await stage(
+            "try_on",
+            tools.generate_virtual_try_on_images(
+                person_uri=request.person_uri,
+                product_uri=request.product_uri,
+                number_of_images=request.number_of_images,
+                tool_context=tool_context,
+            ),
+        ):
+            return result
+        result.image_uri = result.outputs["try_on"]["image_uris"][-1]
+
+        for index, prompt in enumerate(request.edit_prompts):
+            name = f"edit:{index}"
+            if not await stage(
+                name,
+                tools.edit_image(
+                    prompt=prompt, tool_context=tool_context, image_uri=result.image_uri
+                ),
+            ):
+                return result
+            result.image_uri = result.outputs[name]["image_uris"][-1]
+
+        if request.video_prompts:
+            ok = await stage(
+                "video",
+                tools.generate_video_shots(
+                    prompts=request.video_prompts,
+                    tool_context=tool_context,
+                    negative_prompts=[request.negative_prompt] * len(request.video_prompts),
+                    image_uri=result.image_uri,
+                ),
+            )
+            result.video_uris = [
+                shot["video_uri"]
+                for shot in result.outputs["video"].get("shots", [])
+                if shot.get("video_uri")
+            ]
+            if not ok and result.video_uris:
+                result.status = "partial"
+        return result
+    finally:
+        result.total_s = time.perf_counter() - start
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Run try-on, edits and video without the agent.")
+    parser.add_argument("person_uri")
+    parser.add_argument("product_uri")
+    parser.add_argument("--edit", action="append", default=[], help="Edit prompt; repeatable")
+    parser.add_argument("--video", action="append", default=[], help="Video shot prompt; repeatable")
+    parser.add_argument("--negative-prompt", default="")
+    parser.add_argument("--number-of-images", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    request = PipelineRequest(
+        person_uri=args.person_uri,
+        product_uri=args.product_uri,
+        edit_prompts=args.edit,
+        video_prompts=args.video,
+        negative_prompt=args.negative_prompt,
+        number_of_images=args.number_of_images,
+    )
+    result = asyncio.run(run_pipeline(request))
+    print(json.dumps(result.to_dict(), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Shared poller for long-running VEO operations.
+
+Instead of every `generate_video` call sleeping a fixed 15 s between its own
+`operations.get` calls, tools hand their operation to one poller per event
+loop. It checks every due operation in a single tick, schedules the next check
+from the completion times it has observed so far, and wakes each waiting tool
+as soon as its operation is done. The first check comes after `min_interval`,
+so operations that finish or fail right away are not held for a full interval.
+
+Checks, in-flight operations and completion detection are recorded in the
+`obelisk.veo.*` OpenTelemetry metrics; `snapshot()` summarizes one poller.
+"""
+import asyncio
+import logging
+import os
+import statistics
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from .clients import run_blocking
+from .telemetry import record_veo_poll
+
+# Bounds on the delay between two status checks of the same operation.
+MIN_POLL_INTERVAL = float(os.environ.get("OBELISK_POLL_MIN_INTERVAL", "2"))
+MAX_POLL_INTERVAL = float(os.environ.get("OBELISK_POLL_MAX_INTERVAL", "15"))
+# Assumed operation duration until real completions have been observed.
+DEFAULT_EXPECTED_DURATION = float(os.environ.get("OBELISK_POLL_EXPECTED_DURATION", "60"))
+# Growth of the delay once an operation runs past the expected duration.
+BACKOFF_FACTOR = 1.5
+# Consecutive failed status checks before the waiting tool gets the error.
+MAX_POLL_ERRORS = 5
+
+
+@dataclass
+class _Pending:
+    operation: Any
+    client: Any
+    future: asyncio.Future
+    submitted_at: float
+    next_check: float
+    last_check: float
+    late_polls: int = 0
+    errors: int = 0
+
+
+@dataclass
+class PollerMetrics:
+    """Counters and samples describing how quickly completions are detected."""
+
+    polls: int = 0
+    completed: int = 0
+    # Seconds an operation ran before its completion was seen.
+    durations: deque = field(default_factory=lambda: deque(maxlen=100))
+    # Width of the window, in seconds, between the last "not done" check and the
+    # check that saw the operation done: an upper bound on time-to-detect, as
+    # the operation may have finished anywhere inside it.
+    detection_lag_bounds: deque = field(default_factory=lambda: deque(maxlen=100))
+
+
+class OperationPoller:
+    """Multiplexes status checks for every in-flight long-running operation."""
+
+    def __init__(
+        self,
+        min_interval: float = MIN_POLL_INTERVAL,
+        max_interval: float = MAX_POLL_INTERVAL,
+        expected_duration: float = DEFAULT_EXPECTED_DURATION,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_expected_duration = expected_duration
+        self.metrics = PollerMetrics()
+        self._pending: dict[str, _Pending] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def expected_duration(self) -> float:
+        """Returns the median observed operation duration, or the configured default."""
+        if self.metrics.durations:
+            return statistics.median(self.metrics.durations)
+        return self.default_expected_duration
+
+    def next_delay(self, elapsed: float, late_polls: int) -> float:
+        """Returns how long to wait before checking an operation again.
+
+        Before the expected duration the poller closes half the remaining gap
+        each time; after it, the delay grows from `min_interval` by BACKOFF_FACTOR.
+        The first check of an operation is not scheduled here: it always comes
+        after `min_interval`.
+        """
+        remaining = self.expected_duration() - elapsed
+        if remaining > 0:
+            delay = remaining / 2
+        else:
+            delay = self.min_interval * BACKOFF_FACTOR**late_polls
+        return min(max(delay, self.min_interval), self.max_interval)
+
+    async def wait(self, operation: Any, client: Any) -> Any:
+        """Waits until an operation is done and returns its final state.
+
+        Args:
+            operation: The operation returned by e.g. `client.models.generate_videos`.
+            client: The GenAI client whose `operations.get` refreshes it.
+
+        Returns:
+            The refreshed, completed operation.
+        """
+        if operation.done:
+            return operation
+        now = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[operation.name] = _Pending(
+            operation=operation,
+            client=client,
+            future=future,
+            submitted_at=now,
+            next_check=now + self.min_interval,
+            last_check=now,
+        )
+        record_veo_poll(in_flight=1)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+        return await future
+
+    def snapshot(self) -> dict[str, Any]:
+        """Returns the poller metrics as a plain dict, e.g. for a status endpoint."""
+        lags = list(self.metrics.detection_lag_bounds)
+        return {
+            "in_flight": len(self._pending),
+            "polls": self.metrics.polls,
+            "completed": self.metrics.completed,
+            "expected_duration_s": self.expected_duration(),
+            "detection_lag_upper_bound_mean_s": statistics.mean(lags) if lags else None,
+            "detection_lag_upper_bound_max_s": max(lags) if lags else None,
+        }
+
+    async def _run(self):
+        while self._pending:
+            now = time.monotonic()
+            next_check = min(entry.next_check for entry in self._pending.values())
+            if next_check > now:
+                self._wakeup.clear()
+                try:
+                    # A newly submitted operation may need checking sooner.
+                    await asyncio.wait_for(self._wakeup.wait(), next_check - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            due = [
+                (name, entry)
+                for name, entry in self._pending.items()
+                if entry.next_check <= now
+            ]
+            results = await asyncio.gather(
+                *(
+                    run_blocking(entry.client.operations.get, entry.operation)
+                    for _, entry in due
+                ),
+                return_exceptions=True,
+            )
+            checked_at = time.monotonic()
+            self.metrics.polls += len(due)
+            errors = sum(isinstance(result, BaseException) for result in results)
+            record_veo_poll(polls=len(due) - errors, errors=errors)
+            for (name, entry), result in zip(due, results):
+                self._update(name, entry, result, checked_at)
+
+    def _update(self, name: str, entry: _Pending, result: Any, checked_at: float):
+        if entry.future.done():
+            # The waiting tool was cancelled.
+            del self._pending[name]
+            record_veo_poll(in_flight=-1)
+            return
+        if isinstance(result, BaseException):
+            entry.errors += 1
+            logging.warning(f"Polling operation {name} failed ({entry.errors}): {result}")
+            if entry.errors >= MAX_POLL_ERRORS:
+                del self._pending[name]
+                record_veo_poll(in_flight=-1)
+                entry.future.set_exception(result)
+                return
+        else:
+            entry.errors = 0
+            entry.operation = result
+            if result.done:
+                del self._pending[name]
+                self.metrics.completed += 1
+                duration = checked_at - entry.submitted_at
+                lag_bound = checked_at - entry.last_check
+                self.metrics.durations.append(duration)
+                self.metrics.detection_lag_bounds.append(lag_bound)
+                record_veo_poll(in_flight=-1, duration_s=duration, detection_lag_s=lag_bound)
+                entry.future.set_result(result)
+                return
+        elapsed = checked_at - entry.submitted_at
+        if elapsed >= self.expected_duration():
+            entry.late_polls += 1
+        entry.last_check = checked_at
+        entry.next_check = checked_at + self.next_delay(elapsed, entry.late_polls)
+
+
+_pollers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OperationPoller]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_operation_poller() -> OperationPoller:
+    """Returns the shared operation poller of the running event loop."""
+    loop = asyncio.get_running_loop()
+    poller = _pollers.get(loop)
+    if poller is None:
+        poller = OperationPoller()
+        _pollers[loop] = poller
+    return poller
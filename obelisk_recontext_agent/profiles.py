@@ -0,0 +1,128 @@
+"""Named latency profiles: model, thinking and sampling settings of each agent.
+
+A profile trades answer quality for speed across both agents at once:
+
+  * "quality": the original settings, with unbounded thinking streamed back
+    to the client,
+  * "interactive-fast": Flash for both agents, no thinking for the root agent's
+    routing turns, a small budget for the visual generator's prompt writing,
+    and no thought events,
+  * "batch": the cheapest settings that still plan well enough for catalog runs
+    where nobody reads the thoughts.
+
+The deployment default is OBELISK_LATENCY_PROFILE and is used when the agents
+are built. A session can pick another profile by setting the
+`latency_profile` state key; `latency_profile_callback` then rewrites each
+model request of that session before it is sent.
+"""
+import logging
+import os
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+# Session state key that selects a profile for one session.
+PROFILE_STATE_KEY = "latency_profile"
+
+
+@dataclass(frozen=True)
+class AgentSettings:
+    model: str
+    temperature: float
+    include_thoughts: bool
+    # Thinking tokens per model call; 0 disables thinking (Flash models only),
+    # None lets the model decide.
+    thinking_budget: Optional[int] = None
+
+    def thinking_config(self) -> types.ThinkingConfig:
+        return types.ThinkingConfig(
+            include_thoughts=self.include_thoughts, thinking_budget=self.thinking_budget
+        )
+
+
+@dataclass(frozen=True)
+class LatencyProfile:
+    name: str
+    root: AgentSettings
+    visual_generator: AgentSettings
+
+
+PROFILES = {
+    profile.name: profile
+    for profile in (
+        LatencyProfile(
+            name="quality",
+            root=AgentSettings("gemini-2.5-flash", temperature=1.0, include_thoughts=True),
+            visual_generator=AgentSettings("gemini-2.5-pro", temperature=1.2, include_thoughts=True),
+        ),
+        LatencyProfile(
+            name="interactive-fast",
+            root=AgentSettings(
+                "gemini-2.5-flash", temperature=1.0, include_thoughts=False, thinking_budget=0
+            ),
+            visual_generator=AgentSettings(
+                "gemini-2.5-flash", temperature=1.2, include_thoughts=False, thinking_budget=1024
+            ),
+        ),
+        LatencyProfile(
+            name="batch",
+            root=AgentSettings(
+                "gemini-2.5-flash-lite", temperature=0.7, include_thoughts=False, thinking_budget=0
+            ),
+            visual_generator=AgentSettings(
+                "gemini-2.5-flash", temperature=1.0, include_thoughts=False, thinking_budget=2048
+            ),
+        ),
+    )
+}
+DEFAULT_PROFILE = os.getenv("OBELISK_LATENCY_PROFILE", "quality")
+
+
+def get_profile(name: Optional[str] = None) -> LatencyProfile:
+    """Returns the named profile, or the deployment default.
+
+    Raises:
+        ValueError: If the profile is not defined.
+    """
+    name = name or DEFAULT_PROFILE
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown latency profile '{name}', expected one of {', '.join(PROFILES)}"
+        ) from None
+
+
+def apply_settings(llm_request: LlmRequest, settings: AgentSettings):
+    """Points a model request at the model, thinking and temperature of `settings`."""
+    llm_request.model = settings.model
+    llm_request.config = llm_request.config or types.GenerateContentConfig()
+    llm_request.config.temperature = settings.temperature
+    llm_request.config.thinking_config = settings.thinking_config()
+
+
+def latency_profile_callback(
+    agent: str,
+) -> Callable[[CallbackContext, LlmRequest], Optional[LlmResponse]]:
+    """Returns a before_model_callback applying the session's profile to `agent`.
+
+    Args:
+        agent (str): The LatencyProfile field of the agent, "root" or "visual_generator".
+    """
+
+    def before_model(callback_context: CallbackContext, llm_request: LlmRequest):
+        name = callback_context.state.get(PROFILE_STATE_KEY)
+        if not name or name == DEFAULT_PROFILE:
+            return None
+        try:
+            profile = get_profile(name)
+        except ValueError as e:
+            logging.warning(f"Ignoring session latency profile: {e}")
+            return None
+        apply_settings(llm_request, getattr(profile, agent))
+        return None
+
+    return before_model
@@ -0,0 +1,213 @@
+"""Quota-aware scheduler for outbound model calls.
+
+Every model call goes through `ModelScheduler.run`, which
+  * admits it through a token bucket per (model, region), so bursts are smoothed
+    to the configured quota instead of turning into 429s,
+  * lets interactive requests jump ahead of batch work waiting on the same bucket,
+  * retries 429 and 503 responses with jittered exponential backoff, re-entering
+    the queue so retries also respect the quota,
+  * records how long calls waited in the queue versus how long the model took.
+
+The priority of a call comes from the `request_priority` context variable, which
+batch entry points set to BATCH.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import statistics
+import time
+import weakref
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from .clients import run_blocking
+
+INTERACTIVE = 0
+BATCH = 1
+
+request_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "request_priority", default=INTERACTIVE
+)
+
+# Requests per minute per (model, region), overridable with a JSON object in
+# OBELISK_MODEL_QPM, e.g. '{"veo-3.0-generate-preview": 5}'.
+DEFAULT_MODEL_QPM = {
+    "virtual-try-on-preview-08-04": 60,
+    "gemini-2.5-flash-image-preview": 120,
+    "veo-3.0-generate-preview": 10,
+}
+FALLBACK_QPM = 60
+MAX_ATTEMPTS = int(os.environ.get("OBELISK_MODEL_MAX_ATTEMPTS", "5"))
+BACKOFF_BASE = float(os.environ.get("OBELISK_MODEL_BACKOFF_BASE", "1"))
+BACKOFF_CAP = float(os.environ.get("OBELISK_MODEL_BACKOFF_CAP", "32"))
+RETRYABLE_CODES = (429, 503)
+
+
+def model_qpm() -> dict[str, float]:
+    """Returns the configured requests-per-minute quota of each model."""
+    return {**DEFAULT_MODEL_QPM, **json.loads(os.environ.get("OBELISK_MODEL_QPM", "{}"))}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Returns True for quota (429) and unavailable (503) errors from either SDK."""
+    code = getattr(error, "code", None)
+    if code is None:
+        code = getattr(error, "status_code", None)
+    try:
+        return int(code) in RETRYABLE_CODES
+    except (TypeError, ValueError):
+        return False
+
+
+class TokenBucket:
+    """Grants calls at `rate` per second, with bursts of up to `burst`, by priority."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def acquire(self, priority: int = INTERACTIVE):
+        """Waits for a token; lower priority values are served first."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._dispatch())
+        self._wakeup.set()
+        await future
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def _dispatch(self):
+        while self._waiters:
+            self._refill()
+            if self._tokens < 1:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), (1 - self._tokens) / self.rate
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._tokens -= 1
+                future.set_result(None)
+
+
+@dataclass
+class ModelStats:
+    calls: int = 0
+    retries: int = 0
+    failures: int = 0
+    queue_wait_s: deque = field(default_factory=lambda: deque(maxlen=1000))
+    model_s: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+
+class ModelScheduler:
+    """Rate limits, prioritizes and retries model calls per (model, region)."""
+
+    def __init__(self, qpm: Optional[dict[str, float]] = None, max_attempts: int = MAX_ATTEMPTS):
+        self.qpm = qpm if qpm is not None else model_qpm()
+        self.max_attempts = max_attempts
+        self.stats: dict[str, ModelStats] = defaultdict(ModelStats)
+        self._buckets: dict[tuple[str, str], TokenBucket] = {}
+
+    def bucket(self, model_id: str, region: str) -> TokenBucket:
+        key = (model_id, region)
+        if key not in self._buckets:
+            rate = self.qpm.get(model_id, FALLBACK_QPM) / 60
+            # Allow a few calls to go out immediately after an idle period.
+            self._buckets[key] = TokenBucket(rate, burst=max(1.0, min(5.0, rate * 10)))
+        return self._buckets[key]
+
+    async def run(
+        self, model_id: str, region: str, func: Callable[..., Any], /, *args, **kwargs
+    ) -> Any:
+        """Calls a blocking model function once the quota allows, retrying 429/503.
+
+        Args:
+            model_id (str): The model the call is billed against.
+            region (str): The location of the client making the call.
+            func (Callable): The blocking SDK method, e.g. `client.models.recontext_image`.
+            *args: Positional arguments for `func`.
+            **kwargs: Keyword arguments for `func`.
+
+        Returns:
+            The return value of `func`.
+        """
+        stats = self.stats[model_id]
+        bucket = self.bucket(model_id, region)
+        priority = request_priority.get()
+        for attempt in range(self.max_attempts):
+            queued_at = time.monotonic()
+            await bucket.acquire(priority)
+            started_at = time.monotonic()
+            stats.queue_wait_s.append(started_at - queued_at)
+            try:
+                result = await run_blocking(func, *args, **kwargs)
+                stats.model_s.append(time.monotonic() - started_at)
+                stats.calls += 1
+                return result
+            except Exception as e:
+                stats.model_s.append(time.monotonic() - started_at)
+                if not is_retryable(e) or attempt == self.max_attempts - 1:
+                    stats.failures += 1
+                    raise
+                stats.retries += 1
+                delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+                logging.warning(
+                    f"{model_id} in {region} returned {e}, retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Returns per-model call counts and queue wait versus model time."""
+
+        def summarize(samples: deque) -> dict[str, Optional[float]]:
+            values = list(samples)
+            return {
+                "mean_s": statistics.mean(values) if values else None,
+                "max_s": max(values) if values else None,
+            }
+
+        return {
+            model_id: {
+                "calls": stats.calls,
+                "retries": stats.retries,
+                "failures": stats.failures,
+                "queue_wait": summarize(stats.queue_wait_s),
+                "model_time": summarize(stats.model_s),
+            }
+            for model_id, stats in self.stats.items()
+        }
+
+
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ModelScheduler]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_scheduler() -> ModelScheduler:
+    """Returns the shared model scheduler of the running event loop."""
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = ModelScheduler()
+        _schedulers[loop] = scheduler
+    return scheduler
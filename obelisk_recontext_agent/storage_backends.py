@@ -0,0 +1,263 @@
+"""Object storage behind the tools: Cloud Storage, or a local directory.
+
+Objects are always addressed by bucket and object name, and the tools keep
+passing `gs://bucket/path/to/object` URIs around in state, caches and results
+whichever backend is configured. `OBELISK_STORAGE_BACKEND` picks the backend:
+
+- "gcs" (the default) stores objects in Cloud Storage through the shared
+  client of `get_storage_client`.
+- "local" stores `gs://bucket/path/to/object` at
+  `$OBELISK_LOCAL_STORAGE_ROOT/bucket/path/to/object`, for on-prem and
+  development deployments. Reads memory-map the file and return a read-only
+  `memoryview` of it, so the bytes are paged in by the kernel on first access
+  and never copied into a Python buffer. Vertex AI cannot read these objects,
+  so the tools send model inputs inline instead.
+
+Both backends are blocking, like the Cloud Storage SDK: call them through
+`run_blocking`. Both raise `google.api_core.exceptions.NotFound` for missing
+objects and `PreconditionFailed` when `if_absent` finds an existing one.
+"""
+import abc
+import base64
+import hashlib
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from .clients import get_storage_client
+
+STORAGE_BACKEND = os.getenv("OBELISK_STORAGE_BACKEND", "gcs")
+LOCAL_STORAGE_ROOT = os.getenv("OBELISK_LOCAL_STORAGE_ROOT", ".obelisk-storage")
+
+_lock = threading.Lock()
+_backend: Optional["StorageBackend"] = None
+
+
+def split_gcs_uri(uri: str) -> tuple[str, str]:
+    """Splits a gs://bucket/path/to/object URI into its bucket and object name."""
+    bucket_name, _, blob_name = uri.removeprefix("gs://").partition("/")
+    return bucket_name, blob_name
+
+
+@dataclass(frozen=True)
+class ObjectInfo:
+    """Size and content hashes of a stored object, as `Bucket.get_blob` reports them."""
+
+    size: int
+    md5_hash: Optional[str] = None
+    crc32c: Optional[str] = None
+
+
+class StorageBackend(abc.ABC):
+    """A blocking object store addressed by bucket and object name."""
+
+    # Whether the models can read this backend's gs:// URIs themselves.
+    models_can_read: bool = True
+
+    @abc.abstractmethod
+    def read(self, bucket_name: str, blob_name: str) -> Union[bytes, memoryview]:
+        """Returns the object's content."""
+
+    @abc.abstractmethod
+    def write(
+        self,
+        bucket_name: str,
+        blob_name: str,
+        data: Union[bytes, memoryview],
+        content_type: Optional[str] = None,
+        if_absent: bool = False,
+    ) -> None:
+        """Stores `data` as the object, only creating it if `if_absent`."""
+
+    @abc.abstractmethod
+    def write_stream(
+        self,
+        bucket_name: str,
+        blob_name: str,
+        stream: BinaryIO,
+        content_type: Optional[str] = None,
+        rewind: bool = True,
+        chunk_size: int = 1 << 20,
+    ) -> int:
+        """Stores a file-like object `chunk_size` bytes at a time; returns the bytes written."""
+
+    @abc.abstractmethod
+    def exists(self, bucket_name: str, blob_name: str) -> bool:
+        """Returns whether the object exists."""
+
+    @abc.abstractmethod
+    def stat(self, bucket_name: str, blob_name: str) -> Optional[ObjectInfo]:
+        """Returns the object's size and hashes, or None if it does not exist."""
+
+
+class GCSStorageBackend(StorageBackend):
+    """Cloud Storage through a shared `storage.Client`.
+
+    Args:
+        client (storage.Client, optional): The client to use. Defaults to the
+            process-wide client of `get_storage_client`.
+    """
+
+    models_can_read = True
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_storage_client()
+
+    def _blob(self, bucket_name: str, blob_name: str):
+        # `Bucket.blob` only builds a local handle, it makes no request.
+        return self.client.bucket(bucket_name).blob(blob_name)
+
+    def read(self, bucket_name: str, blob_name: str) -> bytes:
+        return self._blob(bucket_name, blob_name).download_as_bytes()
+
+    def write(self, bucket_name, blob_name, data, content_type=None, if_absent=False):
+        self._blob(bucket_name, blob_name).upload_from_string(
+            data, content_type=content_type, if_generation_match=0 if if_absent else None
+        )
+
+    def write_stream(
+        self, bucket_name, blob_name, stream, content_type=None, rewind=True, chunk_size=1 << 20
+    ):
+        blob = self._blob(bucket_name, blob_name)
+        # A chunk size switches the client to a resumable upload that reads the
+        # stream piece by piece instead of all at once.
+        blob.chunk_size = chunk_size
+        blob.upload_from_file(stream, content_type=content_type, rewind=rewind)
+        return stream.tell()
+
+    def exists(self, bucket_name, blob_name):
+        return self._blob(bucket_name, blob_name).exists()
+
+    def stat(self, bucket_name, blob_name):
+        blob = self.client.bucket(bucket_name).get_blob(blob_name)
+        if blob is None:
+            return None
+        return ObjectInfo(size=blob.size, md5_hash=blob.md5_hash, crc32c=blob.crc32c)
+
+
+class LocalStorageBackend(StorageBackend):
+    """Objects as files under `root/<bucket>/<object name>`.
+
+    Writes go to a temporary file that is then renamed into place, so readers
+    never see a partial object, and a file that is still memory-mapped by an
+    earlier read is replaced rather than truncated under it.
+
+    Args:
+        root (str): The directory holding one subdirectory per bucket.
+    """
+
+    models_can_read = False
+
+    def __init__(self, root: str = LOCAL_STORAGE_ROOT):
+        self.root = Path(root).resolve()
+
+    def path(self, bucket_name: str, blob_name: str) -> Path:
+        """Returns the file of an object, rejecting names that escape the bucket."""
+        bucket = (self.root / bucket_name).resolve()
+        path = (bucket / blob_name).resolve()
+        if (
+            not bucket_name
+            or "/" in bucket_name
+            or bucket.parent != self.root
+            or not path.is_relative_to(bucket)
+            or path == bucket
+        ):
+            raise ValueError(f"Invalid object gs://{bucket_name}/{blob_name}")
+        return path
+
+    def read(self, bucket_name: str, blob_name: str) -> memoryview:
+        path = self.path(bucket_name, blob_name)
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    # Empty files cannot be mapped.
+                    return memoryview(b"")
+                # The mapping outlives the file descriptor and is unmapped once
+                # the last view of it is released.
+                return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except (FileNotFoundError, IsADirectoryError):
+            raise NotFound(f"gs://{bucket_name}/{blob_name}")
+
+    def _commit(self, temp_path: str, path: Path, if_absent: bool):
+        try:
+            if if_absent:
+                # Linking fails if the target exists, unlike rename.
+                os.link(temp_path, path)
+            else:
+                os.replace(temp_path, path)
+        except FileExistsError:
+            raise PreconditionFailed(f"{path} already exists")
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def _write_with(self, bucket_name, blob_name, if_absent, fill) -> int:
+        path = self.path(bucket_name, blob_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=".tmp-", delete=False) as f:
+            try:
+                fill(f)
+                size = f.tell()
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        self._commit(f.name, path, if_absent)
+        logging.debug(f"Stored {size} bytes at {path}")
+        return size
+
+    def write(self, bucket_name, blob_name, data, content_type=None, if_absent=False):
+        self._write_with(bucket_name, blob_name, if_absent, lambda f: f.write(data))
+
+    def write_stream(
+        self, bucket_name, blob_name, stream, content_type=None, rewind=True, chunk_size=1 << 20
+    ):
+        if rewind:
+            stream.seek(0)
+        return self._write_with(
+            bucket_name, blob_name, False, lambda f: shutil.copyfileobj(stream, f, chunk_size)
+        )
+
+    def exists(self, bucket_name, blob_name):
+        return self.path(bucket_name, blob_name).is_file()
+
+    def stat(self, bucket_name, blob_name):
+        try:
+            data = self.read(bucket_name, blob_name)
+        except NotFound:
+            return None
+        # Hashed straight from the mapping, in the format Cloud Storage reports.
+        md5_hash = base64.b64encode(hashlib.md5(data).digest()).decode()
+        return ObjectInfo(size=len(data), md5_hash=md5_hash)
+
+
+def create_storage_backend(name: str = STORAGE_BACKEND) -> StorageBackend:
+    """Builds the backend called `name`, "gcs" or "local"."""
+    if name == "gcs":
+        return GCSStorageBackend()
+    if name == "local":
+        return LocalStorageBackend()
+    raise ValueError(f"Unknown storage backend '{name}', expected 'gcs' or 'local'")
+
+
+def get_storage_backend() -> StorageBackend:
+    """Returns the process-wide backend selected by OBELISK_STORAGE_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                logging.info(f"Using the '{STORAGE_BACKEND}' storage backend")
+                _backend = create_storage_backend()
+    return _backend
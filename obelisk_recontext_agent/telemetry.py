@@ -0,0 +1,243 @@
+"""OpenTelemetry spans and latency histograms around each stage of the tools.
+
+    with stage("gcs.upload", bytes=len(data)):
+        await run_blocking(blob.upload_from_string, data)
+
+opens an `obelisk.gcs.upload` span, nested under whatever span is current
+(the tool's, and ADK's `execute_tool` span above it), and records its duration
+in the `obelisk.stage.duration` histogram by stage and status. A `bytes`
+attribute is also recorded in the `obelisk.stage.bytes` histogram. The VEO
+operation poller reports its checks, in-flight operations and completion
+detection through `record_veo_poll` in the `obelisk.veo.*` metrics.
+
+Spans and metrics go to the globally configured providers, e.g. the Cloud
+Trace exporter Agent Engine installs when
+GOOGLE_CLOUD_AGENT_ENGINE_ENABLE_TELEMETRY is set; without one the API's no-op
+implementation is used. `LocalTelemetry` collects both in memory for tests
+and offline runs. With OBELISK_TELEMETRY=0, `stage` returns a shared no-op
+object and costs a single function call.
+"""
+import functools
+import os
+import time
+from typing import Any, Callable, Optional
+
+from opentelemetry import metrics, trace
+
+TELEMETRY_ENABLED = os.getenv("OBELISK_TELEMETRY", "1") == "1"
+INSTRUMENTATION_NAME = "obelisk_recontext_agent"
+
+
+class _Instruments:
+    def __init__(self, tracer_provider=None, meter_provider=None):
+        self.tracer = trace.get_tracer(INSTRUMENTATION_NAME, tracer_provider=tracer_provider)
+        meter = metrics.get_meter(INSTRUMENTATION_NAME, meter_provider=meter_provider)
+        self.durations = meter.create_histogram(
+            "obelisk.stage.duration", unit="s", description="Duration of a tool stage"
+        )
+        self.sizes = meter.create_histogram(
+            "obelisk.stage.bytes", unit="By", description="Bytes moved by a tool stage"
+        )
+        self.veo_polls = meter.create_counter(
+            "obelisk.veo.polls", unit="{check}", description="Status checks of VEO operations"
+        )
+        self.veo_in_flight = meter.create_up_down_counter(
+            "obelisk.veo.in_flight",
+            unit="{operation}",
+            description="VEO operations the poller is waiting on",
+        )
+        self.veo_durations = meter.create_histogram(
+            "obelisk.veo.duration",
+            unit="s",
+            description="Time from submitting a VEO operation until it was seen done",
+        )
+        self.veo_detection_lags = meter.create_histogram(
+            "obelisk.veo.detection_lag_upper_bound",
+            unit="s",
+            description=(
+                "Time between the last check that saw a VEO operation running and the "
+                "check that saw it done: an upper bound on how late completion was noticed"
+            ),
+        )
+
+
+_instruments = _Instruments()
+
+
+def _span_attributes(attributes: dict[str, Any]) -> dict[str, Any]:
+    return {f"obelisk.{key}": value for key, value in attributes.items() if value is not None}
+
+
+class Stage:
+    """A timed span around one stage; use `stage()` to create one."""
+
+    __slots__ = ("name", "attributes", "span", "_span_context", "_start")
+
+    def __init__(self, name: str, attributes: dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+
+    def set(self, **attributes: Any):
+        """Adds attributes known only once the stage has run, e.g. downloaded bytes."""
+        self.attributes.update(attributes)
+        self.span.set_attributes(_span_attributes(attributes))
+
+    def __enter__(self) -> "Stage":
+        self._span_context = _instruments.tracer.start_as_current_span(
+            f"obelisk.{self.name}", attributes=_span_attributes(self.attributes)
+        )
+        self.span = self._span_context.__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        labels = {"stage": self.name, "status": "error" if exc_type else "ok"}
+        _instruments.durations.record(time.perf_counter() - self._start, labels)
+        if self.attributes.get("bytes") is not None:
+            _instruments.sizes.record(self.attributes["bytes"], labels)
+        return self._span_context.__exit__(exc_type, exc, traceback)
+
+
+class _DisabledStage:
+    __slots__ = ()
+
+    def set(self, **attributes: Any):
+        pass
+
+    def __enter__(self) -> "_DisabledStage":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_DISABLED = _DisabledStage()
+
+
+def stage(name: str, **attributes: Any) -> Stage:
+    """Returns a context manager that traces and times one stage.
+
+    Args:
+        name (str): The stage, e.g. "model.call"; the span is `obelisk.<name>`.
+        **attributes: Span attributes such as `model`, `bytes` or `image_count`.
+            None values are dropped.
+    """
+    if not TELEMETRY_ENABLED:
+        return _DISABLED
+    return Stage(name, attributes)
+
+
+def traced(name: str) -> Callable:
+    """Decorates an async tool so each call runs in a `stage(name)` span.
+
+    The wrapper keeps the tool's name, docstring and signature, which ADK reads
+    to declare the tool to the model.
+    """
+
+    def decorate(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with stage(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def record_veo_poll(
+    polls: int = 0,
+    errors: int = 0,
+    in_flight: int = 0,
+    duration_s: Optional[float] = None,
+    detection_lag_s: Optional[float] = None,
+):
+    """Records activity of the VEO operation poller.
+
+    Args:
+        polls (int): Status checks that returned.
+        errors (int): Status checks that failed.
+        in_flight (int): Change in the number of operations being waited on.
+        duration_s (float, optional): Run time of an operation seen done.
+        detection_lag_s (float, optional): Upper bound on how late that was noticed.
+    """
+    if not TELEMETRY_ENABLED:
+        return
+    ok, error = {"stage": "veo.poll", "status": "ok"}, {"stage": "veo.poll", "status": "error"}
+    if polls:
+        _instruments.veo_polls.add(polls, ok)
+    if errors:
+        _instruments.veo_polls.add(errors, error)
+    if in_flight:
+        _instruments.veo_in_flight.add(in_flight)
+    if duration_s is not None:
+        _instruments.veo_durations.record(duration_s, ok)
+    if detection_lag_s is not None:
+        _instruments.veo_detection_lags.record(detection_lag_s, ok)
+
+
+class LocalTelemetry:
+    """Collects the stages' spans and histograms in memory instead of exporting them.
+
+    Use as a context manager; the previous providers are restored on exit.
+    """
+
+    def __init__(self):
+        from opentelemetry.sdk.metrics import MeterProvider
+        from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+        self.exporter = InMemorySpanExporter()
+        self.tracer_provider = TracerProvider()
+        self.tracer_provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self.reader = InMemoryMetricReader()
+        self.meter_provider = MeterProvider(metric_readers=[self.reader])
+        self._previous: Optional[_Instruments] = None
+
+    def __enter__(self) -> "LocalTelemetry":
+        global _instruments
+        self._previous = _instruments
+        _instruments = _Instruments(self.tracer_provider, self.meter_provider)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        global _instruments
+        _instruments = self._previous
+        self.meter_provider.shutdown()
+        self.tracer_provider.shutdown()
+
+    def spans(self) -> list:
+        """Returns the finished spans, in the order they ended."""
+        return list(self.exporter.get_finished_spans())
+
+    def _metrics(self):
+        data = self.reader.get_metrics_data()
+        for resource_metrics in data.resource_metrics if data else []:
+            for scope_metrics in resource_metrics.scope_metrics:
+                yield from scope_metrics.metrics
+
+    def histograms(self) -> dict[str, dict[tuple[str, str], dict[str, float]]]:
+        """Returns each histogram's count and sum by (stage, status)."""
+        from opentelemetry.sdk.metrics.export import Histogram
+
+        result: dict[str, dict[tuple[str, str], dict[str, float]]] = {}
+        for metric in self._metrics():
+            if not isinstance(metric.data, Histogram):
+                continue
+            points = result.setdefault(metric.name, {})
+            for point in metric.data.data_points:
+                key = (point.attributes["stage"], point.attributes["status"])
+                points[key] = {"count": point.count, "sum": point.sum}
+        return result
+
+    def counters(self) -> dict[str, float]:
+        """Returns the current total of each counter, over all its labels."""
+        from opentelemetry.sdk.metrics.export import Sum
+
+        return {
+            metric.name: sum(point.value for point in metric.data.data_points)
+            for metric in self._metrics()
+            if isinstance(metric.data, Sum)
+        }
@@ -1,52 +1,70 @@
 from google.adk.tools import ToolContext
 import uuid
 from google.genai import types
-from google.cloud import storage
 from google.adk.agents.callback_context import CallbackContext
 import logging
-from typing import Optional
-from google import genai
+from typing import BinaryIO, Optional, Union
 import os
 import uuid
 import time
 import asyncio
+import hashlib
+import io
+import mimetypes
+from google.api_core.exceptions import PreconditionFailed
 from google.genai.types import GenerateVideosConfig, RecontextImageConfig, Image
+from .clients import get_genai_client, run_blocking
+from .cache import cache_key, get_edit_cache, get_try_on_cache
+from .images import (
+    PREVIEW_FORMAT,
+    PREVIEW_SIZES,
+    normalization_stats,
+    normalize_image,
+    preview_mime_type,
+    render_previews,
+    sniff_mime_type,
+)
+from .poller import get_operation_poller
+from .scheduler import get_scheduler
+from .storage_backends import get_storage_backend, split_gcs_uri
+from .telemetry import stage, traced
 
 
 
-# client = genai.Client(...) # Removed global init
-
-def get_genai_client():
-    return genai.Client(
-        vertexai=True,
-        project=os.environ.get("GOOGLE_CLOUD_PROJECT", "wortz-project-352116"), # Fallback to known project if env missing
-        location=os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1")
-    )
-
-async def edit_image(prompt: str, tool_context: ToolContext):
-    """Edit an image based on a prompt.
-    The image is already selected as the last generated image in the sequence of events.
-
-    Args:
-        prompt (str): The prompt describing the new edit to make to the image.
-        tool_context (ToolContext): The tool context.
-    """
-    client = get_genai_client()
-    try:
-        image_location = tool_context.state["selected_file"]
-    except:
-        return {
-            "status": "error",
-            "message": "select the file for editing first using the file selection tool",
-        }
-    # ... rest of function ...
-
-
 PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT", "gcp-obelisk-dev")
 LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
+VTO_MODEL = "virtual-try-on-preview-08-04"
+EDIT_MODEL = "gemini-2.5-flash-image-preview"
+VEO_MODEL = "veo-3.0-generate-preview"
+# Max generated images saved/uploaded at once per tool call.
+PERSIST_CONCURRENCY = int(os.getenv("OBELISK_PERSIST_CONCURRENCY", "4"))
+# Object prefix for content-addressed input images.
+INPUT_PREFIX = os.getenv("OBELISK_INPUT_PREFIX", "inputs")
+# Size of each request of a streamed upload; GCS needs a multiple of 256 KiB.
+UPLOAD_CHUNK_SIZE = int(os.getenv("OBELISK_UPLOAD_CHUNK_SIZE", str(1 << 20)))
+# Object prefix for images uploaded through the HTTP front ends.
+UPLOAD_PREFIX = os.getenv("OBELISK_UPLOAD_PREFIX", "uploads")
+# Object prefix for the preview renditions of generated images.
+PREVIEW_PREFIX = os.getenv("OBELISK_PREVIEW_PREFIX", "previews")
+# Most images the try-on model returns for one request.
+MAX_TRY_ON_IMAGES = 4
+
+# How generated videos are saved as artifacts: "reference" records the gs://
+# URI VEO wrote to, "inline" downloads the whole MP4 into the artifact store.
+VIDEO_ARTIFACT_MODE = os.getenv("OBELISK_VIDEO_ARTIFACT_MODE", "reference")
+
+# gs:// URIs of inputs this process has already staged, to skip the existence check.
+_staged_inputs: set[str] = set()
 
 
-async def edit_image(prompt: str, tool_context: ToolContext, image_uri: Optional[str] = None):
+@traced("tool.edit_image")
+async def edit_image(
+    prompt: str,
+    tool_context: ToolContext,
+    image_uri: Optional[str] = None,
+    use_cache: bool = True,
+    seed: Optional[int] = None,
+):
     """Edit an image based on a prompt.
     The image is already selected as the last generated image in the sequence of events.
 
@@ -54,46 +72,88 @@ async def edit_image(prompt: str, tool_context: ToolContext, image_uri: Optional
         prompt (str): The prompt describing the new edit to make to the image.
         tool_context (ToolContext): The tool context.
         image_uri (str, optional): The URI of the image to edit. If not provided, the last generated image will be used.
+        use_cache (bool, optional): Reuse the earlier result of the same edit on the same image. Set to False when the user wants a new variation.
+        seed (int, optional): A generation seed. Different seeds give different variations of the same edit.
     """
-    client = genai.Client(
-        vertexai=True,
-        project=os.environ.get("GOOGLE_CLOUD_PROJECT"),
-        location="global",
-    )
+    client = get_genai_client(location="global")
     try:
         if image_uri:
             image_location = image_uri
-            print(f"DEBUG: Using provided image_uri: {image_location}")
+            logging.debug(f"Using provided image_uri: {image_location}")
         else:
             image_location = tool_context.state["selected_file"]
-            print(f"DEBUG: Using state selected_file: {image_location}")
+            logging.debug(f"Using state selected_file: {image_location}")
     except:
         return {
             "status": "error",
             "message": "select the file for editing first using the file selection tool",
         }
-    bucket = os.environ.get("BUCKET", "default").split("gs://")[1]
-    logging.info(f"Selected bucket: {bucket}")
-    blob_name = image_location.split("/")[3]  # gs://bucket-name/blob
-    logging.info(f"Selected blob: {blob_name}")
-    image_to_edit = download_blob(bucket_name=bucket, source_blob_name=blob_name)
-    image_part = types.Part.from_bytes(data=image_to_edit, mime_type="image/png")
-    edit_contents = [
-        types.Content(
-            role="user", parts=[image_part, types.Part.from_text(text=prompt)]
-        )
-    ]
+    image_location = normalize_uri(image_location)
     generate_content_config = types.GenerateContentConfig(
         temperature=1,
         top_p=0.95,
         max_output_tokens=8192,
         response_modalities=["TEXT", "IMAGE"],
+        seed=seed,
     )
-    response = client.models.generate_content(
-        model="gemini-2.5-flash-image-preview",
-        contents=edit_contents,
-        config=generate_content_config,
+
+    cache = get_edit_cache()
+    result_key = None
+    if cache and image_location.startswith("gs://"):
+        try:
+            source_id = await run_blocking(_content_id, image_location)
+        except Exception as e:
+            # A failed lookup is a cache miss; the download below reports real errors.
+            logging.warning(f"Edit cache lookup of {image_location} failed: {e}")
+            source_id = None
+        if source_id:
+            result_key = cache_key(
+                model=EDIT_MODEL,
+                source=source_id,
+                prompt=prompt,
+                config=generate_content_config.model_dump(mode="json", exclude_none=True),
+            )
+            cached_uris = await run_blocking(cache.get, result_key) if use_cache else None
+            if cached_uris:
+                logging.info(f"Edit cache hit: {cached_uris}")
+                filenames = await _restore_cached_images(
+                    cached_uris, tool_context, "recontextualized_image_gcs_uri"
+                )
+                return {
+                    "status": "complete",
+                    "image_filenames": filenames,
+                    "image_uris": cached_uris,
+                    "previews": [preview_uris(uri) for uri in cached_uris],
+                    "cached": True,
+                }
+
+    bucket_name, blob_name = split_gcs_uri(image_location)
+    logging.info(f"Selected bucket: {bucket_name}, blob: {blob_name}")
+    with stage("gcs.download", uri=image_location) as download:
+        image_to_edit = await run_blocking(
+            download_blob, bucket_name=bucket_name, source_blob_name=blob_name
+        )
+        download.set(bytes=len(image_to_edit))
+    with stage("normalize", bytes=len(image_to_edit)):
+        source = await run_blocking(normalize_image, image_to_edit)
+    logging.info(
+        f"Normalized edit source {source.original_size} -> {source.size}, saved {source.bytes_saved} bytes"
     )
+    image_part = types.Part.from_bytes(data=source.data, mime_type=source.mime_type)
+    edit_contents = [
+        types.Content(
+            role="user", parts=[image_part, types.Part.from_text(text=prompt)]
+        )
+    ]
+    with stage("model.call", model=EDIT_MODEL, bytes=len(source.data)):
+        response = await get_scheduler().run(
+            EDIT_MODEL,
+            "global",
+            client.models.generate_content,
+            model=EDIT_MODEL,
+            contents=edit_contents,
+            config=generate_content_config,
+        )
     logging.info(f"Received response from the model.")
     filenames = []
     if (
@@ -106,36 +166,180 @@ async def edit_image(prompt: str, tool_context: ToolContext, image_uri: Optional
             part for part in response.candidates[0].content.parts if part.inline_data
         ]
         logging.info(f"Successfully generated {len(image_parts)} image(s).")
+        images = []
         for part in image_parts:
             if part.inline_data and part.inline_data.data:
-                generated_image_bytes = part.inline_data.data
-                filename = f"{uuid.uuid4()}.png"
-                logging.info(f"Saving generated image as artifact: {filename}")
-                filenames.append(filename)
-                await tool_context.save_artifact(
-                    filename,
-                    types.Part.from_bytes(
-                        data=generated_image_bytes,
-                        mime_type="image/png",
-                    ),
-                )
-                gcs_upload_op = await upload_file_to_gcs(
-                    file_path=filename,
-                    tool_context=tool_context,
-                    state_var_name="recontextualized_image_gcs_uri",
-                )
-                # save the last edited image for continuity
-                tool_context.state["selected_file"] = gcs_upload_op["gcs_uri"]
-                logging.info(f"Successfully saved artifact '{filename}'.")
+                images.append(part.inline_data.data)
             else:
                 logging.warning(f"Skipping an empty part in the response.")
-        return {
-            "status": "complete",
-            "image_filenames": filenames,
+        saved, failures = await persist_generated_images(
+            images,
+            tool_context=tool_context,
+            state_var_name="recontextualized_image_gcs_uri",
+        )
+        if saved:
+            # save the last edited image for continuity
+            tool_context.state["selected_file"] = saved[-1]["gcs_uri"]
+        result = {
+            "status": "complete" if saved or not failures else "error",
+            "image_filenames": [image["filename"] for image in saved],
+            "image_uris": [image["gcs_uri"] for image in saved],
+            "previews": [image["previews"] for image in saved],
         }
+        if failures:
+            result["failures"] = failures
+        elif result_key and saved:
+            await run_blocking(
+                cache.put, result_key, [image["gcs_uri"] for image in saved]
+            )
+        return result
 
 
-import mimetypes
+def _bucket_name() -> Optional[str]:
+    """Returns the bare bucket name from the BUCKET environment variable."""
+    gcs_bucket = os.environ.get("BUCKET")
+    if not gcs_bucket:
+        return None
+    if "gs://" in gcs_bucket:
+        return gcs_bucket.split("gs://")[1].strip("/")
+    return gcs_bucket.strip("/")
+
+
+async def upload_bytes_to_gcs(
+    data: bytes,
+    blob_name: str,
+    mime_type: str,
+    tool_context: ToolContext,
+    state_var_name: str,
+) -> dict[str, str]:
+    """
+    Uploads in-memory bytes to the GCS bucket without going through the artifact store.
+    Args:
+        data (bytes): The content to upload.
+        blob_name (str): The object name to upload to.
+        mime_type (str): The content type of the data.
+        tool_context (ToolContext): The tool context.
+        state_var_name (str): The name of the state variable to store the GCS URI.
+
+    Returns:
+        dict: A dictionary containing the status of the upload and the GCS URI if successful.
+    """
+    bucket_name = _bucket_name()
+    if not bucket_name:
+        logging.error("BUCKET environment variable is not set.")
+        return {"status": "error", "error": "Configuration error: BUCKET environment variable is not set"}
+    with stage("gcs.upload", bytes=len(data)):
+        await run_blocking(
+            get_storage_backend().write, bucket_name, blob_name, data, content_type=mime_type
+        )
+    gcs_uri = f"gs://{bucket_name}/{blob_name}"
+    # setup the gcs uri state variable if empty:
+    if not tool_context.state.get(state_var_name, False):
+        tool_context.state[state_var_name] = []
+    tool_context.state[state_var_name].append(gcs_uri)
+    return {"status": "ok", "gcs_uri": gcs_uri}
+
+
+async def upload_stream_to_gcs(
+    stream: BinaryIO,
+    blob_name: str,
+    mime_type: str,
+    rewind: bool = True,
+) -> dict[str, str]:
+    """
+    Uploads a file-like object to the GCS bucket in UPLOAD_CHUNK_SIZE pieces.
+
+    Only one chunk of the stream is held in memory at a time, so large uploads
+    never have to be read, copied or base64-encoded as a whole.
+    Args:
+        stream (BinaryIO): The readable, seekable source, e.g. an upload's spooled file.
+        blob_name (str): The object name to upload to.
+        mime_type (str): The content type of the data.
+        rewind (bool): Whether to seek to the start of the stream first; pass
+            False for streams that only support sequential reads.
+
+    Returns:
+        dict: A dictionary containing the status of the upload and the GCS URI if successful.
+    """
+    bucket_name = _bucket_name()
+    if not bucket_name:
+        logging.error("BUCKET environment variable is not set.")
+        return {"status": "error", "error": "Configuration error: BUCKET environment variable is not set"}
+    with stage("gcs.upload", streamed=True) as upload:
+        num_bytes = await run_blocking(
+            get_storage_backend().write_stream,
+            bucket_name,
+            blob_name,
+            stream,
+            content_type=mime_type,
+            rewind=rewind,
+            chunk_size=UPLOAD_CHUNK_SIZE,
+        )
+        upload.set(bytes=num_bytes)
+    return {"status": "ok", "gcs_uri": f"gs://{bucket_name}/{blob_name}"}
+
+
+async def stage_uploaded_image(
+    stream: BinaryIO,
+    blob_prefix: str,
+    mime_type: str,
+    rewind: bool = True,
+) -> dict[str, str]:
+    """
+    Normalizes an uploaded file and uploads the result to the GCS bucket.
+
+    Args:
+        stream (BinaryIO): The readable upload, e.g. an upload's spooled file.
+        blob_prefix (str): The object prefix, e.g. UPLOAD_PREFIX.
+        mime_type (str): The content type declared by the client.
+        rewind (bool): Whether to seek to the start of the stream first.
+
+    Returns:
+        dict: A dictionary containing the status of the upload and the GCS URI if successful.
+    """
+
+    def read() -> bytes:
+        if rewind:
+            stream.seek(0)
+        return stream.read()
+
+    return await stage_uploaded_bytes(await run_blocking(read), blob_prefix, mime_type)
+
+
+async def stage_uploaded_bytes(
+    data: Union[bytes, bytearray],
+    blob_prefix: str,
+    mime_type: str,
+) -> dict[str, str]:
+    """
+    Normalizes an uploaded image and uploads the result to the GCS bucket.
+
+    HTTP uploads are mostly phone photos, so they are downsized and stripped of
+    metadata like staged artifacts before any model reads them. The image has
+    to be complete to be decoded; only its normalized encoding is uploaded.
+    Args:
+        data (bytes): The uploaded image, or a bytearray that is no longer written to.
+        blob_prefix (str): The object prefix, e.g. UPLOAD_PREFIX.
+        mime_type (str): The content type declared by the client, kept for
+            data that cannot be decoded as an image.
+
+    Returns:
+        dict: A dictionary containing the status of the upload and the GCS URI if successful.
+    """
+    with stage("normalize", bytes=len(data)):
+        normalized = await run_blocking(normalize_image, data)
+    if normalized.mime_type.startswith("image/"):
+        mime_type = normalized.mime_type
+    extension = mimetypes.guess_extension(mime_type) or ".bin"
+    blob_name = f"{blob_prefix}/{uuid.uuid4().hex}{extension}"
+    upload_start = time.perf_counter()
+    result = await upload_stream_to_gcs(io.BytesIO(normalized.data), blob_name, mime_type)
+    if result["status"] == "ok":
+        normalization_stats.record_upload(
+            len(normalized.data), time.perf_counter() - upload_start
+        )
+    return result
+
 
 async def upload_file_to_gcs(
     file_path: str,
@@ -152,51 +356,241 @@ async def upload_file_to_gcs(
     Returns:
         dict: A dictionary containing the status of the upload and the GCS URI if successful.
     """
-    gcs_bucket = os.environ.get("BUCKET")
-    if not gcs_bucket:
+    if not _bucket_name():
         logging.error("BUCKET environment variable is not set.")
         return {"status": "error", "error": "Configuration error: BUCKET environment variable is not set"}
-    
-    if "gs://" in gcs_bucket:
-        bucket_name = gcs_bucket.split("gs://")[1].strip("/")
+    file_data, content_type = await _load_file_bytes(file_path, tool_context)
+    if file_data and content_type:
+        return await upload_bytes_to_gcs(
+            file_data,
+            # Local paths keep their directories, minus the root.
+            blob_name=file_path.lstrip("/"),
+            mime_type=content_type,
+            tool_context=tool_context,
+            state_var_name=state_var_name,
+        )
     else:
-        bucket_name = gcs_bucket.strip("/")
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(file_path)
-    # get the file bytes:
-    file_artifact = await tool_context.load_artifact(filename=file_path)
-    
-    file_data = None
-    content_type = None
+        return {"status": "error", "error": f"File not found: {file_path}"}
 
+
+async def _load_file_bytes(
+    file_path: str, tool_context: ToolContext
+) -> tuple[Optional[bytes], Optional[str]]:
+    """Reads a file from the artifact store, falling back to the local filesystem."""
+    file_artifact = await tool_context.load_artifact(filename=file_path)
     if (
         file_artifact
         and file_artifact.inline_data
         and file_artifact.inline_data.mime_type
     ):
-        file_data = file_artifact.inline_data.data
-        content_type = file_artifact.inline_data.mime_type
-    elif os.path.exists(file_path):
+        return file_artifact.inline_data.data, file_artifact.inline_data.mime_type
+    if os.path.exists(file_path):
         with open(file_path, "rb") as f:
             file_data = f.read()
         content_type, _ = mimetypes.guess_type(file_path)
-        if not content_type:
-            content_type = "application/octet-stream"
+        return file_data, content_type or "application/octet-stream"
+    return None, None
 
-    if file_data and content_type:
-        blob.upload_from_string(file_data, content_type=content_type)
-        # setup the gcs uri state variable if empty:
-        if not tool_context.state.get(state_var_name, False):
-            tool_context.state[state_var_name] = []
-        tool_context.state[state_var_name].append(f"gs://{bucket_name}/{file_path}")
 
-        return {
-            "status": "ok",
-            "gcs_uri": f"gs://{bucket_name}/{file_path}",
-        }
-    else:
+@traced("stage_input")
+async def stage_input_image(
+    file_path: str,
+    tool_context: ToolContext,
+    state_var_name: str,
+) -> dict[str, str]:
+    """
+    Stages an input image in GCS under its content hash.
+
+    The object is written to `inputs/<sha256>.<ext>` and only uploaded if it is not
+    there yet, so an image reused across requests is uploaded once. GCS gives
+    strong read-after-write consistency, so the returned URI is readable by the
+    model as soon as this returns.
+    Args:
+        file_path (str): The artifact name or local path of the image.
+        tool_context (ToolContext): The tool context.
+        state_var_name (str): The name of the state variable to store the GCS URI.
+
+    Returns:
+        dict: A dictionary containing the status of the staging, and the GCS URI and
+        content hash if successful.
+    """
+    bucket_name = _bucket_name()
+    if not bucket_name:
+        logging.error("BUCKET environment variable is not set.")
+        return {"status": "error", "error": "Configuration error: BUCKET environment variable is not set"}
+    file_data, content_type = await _load_file_bytes(file_path, tool_context)
+    if not (file_data and content_type):
         return {"status": "error", "error": f"File not found: {file_path}"}
+    # Downsize and re-encode first, so the staged object and its hash are those
+    # of what the model will actually read.
+    with stage("normalize", bytes=len(file_data)):
+        normalized = await run_blocking(normalize_image, file_data)
+    file_data = normalized.data
+    if normalized.mime_type.startswith("image/"):
+        content_type = normalized.mime_type
+
+    digest = hashlib.sha256(file_data).hexdigest()
+    extension = mimetypes.guess_extension(content_type) or ".bin"
+    blob_name = f"{INPUT_PREFIX}/{digest}{extension}"
+    gcs_uri = f"gs://{bucket_name}/{blob_name}"
+    if gcs_uri not in _staged_inputs:
+        backend = get_storage_backend()
+        if await run_blocking(backend.exists, bucket_name, blob_name):
+            logging.info(f"Input already staged at {gcs_uri}")
+        else:
+            try:
+                # Only create the object if it does not exist yet, so racing
+                # requests for the same image never overwrite each other.
+                upload_start = time.perf_counter()
+                with stage("gcs.upload", bytes=len(file_data)):
+                    await run_blocking(
+                        backend.write,
+                        bucket_name,
+                        blob_name,
+                        file_data,
+                        content_type=content_type,
+                        if_absent=True,
+                    )
+                normalization_stats.record_upload(
+                    len(file_data), time.perf_counter() - upload_start
+                )
+                logging.info(f"Staged input {file_path} at {gcs_uri}")
+            except PreconditionFailed:
+                logging.info(f"Input staged concurrently at {gcs_uri}")
+        _staged_inputs.add(gcs_uri)
+
+    if not tool_context.state.get(state_var_name, False):
+        tool_context.state[state_var_name] = []
+    tool_context.state[state_var_name].append(gcs_uri)
+    return {"status": "ok", "gcs_uri": gcs_uri, "sha256": digest}
+
+
+def preview_uris(gcs_uri: str) -> dict[str, str]:
+    """Returns the gs:// URI of each preview rendition of a generated image."""
+    bucket_name, blob_name = split_gcs_uri(gcs_uri)
+    stem = blob_name.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+    extension = "jpg" if PREVIEW_FORMAT == "jpeg" else PREVIEW_FORMAT
+    return {
+        name: f"gs://{bucket_name}/{PREVIEW_PREFIX}/{stem}-{name}.{extension}"
+        for name in PREVIEW_SIZES
+    }
+
+
+async def upload_previews(image_bytes: bytes, gcs_uri: str) -> dict[str, str]:
+    """
+    Renders the preview renditions of an image off the event loop and uploads them.
+
+    Previews are a convenience for clients, so a failure is logged and leaves
+    the image without previews rather than failing it.
+    Args:
+        image_bytes (bytes): The encoded full-size image.
+        gcs_uri (str): The GCS URI of the full-size image, which the preview
+            names are derived from.
+
+    Returns:
+        dict: The gs:// URI of each uploaded rendition by preview name.
+    """
+    try:
+        with stage("previews", image_count=len(PREVIEW_SIZES)) as previews:
+            renditions = await run_blocking(render_previews, image_bytes)
+            uris = preview_uris(gcs_uri)
+            backend = get_storage_backend()
+            previews.set(bytes=sum(len(data) for data in renditions.values()))
+            await asyncio.gather(
+                *(
+                    run_blocking(
+                        backend.write,
+                        *split_gcs_uri(uris[name]),
+                        data,
+                        content_type=preview_mime_type(),
+                    )
+                    for name, data in renditions.items()
+                )
+            )
+        return uris
+    except Exception as e:
+        logging.warning(f"Failed to create previews of {gcs_uri}: {e}")
+        return {}
+
+
+async def _save_artifact(
+    tool_context: ToolContext,
+    filename: str,
+    artifact: types.Part,
+    num_bytes: Optional[int] = None,
+) -> int:
+    """Saves an artifact inside an `artifact.save` span."""
+    with stage("artifact.save", filename=filename, bytes=num_bytes):
+        return await tool_context.save_artifact(filename, artifact)
+
+
+async def persist_generated_images(
+    images: list[bytes],
+    tool_context: ToolContext,
+    state_var_name: str,
+) -> tuple[list[dict], list[dict]]:
+    """
+    Saves generated images as artifacts and uploads them to GCS concurrently.
+
+    Each image also gets the preview renditions of `upload_previews`. At most
+    PERSIST_CONCURRENCY images are in flight at once. Results keep the order of
+    `images` regardless of which upload finishes first.
+
+    Args:
+        images (list[bytes]): The PNG bytes of each generated image.
+        tool_context (ToolContext): The tool context.
+        state_var_name (str): The name of the state variable to store the GCS URIs.
+
+    Returns:
+        tuple: The saved images as {"index", "filename", "gcs_uri", "previews"}
+        dicts, and the failed ones as {"index", "error"} dicts, both in input order.
+    """
+    semaphore = asyncio.Semaphore(PERSIST_CONCURRENCY)
+
+    async def persist(image_bytes: bytes) -> dict[str, str]:
+        async with semaphore:
+            filename = f"{uuid.uuid4()}.png"
+            logging.info(f"Saving generated image as artifact: {filename}")
+            # All sinks read the same immutable buffer, so none waits on the others.
+            _, gcs_upload_op, previews = await asyncio.gather(
+                _save_artifact(
+                    tool_context,
+                    filename,
+                    types.Part.from_bytes(data=image_bytes, mime_type="image/png"),
+                    len(image_bytes),
+                ),
+                upload_bytes_to_gcs(
+                    image_bytes,
+                    blob_name=filename,
+                    mime_type="image/png",
+                    tool_context=tool_context,
+                    state_var_name=state_var_name,
+                ),
+                upload_previews(image_bytes, f"gs://{_bucket_name()}/{filename}"),
+            )
+            if gcs_upload_op.get("status") != "ok":
+                raise RuntimeError(gcs_upload_op.get("error", "upload failed"))
+            logging.info(f"Successfully saved artifact '{filename}'.")
+            return {
+                "filename": filename,
+                "gcs_uri": gcs_upload_op["gcs_uri"],
+                "previews": previews,
+            }
+
+    with stage(
+        "persist", image_count=len(images), bytes=sum(len(image) for image in images)
+    ):
+        results = await asyncio.gather(
+            *(persist(image_bytes) for image_bytes in images), return_exceptions=True
+        )
+    saved, failures = [], []
+    for index, result in enumerate(results):
+        if isinstance(result, BaseException):
+            logging.error(f"Failed to persist generated image {index}: {result}")
+            failures.append({"index": index, "error": str(result)})
+        else:
+            saved.append({"index": index, **result})
+    return saved, failures
 
 
 # Example usage with multiple product images
@@ -217,10 +611,12 @@ async def before_agent_get_user_file(
     """
     Checks for a user-uploaded file before the agent runs.
 
-    If a file is found in the user's message, this callback processes it,
-    converts it to a PNG (if it's a PDF), and saves it as an artifact named
-    'user_uploaded_file'. It then returns a direct confirmation message to the
-    user and halts further agent processing for the current turn.
+    If a file is found in the user's message, this callback saves it as an
+    artifact under a random key. Images are labeled with the format sniffed from
+    their bytes and normalized (downsized, metadata stripped, re-encoded); other
+    files, such as PDFs, are saved unchanged. It then returns a direct
+    confirmation message to the user and halts further agent processing for the
+    current turn.
 
     If no file is found, it returns None, allowing the agent to proceed normally.
     """
@@ -238,7 +634,11 @@ async def before_agent_get_user_file(
     for part in parts:
         if part.inline_data and part.inline_data.data and part.inline_data.mime_type:
             file_bytes = part.inline_data.data
-            file_type = part.inline_data.mime_type
+            # Clients often label every upload image/png; trust the bytes instead.
+            file_type = sniff_mime_type(file_bytes) or part.inline_data.mime_type
+            if file_type.startswith("image/"):
+                normalized = await run_blocking(normalize_image, file_bytes)
+                file_bytes, file_type = normalized.data, normalized.mime_type
             artifact_key = f"{uuid.uuid4()}.{file_type.split('/')[-1]}"
 
             # create artifact
@@ -282,22 +682,32 @@ async def before_agent_get_user_file(
 
 def download_blob(bucket_name, source_blob_name):
     """
-    Downloads a blob from the bucket.
+    Downloads a blob from the bucket of the configured storage backend.
     Args:
         bucket_name (str): The ID of your GCS bucket
-        source_blob_name (str): The ID of your GCS object
+        source_blob_name (str): The ID of your GCS object, e.g. "products/shoes/side.png"
     Returns:
-        Blob content as bytes.
+        Blob content as bytes, or as a read-only memoryview of the mapped file
+        with the local backend.
     """
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
+    return get_storage_backend().read(bucket_name, source_blob_name)
+
+
+async def _model_image(gcs_uri: str, mime_type: Optional[str] = None) -> Image:
+    """Returns a stored image as a model input.
 
-    # Construct a client side representation of a blob.
-    # Note `Bucket.blob` differs from `Bucket.get_blob` as it doesn't retrieve
-    # any content from Google Cloud Storage. As we don't need additional data,
-    # using `Bucket.blob` is preferred here.
-    blob = bucket.blob(source_blob_name)
-    return blob.download_as_bytes()
+    Models read Cloud Storage objects themselves; objects of a backend they
+    cannot reach, such as the local one, are sent inline.
+    """
+    backend = get_storage_backend()
+    if backend.models_can_read:
+        return Image(gcs_uri=gcs_uri, mime_type=mime_type)
+    with stage("gcs.download", uri=gcs_uri) as download:
+        data = await run_blocking(backend.read, *split_gcs_uri(gcs_uri))
+        download.set(bytes=len(data))
+    return Image(
+        image_bytes=bytes(data), mime_type=mime_type or sniff_mime_type(data) or "image/png"
+    )
 
 
 # def file_selector(state_variable: str, index: int, tool_context: ToolContext):
@@ -322,6 +732,106 @@ def download_blob(bucket_name, source_blob_name):
 #         return {"status": "error", "error": "Index out of range"}
 
 
+def _selected_image_uri(tool_context: ToolContext, image_uri: Optional[str]) -> Optional[str]:
+    """Returns the image to animate: the given URI, else the `selected_file` state."""
+    if image_uri:
+        logging.debug(f"Using provided image_uri for video: {image_uri}")
+        return image_uri
+    selected_file = tool_context.state.get("selected_file")
+    logging.debug(f"Using state selected_file for video: {selected_file}")
+    return selected_file
+
+
+async def _generate_video_clip(
+    prompt: str,
+    negative_prompt: str,
+    number_of_videos: int,
+    image_gcs_uri: str,
+    tool_context: ToolContext,
+) -> dict:
+    """Submits one VEO operation, waits for it and saves the resulting clips."""
+    backend = get_storage_backend()
+    gen_config = GenerateVideosConfig(
+        aspect_ratio="16:9",
+        number_of_videos=number_of_videos,
+        # Without an output location VEO returns the clips inline.
+        output_gcs_uri=os.environ["BUCKET"] if backend.models_can_read else None,
+        negative_prompt=negative_prompt,
+    )
+    existing_image = await _model_image(image_gcs_uri, mime_type="image/png")
+    client = get_genai_client()
+    with stage("model.call", model=VEO_MODEL):
+        operation = await get_scheduler().run(
+            VEO_MODEL,
+            LOCATION,
+            client.models.generate_videos,
+            model=VEO_MODEL,
+            prompt=prompt,
+            image=existing_image,
+            config=gen_config,
+        )
+
+    with stage("veo.poll", model=VEO_MODEL, operation=operation.name):
+        operation = await get_operation_poller().wait(operation, client)
+
+    if operation.error:
+        return {"status": f"failed due to error: {operation.error}"}
+
+    saved = []
+    if operation.response and operation.result and operation.result.generated_videos:
+        if not os.getenv("BUCKET"):
+            return {"status": "error", "error": "BUCKET not set"}
+        for generated_video in operation.result.generated_videos:
+            video = generated_video.video if generated_video else None
+            if not (video and (video.uri or video.video_bytes)):
+                continue
+            filename = f"{uuid.uuid4()}.mp4"
+            video_uri = video.uri
+            if not video_uri:
+                # Clips returned inline are stored where VEO would have written them.
+                video_uri = f"gs://{_bucket_name()}/{filename}"
+                with stage("gcs.upload", bytes=len(video.video_bytes)):
+                    await run_blocking(
+                        backend.write,
+                        *split_gcs_uri(video_uri),
+                        video.video_bytes,
+                        content_type="video/mp4",
+                    )
+            if VIDEO_ARTIFACT_MODE == "reference":
+                # Record the artifact by reference; the MP4 stays in the bucket.
+                artifact = types.Part.from_uri(file_uri=video_uri, mime_type="video/mp4")
+            else:
+                video_bytes = video.video_bytes
+                if not video_bytes:
+                    with stage("gcs.download", uri=video_uri) as download:
+                        video_bytes = await run_blocking(
+                            download_blob, *split_gcs_uri(video_uri)
+                        )
+                        download.set(bytes=len(video_bytes))
+                artifact = types.Part.from_bytes(data=bytes(video_bytes), mime_type="video/mp4")
+            logging.info(f"Saved video {filename} from {video_uri}")
+            await _save_artifact(tool_context, filename, artifact)
+            saved.append((filename, video_uri))
+
+    if saved:
+        filename, video_uri = saved[-1]
+        return {
+            "status": "ok",
+            "video_filename": filename,
+            "video_uri": video_uri,
+        }
+
+    if operation.result and operation.result.rai_media_filtered_count > 0:
+        return {
+            "status": "error", 
+            "error": f"Video generation filtered. Reasons: {operation.result.rai_media_filtered_reasons}",
+            "rai_filtered": True,
+        }
+        
+    return {"status": "error", "error": "No video generated for unknown reason"}
+
+
+@traced("tool.generate_video")
 async def generate_video(
     prompt: str,
     tool_context: ToolContext,
@@ -330,7 +840,7 @@ async def generate_video(
     negative_prompt: str,
     image_uri: Optional[str] = None,
 ):
-    f"""Generates a video based on the prompt for VEO3.
+    """Generates a video based on the prompt for VEO3.
 
     Args:
         prompt (str): The prompt to generate the video from.
@@ -338,77 +848,143 @@ async def generate_video(
         number_of_videos (int, optional): The number of videos to generate.
         negative_prompt (str, optional): The negative prompt to use. 
         image_uri (str, optional): The URI of the image to animate. If not provided, the last generated image will be used.
-        existing_image_gcs_uri (str, optional): The existing image filename, use the saved gcs locations from the `recontextualized_image_gcs_uri` state variable
 
     Returns:
         dict: status dict
 
     """
-    gen_config = GenerateVideosConfig(
-        aspect_ratio="16:9",
-        number_of_videos=number_of_videos,
-        output_gcs_uri=os.environ["BUCKET"],
-        negative_prompt=negative_prompt,
-    )
-    try:
-        if image_uri:
-             existing_image_gcs_uri = image_uri
-             print(f"DEBUG: Using provided image_uri for video: {existing_image_gcs_uri}")
-        else:
-            existing_image_gcs_uri = tool_context.state["selected_file"]
-            print(f"DEBUG: Using state selected_file for video: {existing_image_gcs_uri}")
-    except KeyError:
+    existing_image_gcs_uri = _selected_image_uri(tool_context, image_uri)
+    if not existing_image_gcs_uri:
         return {
             "status": "error",
             "error": "State variable not found, be sure the file_selector tool was run",
         }
-
-    existing_image = types.Image(gcs_uri=existing_image_gcs_uri, mime_type="image/png")
-    client = get_genai_client()
-    operation = client.models.generate_videos(
-        model="veo-3.0-generate-preview",
+    result = await _generate_video_clip(
         prompt=prompt,
-        image=existing_image,
-        config=gen_config,
+        negative_prompt=negative_prompt,
+        number_of_videos=number_of_videos,
+        image_gcs_uri=existing_image_gcs_uri,
+        tool_context=tool_context,
     )
+    result.pop("rai_filtered", None)
+    return result
 
-    while not operation.done:
-        await asyncio.sleep(15)
-        operation = client.operations.get(operation)
-        print(operation)
 
-    if operation.error:
-        return {"status": f"failed due to error: {operation.error}"}
+@traced("tool.generate_video_shots")
+async def generate_video_shots(
+    prompts: list[str],
+    tool_context: ToolContext,
+    negative_prompts: Optional[list[str]] = None,
+    image_uri: Optional[str] = None,
+):
+    """Generates every shot of a multi-shot video sequence at once with VEO3.
 
-    if operation.response and operation.result and operation.result.generated_videos:
+    All shots animate the same source image and are submitted together, so the
+    whole sequence takes about as long as the slowest single clip.
 
-        for generated_video in operation.result.generated_videos:
-            if generated_video and generated_video.video and generated_video.video.uri:
-                video_uri = generated_video.video.uri
-                filename = uuid.uuid4()
-                BUCKET = os.getenv("BUCKET")
-                if BUCKET:
-                    video_bytes = download_blob(
-                        BUCKET.replace("gs://", ""),
-                        video_uri.replace(BUCKET, "")[1:],  # get rid of slash
-                    )
-                    print(f"The location for this video is here: {filename}.mp4")
-                    await tool_context.save_artifact(
-                        f"{filename}.mp4",
-                        types.Part.from_bytes(data=video_bytes, mime_type="video/mp4"),
-                    )
-                else:
-                    return {"status": "error", "error": "BUCKET not set"}
-        return {"status": "ok", "video_filename": f"{filename}.mp4"}
-    
-    if operation.result and operation.result.rai_media_filtered_count > 0:
+    Args:
+        prompts (list[str]): The prompt for each shot, in sequence order.
+        tool_context (ToolContext): The tool context.
+        negative_prompts (list[str], optional): The negative prompt for each shot, matching `prompts` by position.
+        image_uri (str, optional): The URI of the image to animate. If not provided, the last generated image will be used.
+
+    Returns:
+        dict: The overall status and a per-shot list of results, in shot order.
+    """
+    existing_image_gcs_uri = _selected_image_uri(tool_context, image_uri)
+    if not existing_image_gcs_uri:
         return {
-            "status": "error", 
-            "error": f"Video generation filtered. Reasons: {operation.result.rai_media_filtered_reasons}"
+            "status": "error",
+            "error": "State variable not found, be sure the file_selector tool was run",
         }
-        
-    return {"status": "error", "error": "No video generated for unknown reason"}
+    negative_prompts = negative_prompts or []
+    if len(negative_prompts) > len(prompts):
+        return {
+            "status": "error",
+            "error": "Received more negative prompts than shot prompts",
+        }
+    negative_prompts = negative_prompts + [""] * (len(prompts) - len(negative_prompts))
 
+    results = await asyncio.gather(
+        *(
+            _generate_video_clip(
+                prompt=prompt,
+                negative_prompt=negative_prompt,
+                number_of_videos=1,
+                image_gcs_uri=existing_image_gcs_uri,
+                tool_context=tool_context,
+            )
+            for prompt, negative_prompt in zip(prompts, negative_prompts)
+        ),
+        return_exceptions=True,
+    )
+
+    shots = []
+    for index, (prompt, result) in enumerate(zip(prompts, results)):
+        if isinstance(result, BaseException):
+            logging.error(f"Shot {index} failed: {result}")
+            result = {"status": "error", "error": str(result)}
+        elif result.pop("rai_filtered", False):
+            result["status"] = "filtered"
+        elif result["status"] != "ok":
+            result = {"status": "error", "error": result.get("error", result["status"])}
+        shots.append({"shot": index, "prompt": prompt, **result})
+
+    completed = sum(shot["status"] == "ok" for shot in shots)
+    if completed == len(shots):
+        status = "ok"
+    elif completed:
+        status = "partial"
+    else:
+        status = "error"
+    return {"status": status, "shots": shots}
+
+
+
+def _content_id(gcs_uri: str) -> Optional[str]:
+    """Returns a content fingerprint of a GCS object from its metadata, without downloading it."""
+    info = get_storage_backend().stat(*split_gcs_uri(gcs_uri))
+    if info is None:
+        return None
+    if info.md5_hash:
+        return f"md5:{info.md5_hash}"
+    # Composite objects have no MD5.
+    return f"crc32c:{info.crc32c}:{info.size}"
+
+
+async def _restore_cached_images(
+    image_uris: list[str], tool_context: ToolContext, state_var_name: str
+) -> list[str]:
+    """Records cached result URIs as artifacts and in state, as a fresh run would.
+
+    The images are downloaded and saved inline like fresh results, since
+    clients render artifacts from their inline data and may not be able to
+    read the bucket themselves.
+
+    Returns:
+        list[str]: The artifact filenames, matching `image_uris` by position.
+    """
+
+    async def restore(filename: str, uri: str):
+        async with semaphore:
+            with stage("gcs.download", uri=uri) as download:
+                image_bytes = bytes(await run_blocking(download_blob, *split_gcs_uri(uri)))
+                download.set(bytes=len(image_bytes))
+            mime_type = sniff_mime_type(image_bytes) or "image/png"
+            await _save_artifact(
+                tool_context,
+                filename,
+                types.Part.from_bytes(data=image_bytes, mime_type=mime_type),
+                len(image_bytes),
+            )
+
+    semaphore = asyncio.Semaphore(PERSIST_CONCURRENCY)
+    filenames = [uri.rsplit("/", 1)[-1] for uri in image_uris]
+    await asyncio.gather(*(restore(filename, uri) for filename, uri in zip(filenames, image_uris)))
+    state_uris = tool_context.state.get(state_var_name) or []
+    tool_context.state[state_var_name] = state_uris + image_uris
+    tool_context.state["selected_file"] = image_uris[-1]
+    return filenames
 
 
 def normalize_uri(uri: str) -> str:
@@ -417,6 +993,7 @@ def normalize_uri(uri: str) -> str:
         return uri.replace("https://storage.googleapis.com/", "gs://")
     return uri
 
+@traced("tool.generate_virtual_try_on_images")
 async def generate_virtual_try_on_images(
     person_uri: str,
     product_uri: str,
@@ -438,105 +1015,134 @@ async def generate_virtual_try_on_images(
     person_uri = normalize_uri(person_uri)
     product_uri = normalize_uri(product_uri)
 
-    print(f"DEBUG: Starting virtual try-on generation with person_uri: {person_uri} and product_uri: {product_uri}")
     logging.info(
         f"Starting virtual try-on generation with person_uri: {person_uri} and product_uri: {product_uri}"
     )
-    print(f"DEBUG: Starting virtual try-on generation with person_uri: {person_uri} and product_uri: {product_uri}")
     try:
-        # Load person artifact
         logging.info(f"Loading person artifact: {person_uri}")
-        # check if the person uri is a gcs one
-        if person_uri.startswith("gs://"):
-            person_gcs_uri = person_uri
-            print(f"DEBUG: Using existing person GCS URI: {person_gcs_uri}")
-        else:
-            person_upload_result = await upload_file_to_gcs(
-                file_path=person_uri,
+        # gs:// inputs are used as-is, anything else is staged by content hash
+        async def resolve(uri: str, state_var_name: str) -> dict[str, str]:
+            if uri.startswith("gs://"):
+                logging.debug(f"Using existing GCS URI: {uri}")
+                return {"status": "ok", "gcs_uri": uri}
+            return await stage_input_image(
+                file_path=uri,
                 tool_context=tool_context,
-                state_var_name="person_gcs_uri",
+                state_var_name=state_var_name,
             )
-            if person_upload_result.get("status") == "error":
-                 print(f"DEBUG: Person upload failed: {person_upload_result.get('error')}")
-                 return {"Status": "generation_error", "Error": f"Failed to upload person image: {person_upload_result.get('error')}"}
-            print("DEBUG: Person upload successful, sleeping 1s")
-            await asyncio.sleep(1)
-            person_gcs_uri = person_upload_result["gcs_uri"]
+
         logging.info(f"Loading product artifact: {product_uri}")
-        if product_uri.startswith("gs://"):
-            product_gcs_uri = product_uri
-            print(f"DEBUG: Using existing product GCS URI: {product_gcs_uri}")
-        else:
-            product_upload_result = await upload_file_to_gcs(
-                file_path=product_uri,
-                tool_context=tool_context,
-                state_var_name="product_gcs_uri",
+        person_upload_result, product_upload_result = await asyncio.gather(
+            resolve(person_uri, "person_gcs_uri"),
+            resolve(product_uri, "product_gcs_uri"),
+        )
+        if person_upload_result.get("status") == "error":
+            logging.debug(f"Person upload failed: {person_upload_result.get('error')}")
+            return {"Status": "generation_error", "Error": f"Failed to upload person image: {person_upload_result.get('error')}"}
+        if product_upload_result.get("status") == "error":
+            logging.debug(f"Product upload failed: {product_upload_result.get('error')}")
+            return {"Status": "generation_error", "Error": f"Failed to upload product image: {product_upload_result.get('error')}"}
+        person_gcs_uri = person_upload_result["gcs_uri"]
+        product_gcs_uri = product_upload_result["gcs_uri"]
+
+        cache = get_try_on_cache()
+        result_key = None
+        if cache:
+            async def content_id(upload_result: dict) -> Optional[str]:
+                if upload_result.get("sha256"):
+                    return f"sha256:{upload_result['sha256']}"
+                return await run_blocking(_content_id, upload_result["gcs_uri"])
+
+            person_id, product_id = await asyncio.gather(
+                content_id(person_upload_result), content_id(product_upload_result)
             )
-            if product_upload_result.get("status") == "error":
-                 print(f"DEBUG: Product upload failed: {product_upload_result.get('error')}")
-                 return {"Status": "generation_error", "Error": f"Failed to upload product image: {product_upload_result.get('error')}"}
-            print("DEBUG: Product upload successful, sleeping 1s")
-            await asyncio.sleep(1)
-            product_gcs_uri = product_upload_result["gcs_uri"]
-        logging.info("Calling the virtual try-on model 'virtual-try-on-preview-08-04'")
-        print("DEBUG: Calling virtual-try-on-preview-08-04")
-        client = get_genai_client()
-        image = client.models.recontext_image(
-            model="virtual-try-on-preview-08-04",
-            source=types.RecontextImageSource(
-                person_image=Image.from_file(location=f"{person_gcs_uri}"),
-                # person_image=person_part,
-                product_images=[
-                    types.ProductImage(
-                        product_image=Image.from_file(location=f"{product_gcs_uri}")
+            if person_id and product_id:
+                result_key = cache_key(
+                    model=VTO_MODEL,
+                    person=person_id,
+                    product=product_id,
+                    config={"number_of_images": number_of_images},
+                )
+                cached_uris = await run_blocking(cache.get, result_key)
+                if cached_uris:
+                    logging.info(f"Virtual try-on cache hit: {cached_uris}")
+                    filenames = await _restore_cached_images(
+                        cached_uris, tool_context, "virtual_product_try_on_gcs_uri"
                     )
-                ],
-            ),
-            config=RecontextImageConfig(number_of_images=number_of_images),
+                    return {
+                        "status": "complete",
+                        "image_filenames": [
+                            name for pair in zip(filenames, cached_uris) for name in pair
+                        ],
+                        "image_uris": cached_uris,
+                        "previews": [preview_uris(uri) for uri in cached_uris],
+                        "cached": True,
+                    }
+
+        logging.info(f"Calling the virtual try-on model '{VTO_MODEL}'")
+        logging.debug(f"Calling {VTO_MODEL}")
+        client = get_genai_client()
+        person_image, product_image = await asyncio.gather(
+            _model_image(person_gcs_uri), _model_image(product_gcs_uri)
         )
+        with stage("model.call", model=VTO_MODEL, image_count=number_of_images):
+            image = await get_scheduler().run(
+                VTO_MODEL,
+                LOCATION,
+                client.models.recontext_image,
+                model=VTO_MODEL,
+                source=types.RecontextImageSource(
+                    person_image=person_image,
+                    # person_image=person_part,
+                    product_images=[
+                        types.ProductImage(
+                            product_image=product_image
+                        )
+                    ],
+                ),
+                config=RecontextImageConfig(number_of_images=number_of_images),
+            )
         logging.info(f"Received response from the model.")
 
-        filenames = []
         if image and image.generated_images:
             logging.info(
                 f"Successfully generated {len(image.generated_images)} image(s)."
             )
+            images = []
             for generated_image in image.generated_images:
                 if generated_image.image and generated_image.image.image_bytes:
-                    generated_image_bytes = generated_image.image.image_bytes
-                    filename = f"{uuid.uuid4()}.png"
-                    logging.info(f"Saving generated image as artifact: {filename}")
-                    filenames.append(filename)
-                    await tool_context.save_artifact(
-                        filename,
-                        types.Part.from_bytes(
-                            data=generated_image_bytes,
-                            mime_type="image/png",
-                        ),
-                    )
-                    gcs_upload_op = await upload_file_to_gcs(
-                        file_path=filename,
-                        tool_context=tool_context,
-                        state_var_name="virtual_product_try_on_gcs_uri",
-                    )
-                    tool_context.state["selected_file"] = gcs_upload_op["gcs_uri"]
-                    print(f"DEBUG: Saved selected_file state: {tool_context.state['selected_file']}")
-                    logging.info(f"Successfully saved artifact '{filename}'.")
-                    # Also append full GCS URI to filenames for return value so agent can use it
-                    filenames.append(gcs_upload_op["gcs_uri"])
+                    images.append(generated_image.image.image_bytes)
                 else:
                     logging.warning(
                         f"Skipping an empty generated image in the response."
                     )
-            return {
-                "status": "complete",
+            saved, failures = await persist_generated_images(
+                images,
+                tool_context=tool_context,
+                state_var_name="virtual_product_try_on_gcs_uri",
+            )
+            filenames = []
+            for saved_image in saved:
+                filenames.append(saved_image["filename"])
+                # Also append full GCS URI to filenames for return value so agent can use it
+                filenames.append(saved_image["gcs_uri"])
+            if saved:
+                tool_context.state["selected_file"] = saved[-1]["gcs_uri"]
+                logging.debug(f"Saved selected_file state: {tool_context.state['selected_file']}")
+            result = {
+                "status": "complete" if saved or not failures else "generation_error",
                 "image_filenames": filenames,
-                "image_uris": [f for f in filenames if f.startswith("gs://")],
+                "image_uris": [saved_image["gcs_uri"] for saved_image in saved],
+                "previews": [saved_image["previews"] for saved_image in saved],
             }
+            if failures:
+                result["failures"] = failures
+            elif result_key and saved:
+                await run_blocking(cache.put, result_key, result["image_uris"])
+            return result
     except Exception as e:
         logging.error(
             f"An unexpected error occurred in generate_virtual_try_on_image: {e}, double check the product and person images are not swapped",
             exc_info=True,
         )
-        print(f"DEBUG: Exception in generate_virtual_try_on_images: {e}")
         return {"Status": "generation_error", "Error": str(e)}
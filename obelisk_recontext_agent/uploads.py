@@ -0,0 +1,173 @@
+"""Stages multipart image uploads in the bucket as they are received.
+
+The request body is parsed on the event loop as it arrives. Each file part is
+collected in memory, up to the size limit, and rejected as soon as it crosses
+the limit. When a part is complete, it is normalized (see
+`images.normalize_image`) and uploaded on the I/O executor while the rest of
+the body is still being received. No part is spooled to local disk, and no
+executor thread waits on a slow client.
+"""
+import asyncio
+import os
+from typing import Optional
+
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from . import tools
+
+# Largest accepted image, per file part.
+MAX_UPLOAD_BYTES = int(os.getenv("OBELISK_MAX_UPLOAD_BYTES", str(20 << 20)))
+# Largest accepted plain form field, e.g. number_of_images.
+MAX_FIELD_BYTES = 64 << 10
+
+
+class UploadError(Exception):
+    """Raised when an upload is rejected; carries the HTTP status to answer with."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class _FilePart:
+    def __init__(self, field: str, mime_type: str):
+        self.field = field
+        self.mime_type = mime_type
+        self.data = bytearray()
+        self.task: Optional[asyncio.Task] = None
+
+    def finish(self):
+        """Starts staging the complete part."""
+        self.task = asyncio.create_task(
+            tools.stage_uploaded_bytes(self.data, tools.UPLOAD_PREFIX, self.mime_type)
+        )
+
+
+async def stage_multipart_images(
+    request, file_fields: set[str], max_bytes: Optional[int] = None
+) -> tuple[dict[str, str], dict[str, str]]:
+    """Normalizes and uploads the image parts of a multipart request while it is received.
+
+    Args:
+        request (starlette.requests.Request): The incoming multipart/form-data request.
+        file_fields (set[str]): Names of the required image fields.
+        max_bytes (int, optional): Size limit per image. Defaults to MAX_UPLOAD_BYTES.
+
+    Returns:
+        tuple: The gs:// URI of each image field, and the plain form fields.
+
+    Raises:
+        UploadError: If the body is not multipart, an image is missing, is not an
+            image, exceeds the size limit, or cannot be uploaded.
+    """
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise UploadError(415, "Expected a multipart/form-data body")
+    declared = request.headers.get("content-length")
+    if declared and int(declared) > max_bytes * len(file_fields) + MAX_FIELD_BYTES:
+        raise UploadError(413, f"Uploads are limited to {max_bytes} bytes per image")
+    if not tools._bucket_name():
+        raise UploadError(500, "Configuration error: BUCKET environment variable is not set")
+
+    # The parser reports synchronously; events are handled after each write.
+    events: list[tuple[str, bytes]] = []
+
+    def record(name: str):
+        return lambda *args: events.append(
+            (name, bytes(args[0][args[1] : args[2]]) if args else b"")
+        )
+
+    parser = MultipartParser(
+        options[b"boundary"],
+        {
+            name: record(name)
+            for name in (
+                "on_part_begin",
+                "on_header_field",
+                "on_header_value",
+                "on_header_end",
+                "on_headers_finished",
+                "on_part_data",
+                "on_part_end",
+            )
+        },
+    )
+    parts: list[_FilePart] = []
+    fields: dict[str, str] = {}
+    headers: dict[bytes, bytes] = {}
+    header_field = header_value = b""
+    current: Optional[_FilePart] = None
+    field_name, field_value = "", bytearray()
+
+    async def handle(name: str, data: bytes):
+        nonlocal header_field, header_value, current, field_name
+        if name == "on_part_begin":
+            headers.clear()
+            current, field_name = None, ""
+            field_value.clear()
+        elif name == "on_header_field":
+            header_field += data
+        elif name == "on_header_value":
+            header_value += data
+        elif name == "on_header_end":
+            headers[header_field.lower()] = header_value
+            header_field = header_value = b""
+        elif name == "on_headers_finished":
+            _, disposition = parse_options_header(headers.get(b"content-disposition", b""))
+            field_name = disposition.get(b"name", b"").decode()
+            if field_name in file_fields:
+                mime_type = headers.get(b"content-type", b"").decode()
+                if not mime_type.startswith("image/"):
+                    raise UploadError(415, f"{field_name} must be an image, got '{mime_type}'")
+                current = _FilePart(field_name, mime_type)
+                parts.append(current)
+        elif name == "on_part_data":
+            if current is not None:
+                if len(current.data) + len(data) > max_bytes:
+                    raise UploadError(
+                        413, f"{current.field} is larger than the {max_bytes} byte limit"
+                    )
+                current.data += data
+            else:
+                field_value.extend(data)
+                if len(field_value) > MAX_FIELD_BYTES:
+                    raise UploadError(413, f"Form field {field_name} is too large")
+        elif name == "on_part_end":
+            if current is not None:
+                current.finish()
+            elif field_name:
+                fields[field_name] = field_value.decode()
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for event in events:
+                await handle(*event)
+            events.clear()
+        parser.finalize()
+        for event in events:
+            await handle(*event)
+        missing = file_fields - {part.field for part in parts}
+        if missing:
+            raise UploadError(422, f"Missing image field(s): {', '.join(sorted(missing))}")
+        if any(part.task is None for part in parts):
+            raise UploadError(400, "The multipart body ended inside an image")
+        results = await asyncio.gather(*(part.task for part in parts))
+    except BaseException as e:
+        # Stop staging the parts that were already complete.
+        tasks = [part.task for part in parts if part.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if isinstance(e, UploadError) or not isinstance(e, Exception):
+            raise
+        raise UploadError(500, f"Upload failed: {e}") from e
+
+    uris = {}
+    for part, result in zip(parts, results):
+        if result.get("status") != "ok":
+            raise UploadError(500, result.get("error", "Upload failed"))
+        uris[part.field] = result["gcs_uri"]
+    return uris, fields
@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+import pytest
+
+# The fakes are shared with the benchmarks, which give them real latencies.
+from benchmarks.fakes import FakeGenAIClient, FakeStorageClient, FakeToolContext
+from obelisk_recontext_agent import tools
+from obelisk_recontext_agent.cache import ResultCache
+from obelisk_recontext_agent.poller import OperationPoller
+from obelisk_recontext_agent.scheduler import DEFAULT_MODEL_QPM, ModelScheduler
+from obelisk_recontext_agent.storage_backends import GCSStorageBackend
+
+
+@pytest.fixture
+def fake_backends(monkeypatch, tmp_path):
+    """Patches the tools onto blocking fake GenAI and storage clients and a fresh cache."""
+    monkeypatch.setenv("BUCKET", "gs://test-bucket")
+    storage_client = FakeStorageClient()
+    genai_client = FakeGenAIClient(
+        storage_client, video_duration=0.0, video_bytes=None, image_bytes=b"\x89PNG fake"
+    )
+    try_on_cache = ResultCache("virtual_try_on", max_bytes=1 << 20, directory=str(tmp_path / "vto"))
+    edit_cache = ResultCache("edit_image", max_bytes=1 << 20, ttl=60, directory=str(tmp_path / "edit"))
+    monkeypatch.setattr(tools, "get_try_on_cache", lambda: try_on_cache)
+    monkeypatch.setattr(tools, "get_edit_cache", lambda: edit_cache)
+    monkeypatch.setattr(tools, "get_genai_client", lambda *a, **kw: genai_client)
+    monkeypatch.setattr(tools, "get_storage_backend", lambda: GCSStorageBackend(storage_client))
+    monkeypatch.setattr(tools, "_staged_inputs", set())
+    # Quotas are exercised in test_scheduler; here they must not add latency.
+    unlimited = {model_id: 1e9 for model_id in DEFAULT_MODEL_QPM}
+    monkeypatch.setattr(tools, "get_scheduler", lambda: ModelScheduler(qpm=unlimited))
+    monkeypatch.setattr(
+        tools,
+        "get_operation_poller",
+        lambda: OperationPoller(min_interval=0.01, max_interval=0.05, expected_duration=0.05),
+    )
+    return SimpleNamespace(
+        genai=genai_client,
+        storage=storage_client,
+        try_on_cache=try_on_cache,
+        edit_cache=edit_cache,
+    )
@@ -0,0 +1,190 @@
+import asyncio
+import io
+import json
+import re
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import adk_wrapper
+
+
+def sse_body(events):
+    return "".join(f"data: {json.dumps(event)}\n\n" for event in events).encode()
+
+
+def tool_event(uris):
+    return {
+        "author": "root_agent",
+        "content": {
+            "parts": [
+                {
+                    "functionResponse": {
+                        "name": "generate_virtual_try_on_images",
+                        "response": {"status": "complete", "image_uris": uris},
+                    }
+                }
+            ]
+        },
+    }
+
+
+class FakeADK:
+    """Answers the ADK session and run_sse endpoints with canned events."""
+
+    def __init__(self, events):
+        self.events = events
+        self.created = []
+        self.deleted = []
+        self.runs = []
+        self.messages = []
+        self.state_deltas = []
+
+    def __call__(self, request):
+        path = request.url.path
+        if request.method == "POST" and path.endswith("/sessions"):
+            session_id = f"s{len(self.created)}"
+            self.created.append(path.split("/")[4])
+            return httpx.Response(200, json={"id": session_id})
+        if request.method == "DELETE":
+            self.deleted.append(path.rsplit("/", 1)[1])
+            return httpx.Response(200, json={})
+        assert path == "/run_sse"
+        payload = json.loads(request.content)
+        assert payload["streaming"] is True
+        self.runs.append((payload["userId"], payload["sessionId"]))
+        self.messages.append(payload["newMessage"])
+        self.state_deltas.append(payload.get("stateDelta"))
+        return httpx.Response(200, content=sse_body(self.events))
+
+
+@pytest.fixture
+def fake_adk(monkeypatch):
+    adk = FakeADK([])
+    real_client = httpx.AsyncClient
+
+    def client(**kwargs):
+        return real_client(transport=httpx.MockTransport(adk), **kwargs)
+
+    monkeypatch.setattr(adk_wrapper.httpx, "AsyncClient", client)
+    return adk
+
+
+def test_relay_forwards_events_and_images(fake_adk):
+    fake_adk.events = [
+        {"author": "root_agent", "content": {"parts": [{"text": "Working on it"}]}},
+        tool_event(["gs://bucket/a.png", "gs://bucket/b.png"]),
+    ]
+    with TestClient(adk_wrapper.app) as client:
+        response = client.post(
+            "/recontextualize/stream", json={"image_url": "gs://bucket/in.png", "prompt": "beach"}
+        )
+    chunks = [chunk for chunk in response.text.split("\n\n") if chunk]
+    kinds = [chunk.split("\n", 1)[0] for chunk in chunks]
+    assert kinds == ["event: adk", "event: adk", "event: image", "event: image", "event: done"]
+    assert "gs://bucket/a.png" in chunks[2]
+
+
+def client_id_of(client):
+    return adk_wrapper.verify_client_id(client.cookies[adk_wrapper.CLIENT_ID_COOKIE])
+
+
+def test_clients_get_isolated_reused_sessions(fake_adk):
+    fake_adk.events = [tool_event(["gs://bucket/first.png"]), tool_event(["gs://bucket/second.png"])]
+    body = {"image_url": "gs://bucket/in.png", "prompt": "beach"}
+    with TestClient(adk_wrapper.app) as client:
+        first = client.post("/recontextualize", json=body)
+        client.post("/recontextualize", json=body)
+        alice = client_id_of(client)
+        # A new browser, without the cookie.
+        client.cookies.clear()
+        client.post("/recontextualize", json=body)
+        bob = client_id_of(client)
+
+    assert first.json() == {"image_url": "gs://bucket/first.png"}
+    assert alice != bob
+    assert fake_adk.created == [alice, bob]
+    assert fake_adk.runs == [(alice, "s0"), (alice, "s0"), (bob, "s1")]
+
+
+def test_client_ids_cannot_be_chosen_by_the_client(fake_adk):
+    body = {"image_url": "gs://bucket/in.png", "prompt": "beach"}
+    with TestClient(adk_wrapper.app) as client:
+        client.post("/recontextualize", json=body)
+        alice = client_id_of(client)
+        client.cookies.clear()
+        client.post("/recontextualize", json=body, headers={"X-Client-Id": alice})
+        client.cookies.clear()
+        client.cookies.set(adk_wrapper.CLIENT_ID_COOKIE, alice)
+        client.post("/recontextualize", json=body)
+
+    assert [user_id for user_id, _ in fake_adk.runs].count(alice) == 1
+    assert len(set(fake_adk.created)) == 3
+
+
+def test_idle_sessions_are_evicted(fake_adk):
+    async def scenario():
+        async with httpx.AsyncClient(base_url="http://adk") as client:
+            manager = adk_wrapper.SessionManager(client, idle_ttl=0)
+            async with manager.session("alice"):
+                await manager.evict_idle()  # in use, so kept
+            assert "alice" in manager.sessions
+            await manager.evict_idle()
+            return manager
+
+    manager = asyncio.run(scenario())
+    assert manager.sessions == {}
+    assert fake_adk.deleted == ["s0"]
+
+
+def test_try_on_uploads_are_sent_by_reference(fake_adk, fake_backends):
+    fake_adk.events = [tool_event(["gs://test-bucket/out.png"])]
+    with TestClient(adk_wrapper.app) as client:
+        response = client.post(
+            "/virtual-try-on",
+            files={
+                "person_image": ("person.png", b"person-bytes", "image/png"),
+                "product_image": ("product.jpg", b"product-bytes", "image/jpeg"),
+            },
+        )
+        client_id = client_id_of(client)
+
+    assert response.json() == {"image_url": "gs://test-bucket/out.png"}
+    objects = fake_backends.storage.objects
+    staged = {data: name for name, (data, _) in objects.items()}
+    assert staged[b"person-bytes"].startswith(adk_wrapper.client_upload_prefix(client_id) + "/")
+    assert staged[b"product-bytes"].endswith(".jpg")
+    [message] = fake_adk.messages
+    assert message["parts"] == [{"text": adk_wrapper.try_on_message(
+        f"gs://test-bucket/{staged[b'person-bytes']}",
+        f"gs://test-bucket/{staged[b'product-bytes']}",
+    )}]
+
+
+def test_upload_prefix_cannot_escape_the_client_directory(fake_backends):
+    class Upload:
+        content_type = "image/png"
+        file = io.BytesIO(b"person-bytes")
+
+    asyncio.run(adk_wrapper.stage_upload(Upload(), "../other"))
+
+    [name] = fake_backends.storage.objects
+    prefix, client_dir, _ = name.split("/")
+    assert prefix == "uploads"
+    assert re.fullmatch("[0-9a-f]{32}", client_dir)
+
+
+def test_latency_profile_header_is_sent_as_session_state(fake_adk):
+    body = {"image_url": "gs://bucket/in.png", "prompt": "beach"}
+    with TestClient(adk_wrapper.app) as client:
+        client.post(
+            "/recontextualize", json=body, headers={"X-Latency-Profile": "interactive-fast"}
+        )
+        client.post("/recontextualize", json=body)
+        unknown = client.post(
+            "/recontextualize", json=body, headers={"X-Latency-Profile": "warp"}
+        )
+
+    assert fake_adk.state_deltas == [{"latency_profile": "interactive-fast"}] * 2
+    assert unknown.status_code == 400
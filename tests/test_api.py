@@ -0,0 +1,121 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from obelisk_recontext_agent.api import app, job_manager
+
+
+def _wait_for(client, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "partial", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_virtual_try_on_returns_a_job_and_reports_the_result(fake_backends):
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/virtual-try-on",
+            files={
+                "person_image": ("person.png", b"\x89PNG person", "image/png"),
+                "product_image": ("product.png", b"\x89PNG product", "image/png"),
+            },
+            data={"number_of_images": "2"},
+        )
+        assert response.status_code == 202
+        job = _wait_for(client, response.json()["job_id"])
+
+    assert job["status"] == "succeeded"
+    assert len(job["result"]["image_uris"]) == 2
+    event_types = [event["type"] for event in job["events"]]
+    assert event_types[:2] == ["queued", "running"]
+    assert event_types.count("artifact") == 2
+    assert event_types[-1] == "succeeded"
+
+
+def test_job_events_stream_as_server_sent_events(fake_backends):
+    fake_backends.storage.objects["source.png"] = (b"source", "image/png")
+    with TestClient(app) as client:
+        job_id = client.post(
+            "/api/recontextualize",
+            json={"image_url": "gs://test-bucket/source.png", "prompt": "beach"},
+        ).json()["job_id"]
+        with client.stream("GET", f"/api/jobs/{job_id}/events") as stream:
+            body = "".join(stream.iter_text())
+
+    assert "event: queued" in body
+    assert "event: succeeded" in body
+
+
+def test_out_of_range_image_count_is_rejected_before_queueing(fake_backends):
+    files = {
+        "person_image": ("person.png", b"\x89PNG person", "image/png"),
+        "product_image": ("product.png", b"\x89PNG product", "image/png"),
+    }
+    with TestClient(app) as client:
+        jobs_before = len(job_manager.jobs)
+        for count in ("0", "-1", "1000"):
+            response = client.post(
+                "/api/virtual-try-on", files=files, data={"number_of_images": count}
+            )
+            assert response.status_code == 422
+        response = client.post(
+            "/api/pipeline",
+            json={"person_uri": "gs://b/p.png", "product_uri": "gs://b/q.png", "number_of_images": 0},
+        )
+        assert response.status_code == 422
+        assert len(job_manager.jobs) == jobs_before
+
+
+def test_unknown_job_is_404():
+    with TestClient(app) as client:
+        assert client.get("/api/jobs/missing").status_code == 404
+
+
+def test_pipeline_job_reports_every_stage(fake_backends):
+    fake_backends.storage.objects["person.png"] = (b"person", "image/png")
+    fake_backends.storage.objects["product.png"] = (b"product", "image/png")
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/pipeline",
+            json={
+                "person_uri": "gs://test-bucket/person.png",
+                "product_uri": "https://storage.googleapis.com/test-bucket/product.png",
+                "edit_prompts": ["beach"],
+            },
+        )
+        assert response.status_code == 202
+        job = _wait_for(client, response.json()["job_id"])
+
+    assert job["result"]["status"] == "complete"
+    stages = [event["stage"] for event in job["events"] if event["type"] == "stage"]
+    assert stages == ["try_on", "edit:0"]
+    assert set(job["result"]["timings"]) == {"total_s", "tools_s", "orchestration_s"}
+
+
+def test_batch_job_reports_progress_and_throughput(fake_backends):
+    for name in ("person.png", "product-0.png", "product-1.png"):
+        fake_backends.storage.objects[name] = (name.encode(), "image/png")
+    items = [
+        {"person_uri": "gs://test-bucket/person.png", "product_uri": f"gs://test-bucket/product-{i}.png"}
+        for i in range(2)
+    ] + [{"person_uri": "missing-person.png", "product_uri": "gs://test-bucket/product-0.png"}]
+    fake_backends.genai.models.latency = 0.1
+
+    with TestClient(app) as client:
+        response = client.post("/api/batch", json={"items": items, "concurrency": 1})
+        assert response.status_code == 202
+        job = _wait_for(client, response.json()["job_id"])
+        assert client.post("/api/batch", json={"items": [{"person_uri": "a"}]}).status_code == 422
+
+    assert job["status"] == "partial"
+    assert (job["result"]["completed"], job["result"]["failed"]) == (2, 1)
+    progress = [event for event in job["events"] if event["type"] == "item"]
+    assert sorted(event["done"] for event in progress) == [1, 2, 3]
+    assert {event["total"] for event in progress} == {3}
+    # Rates are over the whole batch so far, so the last one matches the summary.
+    assert progress[-1]["images_per_min"] == pytest.approx(job["result"]["images_per_min"], rel=0.1)
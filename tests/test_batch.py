@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+from obelisk_recontext_agent.batch import BatchItem, load_manifest, run_batch
+
+
+def _write_manifest(path, pairs):
+    path.write_text(
+        "".join(
+            json.dumps({"person_uri": person, "product_uri": product}) + "\n"
+            for person, product in pairs
+        )
+    )
+
+
+def test_batch_runs_every_pair_and_resumes_from_checkpoint(fake_backends, tmp_path):
+    for name in ["model-a.png", "model-b.png"] + [f"product-{i}.png" for i in range(3)]:
+        fake_backends.storage.objects[name] = (name.encode(), "image/png")
+    manifest = tmp_path / "manifest.jsonl"
+    _write_manifest(
+        manifest,
+        [
+            (f"gs://test-bucket/{person}", f"gs://test-bucket/product-{i}.png")
+            for person in ("model-a.png", "model-b.png")
+            for i in range(3)
+        ],
+    )
+    checkpoint = tmp_path / "progress.jsonl"
+    items = load_manifest(str(manifest))
+
+    report = asyncio.run(run_batch(items, concurrency=3, checkpoint_path=str(checkpoint)))
+
+    summary = report.summary()
+    assert (summary["completed"], summary["failed"], summary["images"]) == (6, 0, 6)
+    assert summary["images_per_min"] > 0
+    records = [json.loads(line) for line in checkpoint.read_text().splitlines()]
+    assert sorted(record["id"] for record in records) == sorted(item.id for item in items)
+
+    resumed = asyncio.run(run_batch(items, concurrency=3, checkpoint_path=str(checkpoint)))
+    assert (resumed.skipped, resumed.completed) == (6, 0)
+    assert fake_backends.genai.models.calls == 6
+
+
+def test_failed_items_are_retried_on_resume(fake_backends, tmp_path):
+    checkpoint = tmp_path / "progress.jsonl"
+    item = BatchItem(person_uri="missing-person.png", product_uri="gs://test-bucket/p.png")
+
+    report = asyncio.run(run_batch([item], checkpoint_path=str(checkpoint)))
+    assert report.failed == 1
+
+    report = asyncio.run(run_batch([item], checkpoint_path=str(checkpoint)))
+    assert (report.skipped, report.failed) == (0, 1)
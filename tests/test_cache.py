@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+from conftest import FakeToolContext
+from obelisk_recontext_agent import cache as cache_module, tools
+from obelisk_recontext_agent.cache import ResultCache, cache_key
+from obelisk_recontext_agent.storage_backends import LocalStorageBackend
+
+
+def test_local_tier_evicts_least_recently_used_entries(tmp_path):
+    cache = ResultCache("test", max_bytes=150, directory=str(tmp_path))
+    cache.put("a", ["gs://bucket/a.png"])
+    cache.put("b", ["gs://bucket/b.png"])
+    assert cache.get("a") == ["gs://bucket/a.png"]
+
+    cache.put("c", ["gs://bucket/c.png"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == ["gs://bucket/a.png"]
+    assert cache.snapshot()["evictions"] == 1
+
+
+def test_shared_tier_goes_through_the_storage_backend(tmp_path, monkeypatch):
+    backend = LocalStorageBackend(str(tmp_path / "storage"))
+    monkeypatch.setattr(cache_module, "get_storage_backend", lambda: backend)
+
+    def worker(name):
+        return ResultCache(
+            "test", max_bytes=1 << 20, shared_bucket="bucket", directory=str(tmp_path / name)
+        )
+
+    worker("a").put("key", ["gs://bucket/a.png"])
+    other = worker("b")
+
+    assert backend.exists("bucket", "cache/test/key.json")
+    assert other.get("key") == ["gs://bucket/a.png"]
+    assert other.get("missing") is None
+    assert other.snapshot()["shared_hits"] == 1
+
+
+def test_entries_survive_a_restart_and_expire_after_ttl(tmp_path):
+    ResultCache("test", max_bytes=1 << 20, directory=str(tmp_path)).put("key", [1])
+
+    assert ResultCache("test", max_bytes=1 << 20, directory=str(tmp_path)).get("key") == [1]
+    expired = ResultCache("test", max_bytes=1 << 20, ttl=0.01, directory=str(tmp_path))
+    time.sleep(0.02)
+    assert expired.get("key") is None
+
+
+def test_cache_key_is_independent_of_argument_order():
+    assert cache_key(model="m", config={"n": 1, "t": 2}) == cache_key(
+        config={"t": 2, "n": 1}, model="m"
+    )
+
+
+def test_repeated_try_on_is_served_from_cache(fake_backends):
+    fake_backends.storage.objects["person.png"] = (b"person", "image/png")
+    fake_backends.storage.objects["product.png"] = (b"product", "image/png")
+
+    def try_on(ctx):
+        return tools.generate_virtual_try_on_images(
+            person_uri="gs://test-bucket/person.png",
+            product_uri="gs://test-bucket/product.png",
+            number_of_images=2,
+            tool_context=ctx,
+        )
+
+    first = asyncio.run(try_on(FakeToolContext()))
+    ctx = FakeToolContext()
+    second = asyncio.run(try_on(ctx))
+
+    assert fake_backends.genai.models.calls == 1
+    assert second["cached"] is True
+    assert second["image_uris"] == first["image_uris"]
+    assert ctx.state["selected_file"] == first["image_uris"][-1]
+    assert fake_backends.try_on_cache.snapshot()["hits"] == 1
+    # Restored artifacts carry their bytes, so clients that cannot read the
+    # bucket still render them.
+    for uri in second["image_uris"]:
+        artifact = ctx.artifacts[uri.rsplit("/", 1)[-1]]
+        assert artifact.inline_data.data == fake_backends.genai.models.image_bytes
+        assert artifact.file_data is None
+
+
+def test_replayed_edit_chain_costs_no_model_calls(fake_backends):
+    fake_backends.storage.objects["source.png"] = (b"source", "image/png")
+    prompts = ["beach at sunset", "add a hat", "make it rain", "night time", "zoom out"]
+
+    async def run_chain(ctx):
+        ctx.state["selected_file"] = "gs://test-bucket/source.png"
+        for prompt in prompts:
+            result = await tools.edit_image(prompt=prompt, tool_context=ctx)
+            assert result["status"] == "complete"
+        return ctx.state["selected_file"]
+
+    # Every edit of the fake model returns the same bytes, so give each output
+    # distinct content the way a real model would.
+    generate = fake_backends.genai.models.generate_content
+
+    def distinct_output(model, contents, config):
+        fake_backends.genai.models.image_bytes = f"edit {fake_backends.genai.models.calls}".encode()
+        return generate(model, contents, config)
+
+    fake_backends.genai.models.generate_content = distinct_output
+
+    first_final = asyncio.run(run_chain(FakeToolContext()))
+    assert fake_backends.genai.models.calls == len(prompts)
+
+    replay_final = asyncio.run(run_chain(FakeToolContext()))
+    assert fake_backends.genai.models.calls == len(prompts)
+    assert replay_final == first_final
+
+
+def test_edit_cache_opt_out_and_seed(fake_backends):
+    fake_backends.storage.objects["source.png"] = (b"source", "image/png")
+
+    def edit(**kwargs):
+        ctx = FakeToolContext()
+        return asyncio.run(
+            tools.edit_image(
+                prompt="beach", tool_context=ctx, image_uri="gs://test-bucket/source.png", **kwargs
+            )
+        )
+
+    edit()
+    assert edit()["cached"] is True
+    assert "cached" not in edit(use_cache=False)
+    assert "cached" not in edit(seed=7)
+    assert edit(seed=7)["cached"] is True
+    assert fake_backends.genai.models.calls == 3
@@ -0,0 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from obelisk_recontext_agent import clients
+
+
+def test_genai_client_is_shared_per_project_and_location():
+    clients.reset_clients()
+    first = clients.get_genai_client("test-project", "us-central1")
+    assert clients.get_genai_client("test-project", "us-central1") is first
+    assert clients.get_genai_client("test-project", "global") is not first
+
+
+def test_genai_client_is_created_once_across_threads():
+    clients.reset_clients()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(
+            pool.map(lambda _: clients.get_genai_client("test-project", "europe-west4"), range(32))
+        )
+    assert all(client is results[0] for client in results)
@@ -0,0 +1,56 @@
+import io
+
+from PIL import Image
+
+from obelisk_recontext_agent.images import normalize_image, sniff_mime_type
+
+
+def _encode(image, fmt, **kwargs):
+    output = io.BytesIO()
+    image.save(output, fmt, **kwargs)
+    return output.getvalue()
+
+
+def test_large_photo_is_downsized_rotated_and_stripped():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+    exif[0x010F] = "PhoneMaker"
+    photo = Image.effect_noise((4000, 3000), 40).convert("RGB")
+    data = _encode(photo, "JPEG", quality=95, exif=exif)
+
+    result = normalize_image(data, max_dimension=1024)
+
+    assert result.mime_type == "image/jpeg"
+    assert result.original_size == (4000, 3000)
+    # The EXIF orientation is applied, so portrait stays portrait.
+    assert result.size == (768, 1024)
+    assert result.bytes_saved > 0
+    assert "exif" not in Image.open(io.BytesIO(result.data)).info
+
+
+def test_clean_small_image_is_returned_unchanged():
+    data = _encode(Image.new("RGB", (64, 64), "red"), "PNG")
+
+    result = normalize_image(data, max_dimension=1024)
+
+    assert result.data == data
+    assert normalize_image(result.data, max_dimension=1024).data == data
+
+
+def test_transparent_image_stays_png_and_other_formats_are_sniffed():
+    data = _encode(Image.new("RGBA", (2000, 1000), (0, 0, 0, 0)), "WEBP")
+    assert sniff_mime_type(data) == "image/webp"
+
+    result = normalize_image(data, max_dimension=1000)
+
+    assert result.mime_type == "image/png"
+    assert result.size == (1000, 500)
+
+
+def test_undecodable_input_is_passed_through():
+    data = b"%PDF-1.7 not an image"
+
+    result = normalize_image(data)
+
+    assert result.data == data
+    assert result.mime_type == "application/pdf"
@@ -0,0 +1,64 @@
+import asyncio
+import hashlib
+
+from google.genai import types
+
+from conftest import FakeToolContext
+from obelisk_recontext_agent import tools
+
+PERSON = b"\x89PNG person"
+
+
+def _context_with_upload(name, data):
+    ctx = FakeToolContext()
+    ctx.artifacts[name] = types.Part.from_bytes(data=data, mime_type="image/png")
+    return ctx
+
+
+def test_inputs_are_staged_under_their_content_hash(fake_backends):
+    ctx = _context_with_upload("person.png", PERSON)
+
+    result = asyncio.run(tools.stage_input_image("person.png", ctx, "person_gcs_uri"))
+
+    digest = hashlib.sha256(PERSON).hexdigest()
+    assert result == {
+        "status": "ok",
+        "gcs_uri": f"gs://test-bucket/inputs/{digest}.png",
+        "sha256": digest,
+    }
+    assert ctx.state["person_gcs_uri"] == [result["gcs_uri"]]
+
+
+def test_reused_person_image_is_uploaded_once(fake_backends):
+    async def catalog_run():
+        for index in range(20):
+            ctx = _context_with_upload("person.png", PERSON)
+            ctx.artifacts["product.png"] = types.Part.from_bytes(
+                data=f"product {index}".encode(), mime_type="image/png"
+            )
+            result = await tools.generate_virtual_try_on_images(
+                person_uri="person.png",
+                product_uri="product.png",
+                number_of_images=1,
+                tool_context=ctx,
+            )
+            assert result["status"] == "complete"
+
+    asyncio.run(catalog_run())
+
+    staged = [name for name in fake_backends.storage.objects if name.startswith("inputs/")]
+    # One person image plus twenty distinct products, each uploaded exactly once,
+    # alongside the twenty generated outputs.
+    assert len(staged) == 21
+    assert fake_backends.storage.uploads == 21 + 20
+
+
+def test_existing_object_is_not_uploaded_again(fake_backends):
+    digest = hashlib.sha256(PERSON).hexdigest()
+    fake_backends.storage.objects[f"inputs/{digest}.png"] = (PERSON, "image/png")
+
+    asyncio.run(
+        tools.stage_input_image("person.png", _context_with_upload("person.png", PERSON), "uris")
+    )
+
+    assert fake_backends.storage.uploads == 0
@@ -0,0 +1,54 @@
+import asyncio
+
+from obelisk_recontext_agent.jobs import FAILED, PARTIAL, SUCCEEDED, Job, JobManager
+
+
+def _run_jobs(*results):
+    async def run():
+        manager = JobManager(workers=2)
+        await manager.start()
+
+        def returning(result):
+            async def run_job(job):
+                return result
+
+            return run_job
+
+        jobs = [manager.submit("test", returning(result)) for result in results]
+        streams = [[event["type"] async for event in job.stream()] for job in jobs]
+        await manager.stop()
+        return jobs, streams
+
+    return asyncio.run(run())
+
+
+def test_partial_results_get_their_own_state():
+    (ok, partial, error), streams = _run_jobs(
+        {"status": "ok"},
+        {"status": "partial", "shots": []},
+        {"status": "error", "error": "quota"},
+    )
+
+    assert ok.status == SUCCEEDED and ok.error is None
+    assert partial.status == PARTIAL and partial.done
+    assert partial.result == {"status": "partial", "shots": []}
+    assert error.status == FAILED and error.error == "quota"
+    assert streams[1] == ["queued", "running", "partial"]
+
+
+def test_publish_wakes_every_stream_without_background_tasks():
+    async def collect(job):
+        return [event["type"] async for event in job.stream()]
+
+    async def run():
+        job = Job(kind="test", run=None)
+        consumers = [asyncio.create_task(collect(job)) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks_before = len(asyncio.all_tasks())
+        job.publish("queued")
+        assert len(asyncio.all_tasks()) == tasks_before
+        job.status = SUCCEEDED
+        job.publish(SUCCEEDED)
+        return await asyncio.gather(*consumers)
+
+    assert asyncio.run(run()) == [["queued", "succeeded"]] * 3
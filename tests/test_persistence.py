@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+from conftest import FakeToolContext
+from obelisk_recontext_agent import tools
+
+UPLOAD_LATENCY = 0.2
+
+
+def test_multi_image_persistence_takes_about_one_upload(fake_backends):
+    fake_backends.storage.latency = UPLOAD_LATENCY
+    ctx = FakeToolContext()
+
+    start = time.perf_counter()
+    result = asyncio.run(
+        tools.generate_virtual_try_on_images(
+            person_uri="gs://test-bucket/person.png",
+            product_uri="gs://test-bucket/product.png",
+            number_of_images=4,
+            tool_context=ctx,
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    assert result["status"] == "complete"
+    assert len(result["image_uris"]) == 4
+    assert elapsed < 2 * UPLOAD_LATENCY
+    assert ctx.state["selected_file"] == result["image_uris"][-1]
+
+
+def test_persistence_keeps_order_and_reports_failures(fake_backends, monkeypatch):
+    upload = tools.upload_bytes_to_gcs
+    attempts = []
+
+    async def flaky_upload(data, **kwargs):
+        attempts.append(data)
+        if len(attempts) == 2:
+            raise ConnectionError("upload reset")
+        return await upload(data, **kwargs)
+
+    monkeypatch.setattr(tools, "upload_bytes_to_gcs", flaky_upload)
+    images = [b"first", b"second", b"third"]
+
+    saved, failures = asyncio.run(
+        tools.persist_generated_images(
+            images, tool_context=FakeToolContext(), state_var_name="uris"
+        )
+    )
+
+    assert [image["index"] for image in saved] == [0, 2]
+    assert failures == [{"index": 1, "error": "upload reset"}]
+    stored = fake_backends.storage.objects
+    assert [stored[image["filename"]][0] for image in saved] == [b"first", b"third"]
+
+
+def test_persistence_uploads_bytes_without_reloading_the_artifact(fake_backends):
+    class NoReloadToolContext(FakeToolContext):
+        async def load_artifact(self, filename, version=None):
+            raise AssertionError("artifact was reloaded for upload")
+
+    ctx = NoReloadToolContext()
+    saved, failures = asyncio.run(
+        tools.persist_generated_images([b"png"], tool_context=ctx, state_var_name="uris")
+    )
+
+    assert not failures
+    filename = saved[0]["filename"]
+    assert ctx.artifacts[filename].inline_data.data == b"png"
+    assert fake_backends.storage.objects[filename] == (b"png", "image/png")
+
+
+def test_generated_images_get_preview_renditions(fake_backends):
+    import io
+
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.new("RGB", (2048, 1024), "blue").save(output, "PNG")
+    ctx = FakeToolContext()
+
+    saved, failures = asyncio.run(
+        tools.persist_generated_images([output.getvalue()], ctx, "generated")
+    )
+
+    assert not failures
+    previews = saved[0]["previews"]
+    assert previews == tools.preview_uris(saved[0]["gcs_uri"])
+    objects = fake_backends.storage.objects
+    thumbnail, content_type = objects[previews["thumbnail"].split("/", 3)[3]]
+    assert content_type == "image/webp"
+    assert Image.open(io.BytesIO(thumbnail)).size == (256, 128)
+    assert Image.open(io.BytesIO(objects[previews["preview"].split("/", 3)[3]][0])).size == (1024, 512)
+    # Previews are not artifacts, so clients counting artifacts are unaffected.
+    assert list(ctx.artifacts) == [saved[0]["filename"]]
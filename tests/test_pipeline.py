@@ -0,0 +1,49 @@
+import asyncio
+
+from obelisk_recontext_agent.context import StandaloneToolContext
+from obelisk_recontext_agent.pipeline import PipelineRequest, run_pipeline
+
+
+def _request(**overrides):
+    return PipelineRequest(
+        person_uri="gs://test-bucket/person.png",
+        product_uri="gs://test-bucket/product.png",
+        **overrides,
+    )
+
+
+def test_stages_run_in_order_on_the_previous_output(fake_backends):
+    fake_backends.storage.objects["person.png"] = (b"person", "image/png")
+    fake_backends.storage.objects["product.png"] = (b"product", "image/png")
+    seen = []
+    ctx = StandaloneToolContext(keep_artifacts=True)
+
+    result = asyncio.run(
+        run_pipeline(
+            _request(edit_prompts=["beach", "sunset"], video_prompts=["orbit", "reveal"]),
+            tool_context=ctx,
+            on_stage=seen.append,
+        )
+    )
+
+    assert result.status == "complete"
+    assert [stage.stage for stage in result.stages] == ["try_on", "edit:0", "edit:1", "video"]
+    assert [timing.stage for timing in seen] == [stage.stage for stage in result.stages]
+    assert result.image_uri == result.outputs["edit:1"]["image_uris"][-1]
+    assert result.image_uri != result.outputs["try_on"]["image_uris"][-1]
+    assert len(result.video_uris) == 2
+    timings = result.to_dict()["timings"]
+    assert timings["total_s"] >= timings["tools_s"] >= 0
+    assert sum(name.endswith(".mp4") for name in ctx.artifacts) == 2
+
+
+def test_failed_stage_stops_the_pipeline(fake_backends):
+    fake_backends.storage.objects["person.png"] = (b"person", "image/png")
+    fake_backends.storage.objects["product.png"] = (b"product", "image/png")
+
+    result = asyncio.run(run_pipeline(_request(video_prompts=["boom"])))
+
+    assert result.status == "error"
+    assert result.error.startswith("video: ")
+    assert [stage.status for stage in result.stages] == ["ok", "error"]
+    assert result.video_uris == []
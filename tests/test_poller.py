@@ -0,0 +1,88 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from obelisk_recontext_agent.poller import OperationPoller
+from obelisk_recontext_agent.telemetry import LocalTelemetry
+
+
+class FakeOperations:
+    """Operations that complete a fixed number of seconds after submission."""
+
+    def __init__(self):
+        self.ready_at = {}
+        self.calls = 0
+
+    def submit(self, name, duration):
+        self.ready_at[name] = time.monotonic() + duration
+        return SimpleNamespace(name=name, done=False)
+
+    def get(self, operation):
+        self.calls += 1
+        done = time.monotonic() >= self.ready_at[operation.name]
+        return SimpleNamespace(name=operation.name, done=done)
+
+
+def test_each_waiter_wakes_when_its_operation_completes():
+    operations = FakeOperations()
+    client = SimpleNamespace(operations=operations)
+
+    async def main():
+        poller = OperationPoller(min_interval=0.02, max_interval=0.2, expected_duration=0.1)
+
+        async def wait_for(name, duration):
+            result = await poller.wait(operations.submit(name, duration), client)
+            return name, result.done, time.monotonic()
+
+        start = time.monotonic()
+        results = await asyncio.gather(
+            wait_for("fast", 0.1), wait_for("slow", 0.4), wait_for("slower", 0.5)
+        )
+        return poller, start, results
+
+    poller, start, results = asyncio.run(main())
+
+    finished = {name: at - start for name, done, at in results}
+    assert all(done for _, done, _ in results)
+    assert finished["fast"] < 0.3
+    assert finished["slow"] < 0.4 + 0.25
+    assert finished["slower"] < 0.5 + 0.25
+    snapshot = poller.snapshot()
+    assert snapshot["completed"] == 3
+    assert snapshot["in_flight"] == 0
+    assert snapshot["detection_lag_upper_bound_max_s"] <= 0.25
+
+
+def test_delay_adapts_to_observed_durations():
+    poller = OperationPoller(min_interval=2, max_interval=15, expected_duration=60)
+    assert poller.next_delay(elapsed=0, late_polls=0) == 15
+    assert poller.next_delay(elapsed=58, late_polls=0) == 2
+
+    poller.metrics.durations.extend([10, 12, 14])
+    assert poller.expected_duration() == 12
+    assert poller.next_delay(elapsed=4, late_polls=0) == 4
+    assert poller.next_delay(elapsed=20, late_polls=2) == 2 * 1.5**2
+
+
+def test_first_check_is_fast_and_recorded_as_metrics():
+    operations = FakeOperations()
+    client = SimpleNamespace(operations=operations)
+
+    async def main():
+        # A long expected duration would otherwise put the first check at max_interval.
+        poller = OperationPoller(min_interval=0.02, max_interval=5, expected_duration=60)
+        start = time.monotonic()
+        await poller.wait(operations.submit("quick", 0), client)
+        return time.monotonic() - start
+
+    with LocalTelemetry() as local:
+        waited = asyncio.run(main())
+        counters = local.counters()
+        histograms = local.histograms()
+
+    assert waited < 0.5
+    assert operations.calls == 1
+    assert counters["obelisk.veo.polls"] == 1
+    assert counters["obelisk.veo.in_flight"] == 0
+    assert histograms["obelisk.veo.duration"][("veo.poll", "ok")]["count"] == 1
+    assert histograms["obelisk.veo.detection_lag_upper_bound"][("veo.poll", "ok")]["count"] == 1
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from obelisk_recontext_agent import profiles
+from obelisk_recontext_agent.profiles import PROFILE_STATE_KEY, get_profile, latency_profile_callback
+
+
+def _request():
+    return LlmRequest(
+        model="gemini-2.5-pro",
+        config=types.GenerateContentConfig(
+            temperature=1.2, thinking_config=types.ThinkingConfig(include_thoughts=True)
+        ),
+    )
+
+
+def _context(**state):
+    return SimpleNamespace(state=state)
+
+
+def test_session_profile_rewrites_model_thinking_and_temperature():
+    llm_request = _request()
+
+    latency_profile_callback("visual_generator")(
+        _context(**{PROFILE_STATE_KEY: "interactive-fast"}), llm_request
+    )
+
+    settings = get_profile("interactive-fast").visual_generator
+    assert llm_request.model == settings.model
+    assert llm_request.config.temperature == settings.temperature
+    assert llm_request.config.thinking_config.include_thoughts is False
+    assert llm_request.config.thinking_config.thinking_budget == settings.thinking_budget
+
+
+@pytest.mark.parametrize(
+    "state",
+    [{}, {PROFILE_STATE_KEY: profiles.DEFAULT_PROFILE}, {PROFILE_STATE_KEY: "warp"}],
+)
+def test_default_or_unknown_profile_leaves_the_request_alone(state):
+    llm_request = _request()
+
+    latency_profile_callback("root")(_context(**state), llm_request)
+
+    assert llm_request.model == "gemini-2.5-pro"
+    assert llm_request.config.thinking_config.include_thoughts is True
+
+
+def test_quality_profile_keeps_the_original_agent_settings():
+    quality = get_profile("quality")
+    assert quality.root.model == "gemini-2.5-flash"
+    assert quality.visual_generator.model == "gemini-2.5-pro"
+    assert quality.root.include_thoughts and quality.visual_generator.include_thoughts
+    with pytest.raises(ValueError):
+        get_profile("warp")
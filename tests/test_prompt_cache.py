@@ -0,0 +1,22 @@
+from google.adk.apps import App
+
+from obelisk_recontext_agent import agent
+
+
+def test_app_enables_context_caching_for_every_agent():
+    assert isinstance(agent.app, App)
+    assert agent.app.root_agent is agent.root_agent
+    config = agent.app.context_cache_config
+    assert config.ttl_seconds == agent.PROMPT_CACHE_TTL
+    assert config.cache_intervals == agent.PROMPT_CACHE_INTERVALS
+
+
+def test_caching_can_be_turned_off():
+    assert agent.prompt_cache_config(enabled=False) is None
+
+
+def test_agents_have_no_caching_callbacks():
+    # Caching happens inside the model, after the profile picked the model.
+    for llm_agent in (agent.root_agent, agent.visual_generator):
+        assert callable(llm_agent.before_model_callback)
+        assert llm_agent.after_model_callback is None
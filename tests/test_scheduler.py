@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+
+from obelisk_recontext_agent import scheduler as scheduler_module
+from obelisk_recontext_agent.scheduler import (
+    BATCH,
+    INTERACTIVE,
+    ModelScheduler,
+    TokenBucket,
+    is_retryable,
+)
+
+
+def test_token_bucket_limits_rate_after_burst():
+    async def main():
+        bucket = TokenBucket(rate=20, burst=2)
+        start = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # Two calls go out immediately, the other four wait 1/20 s each.
+    assert 0.15 < asyncio.run(main()) < 0.5
+
+
+def test_interactive_calls_jump_ahead_of_batch_calls():
+    order = []
+
+    async def main():
+        bucket = TokenBucket(rate=50, burst=1)
+        await bucket.acquire()  # drain the burst so everything below queues
+
+        async def call(name, priority):
+            await bucket.acquire(priority)
+            order.append(name)
+
+        batch = [asyncio.create_task(call(f"batch-{i}", BATCH)) for i in range(3)]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(call("interactive", INTERACTIVE))
+        await asyncio.gather(*batch, interactive)
+
+    asyncio.run(main())
+    assert order[0] == "interactive"
+
+
+def test_retryable_errors_are_retried_with_backoff(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "BACKOFF_BASE", 0.01)
+    attempts = []
+
+    def flaky_model(**kwargs):
+        attempts.append(kwargs)
+        if len(attempts) < 3:
+            raise HttpError(429)
+        return "image"
+
+    async def main():
+        model_scheduler = ModelScheduler(qpm={"vto": 6000})
+        result = await model_scheduler.run("vto", "us-central1", flaky_model, model="vto")
+        return model_scheduler, result
+
+    model_scheduler, result = asyncio.run(main())
+    assert result == "image"
+    assert len(attempts) == 3
+    snapshot = model_scheduler.snapshot()["vto"]
+    assert (snapshot["calls"], snapshot["retries"]) == (1, 2)
+    assert snapshot["queue_wait"]["mean_s"] is not None
+
+
+def test_non_retryable_errors_are_raised_immediately():
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise HttpError(400)
+
+    async def main():
+        await ModelScheduler(qpm={"vto": 6000}).run("vto", "us-central1", bad_request)
+
+    with pytest.raises(HttpError):
+        asyncio.run(main())
+    assert len(calls) == 1
+    assert not is_retryable(ValueError("no status code"))
+
+
+class HttpError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
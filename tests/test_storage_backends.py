@@ -0,0 +1,136 @@
+import asyncio
+import io
+
+import pytest
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from conftest import FakeToolContext
+from obelisk_recontext_agent import tools
+from obelisk_recontext_agent.storage_backends import LocalStorageBackend
+
+
+@pytest.fixture
+def local_backend(fake_backends, monkeypatch, tmp_path):
+    backend = LocalStorageBackend(str(tmp_path / "storage"))
+    monkeypatch.setattr(tools, "get_storage_backend", lambda: backend)
+    return backend
+
+
+def test_local_backend_maps_nested_objects_without_copying(tmp_path):
+    backend = LocalStorageBackend(str(tmp_path))
+    backend.write("bucket", "products/shoes/side.png", b"first")
+
+    view = backend.read("bucket", "products/shoes/side.png")
+    assert isinstance(view, memoryview)
+    assert view.readonly and bytes(view) == b"first"
+    assert (tmp_path / "bucket" / "products" / "shoes" / "side.png").is_file()
+
+    # Overwriting swaps the file in; the earlier mapping keeps its content.
+    backend.write_stream("bucket", "products/shoes/side.png", io.BytesIO(b"second"), chunk_size=2)
+    assert bytes(view) == b"first"
+    assert bytes(backend.read("bucket", "products/shoes/side.png")) == b"second"
+    assert backend.stat("bucket", "products/shoes/side.png").size == 6
+
+
+def test_local_backend_errors_match_cloud_storage(tmp_path):
+    backend = LocalStorageBackend(str(tmp_path))
+    backend.write("bucket", "inputs/a.png", b"a", if_absent=True)
+
+    with pytest.raises(PreconditionFailed):
+        backend.write("bucket", "inputs/a.png", b"b", if_absent=True)
+    assert bytes(backend.read("bucket", "inputs/a.png")) == b"a"
+    with pytest.raises(NotFound):
+        backend.read("bucket", "inputs/missing.png")
+    assert backend.stat("bucket", "inputs/missing.png") is None
+    with pytest.raises(ValueError):
+        backend.read("bucket", "../other-bucket/a.png")
+    assert sorted(p.name for p in (tmp_path / "bucket" / "inputs").iterdir()) == ["a.png"]
+
+
+def test_edit_reads_nested_objects_from_their_own_bucket(fake_backends):
+    fake_backends.storage.objects["catalog/2024/shoes/side.png"] = (b"\x89PNG side", "image/png")
+
+    result = asyncio.run(
+        tools.edit_image(
+            prompt="on a beach",
+            tool_context=FakeToolContext(),
+            image_uri="gs://other-bucket/catalog/2024/shoes/side.png",
+        )
+    )
+
+    assert result["status"] == "complete"
+
+
+def test_tools_run_end_to_end_on_the_local_backend(local_backend, fake_backends, monkeypatch):
+    local_backend.write("test-bucket", "people/alice/front.png", b"\x89PNG person")
+    local_backend.write("test-bucket", "products/shoes/side.png", b"\x89PNG product")
+    sources = []
+    recontext_image = fake_backends.genai.models.recontext_image
+
+    def record_source(model, source, config):
+        sources.append(source)
+        return recontext_image(model, source, config)
+
+    monkeypatch.setattr(fake_backends.genai.models, "recontext_image", record_source)
+    monkeypatch.setattr(tools, "VIDEO_ARTIFACT_MODE", "inline")
+    ctx = FakeToolContext()
+
+    async def run():
+        try_on = await tools.generate_virtual_try_on_images(
+            person_uri="gs://test-bucket/people/alice/front.png",
+            product_uri="gs://test-bucket/products/shoes/side.png",
+            number_of_images=1,
+            tool_context=ctx,
+        )
+        edit = await tools.edit_image(prompt="on a beach", tool_context=ctx)
+        video = await tools.generate_video(
+            prompt="orbit", tool_context=ctx, number_of_videos=1, negative_prompt=""
+        )
+        return try_on, edit, video
+
+    try_on, edit, video = asyncio.run(run())
+
+    assert try_on["status"] == edit["status"] == "complete"
+    assert video["status"] == "ok"
+    # The model cannot read the local files, so it gets their bytes.
+    assert sources[0].person_image.image_bytes == b"\x89PNG person"
+    assert sources[0].person_image.gcs_uri is None
+    for uri in (*try_on["image_uris"], *edit["image_uris"], video["video_uri"]):
+        assert local_backend.exists(*tools.split_gcs_uri(uri))
+    assert ctx.artifacts[video["video_filename"]].inline_data.data == b"fake mp4"
+
+
+def test_edit_of_an_https_url_uses_the_cache_on_the_local_backend(local_backend, fake_backends):
+    local_backend.write("test-bucket", "products/shoes/side.png", b"\x89PNG product")
+
+    def edit():
+        return asyncio.run(
+            tools.edit_image(
+                prompt="on a beach",
+                tool_context=FakeToolContext(),
+                image_uri="https://storage.googleapis.com/test-bucket/products/shoes/side.png",
+            )
+        )
+
+    assert edit()["status"] == "complete"
+    assert edit()["cached"] is True
+    assert fake_backends.genai.models.calls == 1
+
+
+def test_failed_edit_cache_lookup_is_a_miss(fake_backends, monkeypatch):
+    fake_backends.storage.objects["source.png"] = (b"source", "image/png")
+
+    def unavailable(uri):
+        raise RuntimeError("metadata unavailable")
+
+    monkeypatch.setattr(tools, "_content_id", unavailable)
+    result = asyncio.run(
+        tools.edit_image(
+            prompt="on a beach",
+            tool_context=FakeToolContext(),
+            image_uri="gs://test-bucket/source.png",
+        )
+    )
+
+    assert result["status"] == "complete"
+    assert "cached" not in result
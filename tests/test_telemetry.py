@@ -0,0 +1,72 @@
+import asyncio
+
+from conftest import FakeToolContext
+from obelisk_recontext_agent import telemetry, tools
+from obelisk_recontext_agent.telemetry import LocalTelemetry
+
+
+def _try_on():
+    return tools.generate_virtual_try_on_images(
+        person_uri="gs://test-bucket/person.png",
+        product_uri="gs://test-bucket/product.png",
+        number_of_images=2,
+        tool_context=FakeToolContext(),
+    )
+
+
+def test_try_on_stages_are_nested_spans_with_sizes(fake_backends):
+    fake_backends.storage.objects["person.png"] = (b"person", "image/png")
+    fake_backends.storage.objects["product.png"] = (b"product", "image/png")
+
+    with LocalTelemetry() as local:
+        asyncio.run(_try_on())
+        spans = local.spans()
+        histograms = local.histograms()
+
+    by_name = {}
+    for span in spans:
+        by_name.setdefault(span.name, []).append(span)
+    tool = by_name["obelisk.tool.generate_virtual_try_on_images"][0]
+    model_call = by_name["obelisk.model.call"][0]
+    persist = by_name["obelisk.persist"][0]
+    assert model_call.parent.span_id == tool.context.span_id
+    assert persist.parent.span_id == tool.context.span_id
+    assert model_call.attributes["obelisk.model"] == tools.VTO_MODEL
+    assert persist.attributes["obelisk.image_count"] == 2
+    assert len(by_name["obelisk.artifact.save"]) == 2
+    uploads = by_name["obelisk.gcs.upload"]
+    assert {span.parent.span_id for span in uploads} <= {
+        span.context.span_id for span in by_name["obelisk.persist"]
+    }
+    assert all(span.attributes["obelisk.bytes"] > 0 for span in uploads)
+
+    durations = histograms["obelisk.stage.duration"]
+    assert durations[("model.call", "ok")]["count"] == 1
+    assert durations[("gcs.upload", "ok")]["count"] == 2
+    assert histograms["obelisk.stage.bytes"][("persist", "ok")]["sum"] == 2 * len(
+        fake_backends.genai.models.image_bytes
+    )
+
+
+def test_failed_stage_is_recorded_as_error():
+    with LocalTelemetry() as local:
+        try:
+            with telemetry.stage("gcs.download"):
+                raise OSError("gone")
+        except OSError:
+            pass
+
+    (span,) = local.spans()
+    assert not span.status.is_ok
+    assert ("gcs.download", "error") in local.histograms()["obelisk.stage.duration"]
+
+
+def test_disabled_telemetry_records_nothing(monkeypatch):
+    monkeypatch.setattr(telemetry, "TELEMETRY_ENABLED", False)
+
+    with LocalTelemetry() as local:
+        with telemetry.stage("model.call", model="m") as model_call:
+            model_call.set(bytes=1)
+
+    assert local.spans() == []
+    assert local.histograms() == {}
@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+from conftest import FakeToolContext
+from obelisk_recontext_agent import tools
+
+MODEL_LATENCY = 0.3
+SESSIONS = 8
+
+
+async def _run_sessions(make_call):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(make_call(FakeToolContext()) for _ in range(SESSIONS)))
+    return results, time.perf_counter() - start
+
+
+def test_concurrent_try_on_sessions_do_not_block_each_other(fake_backends):
+    fake_backends.genai.models.latency = MODEL_LATENCY
+
+    results, elapsed = asyncio.run(
+        _run_sessions(
+            lambda ctx: tools.generate_virtual_try_on_images(
+                person_uri="gs://test-bucket/person.png",
+                product_uri="gs://test-bucket/product.png",
+                number_of_images=1,
+                tool_context=ctx,
+            )
+        )
+    )
+
+    assert all(result["status"] == "complete" for result in results)
+    # Serialized on the event loop this would take SESSIONS * MODEL_LATENCY.
+    assert elapsed < 2 * MODEL_LATENCY
+
+
+def test_concurrent_edit_sessions_do_not_block_each_other(fake_backends):
+    fake_backends.genai.models.latency = MODEL_LATENCY
+    fake_backends.storage.objects["source.png"] = (b"\x89PNG source", "image/png")
+
+    results, elapsed = asyncio.run(
+        _run_sessions(
+            lambda ctx: tools.edit_image(
+                prompt="on a beach at sunset",
+                tool_context=ctx,
+                image_uri="gs://test-bucket/source.png",
+            )
+        )
+    )
+
+    assert all(result["status"] == "complete" for result in results)
+    assert elapsed < 2 * MODEL_LATENCY
@@ -0,0 +1,100 @@
+import io
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from obelisk_recontext_agent import tools, uploads
+from obelisk_recontext_agent.api import app
+from obelisk_recontext_agent.images import MAX_INPUT_DIMENSION
+
+
+def _post(client, person=b"person", product=b"product", person_type="image/png"):
+    return client.post(
+        "/api/virtual-try-on",
+        files={
+            "person_image": ("person.png", person, person_type),
+            "product_image": ("product.jpg", product, "image/jpeg"),
+        },
+        data={"number_of_images": "1"},
+    )
+
+
+def test_images_are_streamed_to_the_bucket_in_chunks(fake_backends, monkeypatch):
+    monkeypatch.setattr(tools, "UPLOAD_CHUNK_SIZE", 1024)
+    person = bytes(range(256)) * 40
+    with TestClient(app) as client:
+        assert _post(client, person=person).status_code == 202
+
+    staged = {
+        name: data
+        for name, (data, _) in fake_backends.storage.objects.items()
+        if name.startswith("uploads/")
+    }
+    assert sorted(data for data in staged.values()) == [person, b"product"]
+    assert any(name.endswith(".jpg") for name in staged)
+
+
+def test_oversized_image_is_rejected_without_creating_an_object(fake_backends, monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 1000)
+    with TestClient(app) as client:
+        # Small enough overall to pass the Content-Length check, so the limit
+        # is enforced while the part streams.
+        response = _post(client, person=b"x" * 1500, product=b"")
+
+    assert response.status_code == 413
+    assert not [name for name in fake_backends.storage.objects if name.startswith("uploads/")]
+
+
+def test_declared_length_over_the_limit_is_rejected_before_reading(fake_backends, monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 100)
+    monkeypatch.setattr(uploads, "MAX_FIELD_BYTES", 0)
+    with TestClient(app) as client:
+        response = _post(client, person=b"x" * 300)
+
+    assert response.status_code == 413
+    assert fake_backends.storage.uploads == 0
+
+
+def test_non_image_part_is_rejected(fake_backends):
+    with TestClient(app) as client:
+        response = _post(client, person_type="application/pdf")
+
+    assert response.status_code == 415
+
+
+def test_uploaded_photos_are_downsized_before_staging(fake_backends):
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"
+    photo = io.BytesIO()
+    Image.new("RGB", (4000, 3000), "navy").save(photo, "JPEG", exif=exif)
+    with TestClient(app) as client:
+        assert _post(client, person=photo.getvalue(), person_type="image/jpeg").status_code == 202
+
+    staged = [
+        Image.open(io.BytesIO(data))
+        for name, (data, _) in fake_backends.storage.objects.items()
+        if name.startswith("uploads/") and data != b"product"
+    ]
+    assert [image.size for image in staged] == [(MAX_INPUT_DIMENSION, 1152)]
+    assert "exif" not in staged[0].info
+
+
+def test_body_ending_inside_an_image_is_rejected(fake_backends):
+    boundary = "obelisk"
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="product_image"; filename="product.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+        f"product\r\n--{boundary}\r\n"
+        'Content-Disposition: form-data; name="person_image"; filename="person.png"\r\n'
+        "Content-Type: image/png\r\n\r\n"
+        "\x89PNG trunc"
+    ).encode()
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/virtual-try-on",
+            content=body,
+            headers={"content-type": f"multipart/form-data; boundary={boundary}"},
+        )
+
+    assert response.status_code == 400
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+from conftest import FakeToolContext
+from obelisk_recontext_agent import tools
+
+VIDEO_DURATION = 0.3
+
+
+def _context():
+    ctx = FakeToolContext()
+    ctx.state["selected_file"] = "gs://test-bucket/frame.png"
+    return ctx
+
+
+def test_shots_are_generated_concurrently(fake_backends):
+    fake_backends.genai.models.video_duration = VIDEO_DURATION
+    ctx = _context()
+
+    start = time.perf_counter()
+    result = asyncio.run(
+        tools.generate_video_shots(
+            prompts=["reveal", "orbit", "close-up", "walk away"], tool_context=ctx
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    assert result["status"] == "ok"
+    assert [shot["shot"] for shot in result["shots"]] == [0, 1, 2, 3]
+    assert len(ctx.artifacts) == 4
+    assert elapsed < 2 * VIDEO_DURATION
+
+
+def test_failed_and_filtered_shots_are_reported_per_shot(fake_backends):
+    result = asyncio.run(
+        tools.generate_video_shots(
+            prompts=["reveal", "filtered shot", "boom"],
+            negative_prompts=["blurry"],
+            tool_context=_context(),
+        )
+    )
+
+    assert result["status"] == "partial"
+    statuses = [shot["status"] for shot in result["shots"]]
+    assert statuses == ["ok", "filtered", "error"]
+    assert result["shots"][0]["video_uri"].startswith("gs://test-bucket/")
+    assert result["shots"][2]["error"] == "VEO unavailable"
+
+
+def test_video_without_any_saved_clip_is_an_error(fake_backends):
+    ctx = _context()
+
+    result = asyncio.run(
+        tools.generate_video(
+            prompt="empty result", tool_context=ctx, number_of_videos=2, negative_prompt=""
+        )
+    )
+
+    assert result == {"status": "error", "error": "No video generated for unknown reason"}
+    assert ctx.artifacts == {}